@@ -1,24 +1,56 @@
-from flask import Flask, render_template, request, jsonify
-from youtube_transcript_api import YouTubeTranscriptApi
-from googleapiclient.discovery import build
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_from_directory, url_for
 import re
 import os
+import json
 from dotenv import load_dotenv
-from grok_analyzer import extract_insights_from_chunk
-import graphviz
+from grok_analyzer import iter_merged_insights, analyzer_version, ANALYZER_BACKEND, ANALYZER_BACKENDS
+from youtube_fetcher import fetch_transcript, fetch_description, fetch_executor
+from chunking import chunk_transcript, parse_timestamp
+from transcript import Transcript
+from compaction import compact_pieces, COMPACT_TRANSCRIPTS
+from chart_cache import ChartCache, chart_key
+from flow_chart import RenderTimeout, render_flow_chart, choose_layout, flow_chart_json
+from jobs import JobManager, SQLiteJobStore, SUCCEEDED, FAILED, CANCELLED
+from manifests import load_manifest, reusable_insights, save_manifest, chunk_hash, changed_chapters
+from topic_index import topic_index, index_episode
+from topic_dedup import canonical_topics
+from singleflight import single_flight
+import metrics
+from contextlib import closing
 
 # Load environment variables from .env file
 load_dotenv()
 
 app = Flask(__name__)
 
-# Initialize YouTube Data API client
-YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-youtube = None
-if YOUTUBE_API_KEY:
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-else:
-    print("Warning: YOUTUBE_API_KEY not found in environment variables")
+# Background analyses submitted through /jobs
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', '4'))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', '3600'))  # seconds to keep finished jobs
+# Job state shared by all app workers; empty keeps it in this process only
+JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', '.cache/jobs.sqlite3')
+JOB_LEASE = float(os.getenv('JOB_LEASE', '30'))  # seconds without a heartbeat before a job counts as lost
+job_manager = JobManager(
+    max_workers=JOB_MAX_WORKERS,
+    retention=JOB_RETENTION,
+    store=SQLiteJobStore(JOB_STORE_PATH or ':memory:'),
+    lease=JOB_LEASE
+)
+
+# Rendered flow charts, one SVG per distinct chart
+CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', '.cache/charts')
+CHART_CACHE_MAX_FILES = int(os.getenv('CHART_CACHE_MAX_FILES', '200'))
+# Bump whenever generate_flow_chart's output changes so old SVGs aren't served
+CHART_STYLE_VERSION = '3'
+chart_cache = ChartCache(CHART_CACHE_DIR, max_files=CHART_CACHE_MAX_FILES)
+# Laid-out JSON graphs for client-side rendering
+graph_cache = ChartCache(CHART_CACHE_DIR, max_files=CHART_CACHE_MAX_FILES, extension='json')
+# Markers of charts whose requested layout timed out, holding the layout used instead
+fallback_cache = ChartCache(CHART_CACHE_DIR, max_files=CHART_CACHE_MAX_FILES, extension='fallback')
+chart_lookups = metrics.counter(
+    'podcast_chart_cache_lookups_total',
+    'Flow chart cache lookups by kind (svg, graph) and result (hit, miss)',
+    ('kind', 'result')
+)
 
 def extract_video_id(url):
     # Regular expression to match YouTube video IDs
@@ -35,22 +67,12 @@ def extract_video_id(url):
     return None
 
 def get_video_chapters(video_id):
-    """Fetch video chapters using YouTube Data API"""
-    if not youtube:
-        return []
-        
+    """Fetch video chapters using YouTube Data API (cached per video_id)"""
     try:
-        # Get video details with the correct parts
-        video_response = youtube.videos().list(
-            part='snippet',
-            id=video_id
-        ).execute()
-
-        if not video_response.get('items'):
-            return []
-
         # Get video description which may contain chapters
-        description = video_response['items'][0]['snippet']['description']
+        description = fetch_description(video_id)
+        if not description:
+            return []
         
         # Parse chapters from description
         # Format: 00:00 Chapter 1
@@ -60,17 +82,9 @@ def get_video_chapters(video_id):
             timestamp_match = re.match(r'^(\d{1,2}:\d{2}(?::\d{2})?)\s+(.+)$', line.strip())
             if timestamp_match:
                 time_str, title = timestamp_match.groups()
-                # Convert timestamp to seconds
-                time_parts = time_str.split(':')
-                if len(time_parts) == 3:
-                    hours, minutes, seconds = map(int, time_parts)
-                    seconds = hours * 3600 + minutes * 60 + seconds
-                else:
-                    minutes, seconds = map(int, time_parts)
-                    seconds = minutes * 60 + seconds
                 
                 chapters.append({
-                    'time': seconds,
+                    'time': parse_timestamp(time_str),
                     'title': title.strip()
                 })
         
@@ -82,204 +96,184 @@ def get_video_chapters(video_id):
         print(f"Error fetching chapters: {str(e)}")
         return []
 
-def parse_transcript_chunks(transcript_text: str, chapters: list) -> list:
-    """Parse transcript into chunks based on chapter timestamps"""
-    chunks = []
-    lines = transcript_text.split('\n')
-    
-    # Sort chapters by time
-    sorted_chapters = sorted(chapters, key=lambda x: x['time'])
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+class TranscriptFetchError(Exception):
+    """Raised when the transcript for a video can't be retrieved."""
+
+def get_analyzer_backend(data):
+    """
+    Analyzer backend requested in the body ('analyzer': grok, local or
+    auto), the server default if none was given, or None if it is unknown.
+    """
+    analyzer = data.get('analyzer') or ANALYZER_BACKEND
+    return analyzer if analyzer in ANALYZER_BACKENDS else None
+
+def run_pipeline(video_id, analyzer=None, reanalyze=False):
+    """
+    Run fetch -> chunk -> analyze for a video, yielding events as it goes.
+
+    The first event ('transcript') carries the transcript, chapters and the
+    unanalyzed chunks. One 'chunk' event follows per chunk as soon as its
+    analysis finishes (in completion order), then a final 'done' event
+    with the episode's canonical topics (see topic_dedup).
+    Chunks whose text is unchanged since the video was last analyzed reuse
+    the stored insights (listed in 'reused_chunks') unless reanalyze is set.
+    Stage timings go to /metrics and, with METRICS_LOG_TIMINGS=1, the log.
+    """
+    timings = metrics.Timings(video_id=video_id, analyzer=analyzer or ANALYZER_BACKEND)
+    outcome = 'error'
+    try:
+        yield from pipeline_events(video_id, analyzer, reanalyze, timings)
+        outcome = 'ok'
+    except GeneratorExit:
+        # The client went away or the job was cancelled
+        outcome = 'cancelled'
+        raise
+    finally:
+        timings.log(outcome)
+
+def coalesced_pipeline(video_id, analyzer=None, reanalyze=False):
+    """
+    run_pipeline shared by every concurrent request for the same video and
+    analyzer, in any app worker: one request runs it and the others follow
+    its events (see singleflight). Chunk events are applied to the
+    transcript event's chunks, as run_pipeline does for its own caller.
+    """
+    if single_flight is None:
+        yield from run_pipeline(video_id, analyzer, reanalyze)
+        return
     
-    # If no chapters, return empty list
-    if not sorted_chapters:
-        return []
+    key = f'{video_id}:{analyzer_version(analyzer)}:{int(reanalyze)}'
+    transcript_event = None
+    seen_chunks = set()
+    events = single_flight.stream(
+        key,
+        lambda: run_pipeline(video_id, analyzer, reanalyze),
+        reraise=(TranscriptFetchError,)
+    )
+    with closing(events):
+        for event in events:
+            # A flight taken over from a departed owner starts over; skip repeats
+            if event['type'] == 'transcript':
+                if transcript_event is not None:
+                    continue
+                transcript_event = event
+            elif event['type'] == 'chunk':
+                if event['index'] in seen_chunks:
+                    continue
+                seen_chunks.add(event['index'])
+                chunk = transcript_event['transcript_chunks'][event['index']]
+                chunk['main_points'] = event['main_points']
+                chunk['related_topics'] = event['related_topics']
+            yield event
+
+def pipeline_events(video_id, analyzer, reanalyze, timings):
+    """Body of run_pipeline, timing each stage in timings."""
+    def timed_fetch_transcript():
+        with timings.stage('fetch_transcript'):
+            return fetch_transcript(video_id)
     
-    # Add a final "chapter" at the end to capture the last section
-    sorted_chapters.append({
-        'time': float('inf'),
-        'title': 'End'
-    })
+    # Fetch the transcript and the chapters in parallel
+    transcript_future = fetch_executor.submit(timed_fetch_transcript)
+    with timings.stage('fetch_chapters'):
+        chapters = get_video_chapters(video_id)
     
-    # Create a list of lines with their timestamps (if available)
-    indexed_lines = []
-    for i, line in enumerate(lines):
-        # Extract timestamp from line if available
-        timestamp_match = re.match(r'^(\d{1,2}:\d{2}(?::\d{2})?)\s*-\s*(.+)$', line)
-        if timestamp_match:
-            timestamp_str, text = timestamp_match.groups()
-            
-            # Convert timestamp to seconds
-            time_parts = timestamp_str.split(':')
-            if len(time_parts) == 3:
-                hours, minutes, seconds = map(int, time_parts)
-                current_time = hours * 3600 + minutes * 60 + seconds
-            else:
-                minutes, seconds = map(int, time_parts)
-                current_time = minutes * 60 + seconds
-                
-            indexed_lines.append({
-                'index': i,
-                'line': line,
-                'text': text,
-                'time': current_time,
-                'has_timestamp': True
-            })
-        else:
-            # Line without timestamp
-            indexed_lines.append({
-                'index': i,
-                'line': line,
-                'text': line,
-                'time': None,
-                'has_timestamp': False
-            })
+    # Get the transcript
+    try:
+        youtube_transcript = transcript_future.result()
+    except Exception as e:
+        raise TranscriptFetchError(f'Failed to get transcript: {str(e)}') from e
     
-    # Process each chapter
-    for i in range(len(sorted_chapters) - 1):
-        current_chapter = sorted_chapters[i]
-        next_chapter = sorted_chapters[i + 1]
-        
-        # Find the first line with a timestamp that's >= current chapter time
-        start_index = None
-        for line_info in indexed_lines:
-            if line_info['has_timestamp'] and line_info['time'] >= current_chapter['time']:
-                start_index = line_info['index']
-                break
+    # Keep the transcript structured; the display string is only built for the response
+    with timings.stage('chunk'):
+        transcript = Transcript.from_segments(youtube_transcript)
         
-        # If no line found with timestamp >= current chapter time, use the first line
-        if start_index is None:
-            start_index = 0
-        
-        # Find the last line with a timestamp that's < next chapter time
-        end_index = None
-        for line_info in reversed(indexed_lines):
-            if line_info['has_timestamp'] and line_info['time'] < next_chapter['time']:
-                end_index = line_info['index']
-                break
-        
-        # If no line found with timestamp < next chapter time, use the last line
-        if end_index is None:
-            end_index = len(lines) - 1
-        
-        # Extract all lines between start_index and end_index (inclusive)
-        chunk_lines = []
-        for j in range(start_index, end_index + 1):
-            if j < len(indexed_lines):
-                chunk_lines.append(indexed_lines[j]['text'])
-        
-        # Add the chunk if it's not empty
-        if chunk_lines:
-            chunks.append({
-                'chapter': current_chapter['title'],
-                'text': '\n'.join(chunk_lines)
-            })
+        # Split transcript into chunks based on chapters (or fixed windows if
+        # there are none); long chapters come back split into prompt-sized pieces
+        transcript_chunks = chunk_transcript(transcript, chapters)
+        chunk_pieces = [chunk.pop('pieces') for chunk in transcript_chunks]
     
-    return chunks
-
-def generate_flow_chart(chunks):
-    # Create a new directed graph
-    dot = graphviz.Digraph(comment='Chapter Flow Visualization')
+    # Strip rolling-caption repeats and non-speech tags before prompting
+    compaction = None
+    if COMPACT_TRANSCRIPTS:
+        with timings.stage('compact'):
+            chunk_pieces, compaction = compact_pieces(chunk_pieces)
+        print(
+            f"Compacted {video_id}: {compaction['tokens_before']} -> "
+            f"{compaction['tokens_after']} tokens ({compaction['reduction']:.0%} smaller)"
+        )
     
-    # Set graph attributes for better visualization
-    dot.attr(rankdir='LR', splines='ortho')
-    dot.attr('node', fontname='Arial', style='filled', fontcolor='#333333')
+    # Diff against the last analysis of this video: only chunks whose text
+    # changed (e.g. around a corrected chapter timestamp) are analyzed again
+    version = analyzer_version(analyzer)
+    hashes = [chunk_hash(pieces) for pieces in chunk_pieces]
+    manifest = load_manifest(video_id, version)
+    reused = {} if reanalyze else reusable_insights(manifest, hashes)
+    pending = [index for index in range(len(transcript_chunks)) if index not in reused]
+    if manifest:
+        print(
+            f"Re-analyzing {video_id}: {changed_chapters(manifest['chapters'], chapters)} chapter changes, "
+            f"{len(pending)} of {len(transcript_chunks)} chunks to analyze"
+        )
     
-    # Color palette for chapters (pastel colors that work well in both light/dark modes)
-    colors = [
-        '#FFB3BA',  # Light pink
-        '#BAFFC9',  # Light green
-        '#BAE1FF',  # Light blue
-        '#FFFFBA',  # Light yellow
-        '#E8BAFF',  # Light purple
-        '#FFD9BA',  # Light orange
-        '#B3FFE0',  # Light mint
-        '#FFB3E6',  # Light magenta
-    ]
+    yield {
+        'type': 'transcript',
+        'transcript': transcript.to_text(),
+        'chapters': chapters,
+        'transcript_chunks': transcript_chunks,
+        'compaction': compaction,
+        'reused_chunks': sorted(reused)
+    }
     
-    # For each chunk, create a subgraph for the chapter and its details
-    for i, chunk in enumerate(chunks):
-        chapter_color = colors[i % len(colors)]
-        
-        with dot.subgraph(name=f'cluster_{i}') as c:
-            # Set subgraph attributes
-            c.attr(
-                label=chunk['chapter'],
-                style='rounded,filled',
-                color=chapter_color,
-                fillcolor=f'{chapter_color}80',  # Add transparency
-                fontcolor='#333333',
-                penwidth='2'
-            )
-            
-            # Create main points node
-            if chunk['main_points']:
-                main_points_node = f'main_points_{i}'
-                c.node(
-                    main_points_node,
-                    'Key Points',
-                    shape='box',
-                    style='filled',
-                    fillcolor='white',
-                    margin='0.2'
-                )
-                
-                # Group main points in a more compact way
-                points_text = '• ' + '\n• '.join(chunk['main_points'])
-                point_node = f'points_{i}'
-                c.node(
-                    point_node,
-                    points_text,
-                    shape='box',
-                    style='filled,rounded',
-                    fillcolor='white',
-                    margin='0.2'
-                )
-                c.edge(main_points_node, point_node, style='dotted')
-            
-            # Create related topics node
-            if chunk['related_topics']:
-                topics_node = f'topics_{i}'
-                c.node(
-                    topics_node,
-                    'Related Topics',
-                    shape='box',
-                    style='filled',
-                    fillcolor='white',
-                    margin='0.2'
-                )
-                
-                # Group related topics in a more compact way
-                topics_text = '• ' + '\n• '.join(chunk['related_topics'])
-                topic_list_node = f'topic_list_{i}'
-                c.node(
-                    topic_list_node,
-                    topics_text,
-                    shape='box',
-                    style='filled,rounded',
-                    fillcolor='white',
-                    margin='0.2'
-                )
-                c.edge(topics_node, topic_list_node, style='dotted')
-            
-            # Connect main points and topics if both exist
-            if chunk['main_points'] and chunk['related_topics']:
-                c.edge(main_points_node, topics_node, style='dashed')
-        
-        # Connect chapters in sequence with a thicker, colored edge
-        if i > 0:
-            dot.edge(
-                f'main_points_{i-1}',
-                f'main_points_{i}',
-                color=chapter_color,
-                penwidth='2',
-                constraint='true'
-            )
+    # Where each chunk's insights came from, so local fallbacks aren't stored as Grok results
+    sources = ['failed'] * len(transcript_chunks)
+    for index, analysis in sorted(reused.items()):
+        chunk = transcript_chunks[index]
+        sources[index] = analysis['source']
+        chunk['main_points'] = analysis['main_points']
+        chunk['related_topics'] = analysis['related_topics']
+        yield {
+            'type': 'chunk',
+            'index': index,
+            'main_points': chunk['main_points'],
+            'related_topics': chunk['related_topics']
+        }
     
-    return dot
-
-@app.route('/')
-def index():
-    return render_template('index.html')
+    # Analyze the remaining pieces concurrently (Grok or the local analyzer),
+    # reporting each chunk as soon as all of its pieces have finished. Only
+    # the wait for the analyzer is timed, not the time our caller spends on
+    # each event (e.g. a slow client reading the stream)
+    pending_pieces = [chunk_pieces[index] for index in pending]
+    analyses = iter_merged_insights(pending_pieces, backend=analyzer)
+    while True:
+        with timings.stage('analyze'):
+            step = next(analyses, None)
+        if step is None:
+            break
+        position, analysis = step
+        index = pending[position]
+        chunk = transcript_chunks[index]
+        sources[index] = analysis['source']
+        chunk['main_points'] = analysis['main_points']
+        chunk['related_topics'] = analysis['related_topics']
+        yield {
+            'type': 'chunk',
+            'index': index,
+            'main_points': chunk['main_points'],
+            'related_topics': chunk['related_topics']
+        }
+    
+    save_manifest(video_id, version, chapters, transcript_chunks, hashes, sources)
+    with timings.stage('index'):
+        index_episode(video_id, transcript_chunks)
+    
+    # Near-identical topics of different chapters merged into one canonical set
+    with timings.stage('dedupe_topics'):
+        topics = canonical_topics(transcript_chunks)
+    yield {'type': 'done', 'topics': topics['topics']}
 
 @app.route('/get_transcript', methods=['POST'])
 def get_transcript():
@@ -290,44 +284,189 @@ def get_transcript():
         if not video_id:
             return jsonify({'error': 'Invalid YouTube URL'}), 400
         
-        # Get the transcript
-        try:
-            youtube_transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        except Exception as e:
-            return jsonify({'error': f'Failed to get transcript: {str(e)}'}), 400
-        
-        # Get video chapters
-        chapters = get_video_chapters(video_id)
-        
-        # Convert YouTube transcript format to our format
-        transcript_text = ""
-        for segment in youtube_transcript:
-            # Convert seconds to MM:SS format
-            minutes = int(segment['start'] // 60)
-            seconds = int(segment['start'] % 60)
-            timestamp = f"{minutes:02d}:{seconds:02d}"
-            transcript_text += f"{timestamp} - {segment['text']}\n"
-        
-        # Parse transcript into chunks based on chapters
-        transcript_chunks = parse_transcript_chunks(transcript_text, chapters)
+        analyzer = get_analyzer_backend(request.json)
+        if not analyzer:
+            return jsonify({'error': 'Invalid analyzer'}), 400
         
-        # Analyze each chunk using Grok
-        for chunk in transcript_chunks:
-            analysis = extract_insights_from_chunk(chunk['text'])
-            chunk['main_points'] = analysis['main_points']
-            chunk['related_topics'] = analysis['related_topics']
+        result = {}
+        topics = []
+        try:
+            for event in coalesced_pipeline(video_id, analyzer, bool(request.json.get('reanalyze'))):
+                if event['type'] == 'transcript':
+                    result = event
+                elif event['type'] == 'done':
+                    topics = event['topics']
+        except TranscriptFetchError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Return transcript, chapters, and analyzed chunks
         return jsonify({
             'success': True,
-            'transcript': transcript_text,
-            'chapters': chapters,
-            'transcript_chunks': transcript_chunks
+            'transcript': result['transcript'],
+            'chapters': result['chapters'],
+            'transcript_chunks': result['transcript_chunks'],
+            'compaction': result['compaction'],
+            'reused_chunks': result['reused_chunks'],
+            'topics': topics
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stream_transcript', methods=['POST'])
+def stream_transcript():
+    """
+    Same pipeline as /get_transcript, streamed as newline-delimited JSON so
+    the browser can render the transcript right away and each chapter's
+    analysis as soon as it is ready.
+    """
+    data = request.get_json(silent=True) or {}
+    video_id = extract_video_id(data.get('url', ''))
+    
+    if not video_id:
+        return jsonify({'error': 'Invalid YouTube URL'}), 400
+    
+    analyzer = get_analyzer_backend(data)
+    if not analyzer:
+        return jsonify({'error': 'Invalid analyzer'}), 400
+    
+    reanalyze = bool(data.get('reanalyze'))
+    
+    def generate():
+        try:
+            for event in coalesced_pipeline(video_id, analyzer, reanalyze):
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Ask reverse proxies not to buffer the stream
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'}
+    )
+
+def run_pipeline_job(job, video_id, analyzer=None, reanalyze=False):
+    """Drain run_pipeline for a background job, recording progress as chunks finish."""
+    result = None
+    topics = []
+    completed = 0
+    with closing(coalesced_pipeline(video_id, analyzer, reanalyze)) as events:
+        for event in events:
+            # Closing the pipeline also drops any chunk analyses not yet started
+            job.raise_if_cancelled()
+            if event['type'] == 'transcript':
+                result = event
+                job.set_progress(0, len(event['transcript_chunks']))
+            elif event['type'] == 'chunk':
+                completed += 1
+                job.set_progress(completed, job.total)
+            elif event['type'] == 'done':
+                topics = event['topics']
+    
+    return {
+        'success': True,
+        'transcript': result['transcript'],
+        'chapters': result['chapters'],
+        'transcript_chunks': result['transcript_chunks'],
+        'compaction': result['compaction'],
+        'reused_chunks': result['reused_chunks'],
+        'topics': topics
+    }
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis and return its job ID without waiting for it."""
+    data = request.get_json(silent=True) or {}
+    video_id = extract_video_id(data.get('url', ''))
+    
+    if not video_id:
+        return jsonify({'error': 'Invalid YouTube URL'}), 400
+    
+    analyzer = get_analyzer_backend(data)
+    if not analyzer:
+        return jsonify({'error': 'Invalid analyzer'}), 400
+    
+    # Identical in-flight submissions for the same video and analyzer share one
+    # job; a forced re-analysis never joins a normal one (or vice versa)
+    reanalyze = bool(data.get('reanalyze'))
+    job = job_manager.submit(
+        f'{video_id}:{analyzer}:{int(reanalyze)}',
+        lambda job: run_pipeline_job(job, video_id, analyzer, reanalyze)
+    )
+    return jsonify(job.to_dict()), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == SUCCEEDED:
+        return jsonify(job.result)
+    if job.status == FAILED:
+        return jsonify({'error': job.error}), 500
+    if job.status == CANCELLED:
+        return jsonify({'error': 'Job was cancelled'}), 410
+    # Still queued or running
+    return jsonify(job.to_dict()), 202
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+def get_flow_chart_graph(chunks, layout, positions):
+    """JSON chart description; Graphviz positions are computed once per chart and cached."""
+    if not positions:
+        return flow_chart_json(chunks)
+    key = chart_key(chunks, f'{CHART_STYLE_VERSION}:{layout}')
+    graph_file = graph_cache.get(key)
+    if graph_file is not None:
+        chart_lookups.inc(kind='graph', result='hit')
+        with open(graph_file, encoding='utf-8') as f:
+            return json.load(f)
+    chart_lookups.inc(kind='graph', result='miss')
+    with metrics.stage('layout_chart'):
+        graph = flow_chart_json(chunks, positions=True, layout=layout)
+    graph_cache.put(key, json.dumps(graph, separators=(',', ':')).encode('utf-8'))
+    return graph
+
+def store_chart(chunks, layout, svg, used_layout):
+    """
+    Cache a rendered SVG under the layout it was drawn with; returns
+    (path, key). A render that fell back from the requested layout also
+    leaves a marker under the requested one so it isn't retried.
+    """
+    if used_layout != layout:
+        fallback_cache.put(chart_key(chunks, f'{CHART_STYLE_VERSION}:{layout}'), used_layout.encode('utf-8'))
+    key = chart_key(chunks, f'{CHART_STYLE_VERSION}:{used_layout}')
+    return chart_cache.put(key, svg), key
+
+def get_chart_svg(chunks, layout):
+    """Cached (path, key, layout used) of the chart's SVG, rendering it on a miss."""
+    fallback_file = fallback_cache.get(chart_key(chunks, f'{CHART_STYLE_VERSION}:{layout}'))
+    if fallback_file is not None:
+        with open(fallback_file, encoding='utf-8') as f:
+            layout = f.read()
+    key = chart_key(chunks, f'{CHART_STYLE_VERSION}:{layout}')
+    svg_file = chart_cache.get(key)
+    chart_lookups.inc(kind='svg', result='miss' if svg_file is None else 'hit')
+    if svg_file is not None:
+        return svg_file, key, layout
+    with metrics.stage('render_chart'):
+        svg, used_layout = render_flow_chart(chunks, layout)
+    svg_file, key = store_chart(chunks, layout, svg, used_layout)
+    return svg_file, key, used_layout
+
 @app.route('/generate_flow_chart', methods=['POST'])
 def create_flow_chart():
     try:
@@ -337,20 +476,74 @@ def create_flow_chart():
         if not chunks:
             return jsonify({'error': 'No chunks provided'}), 400
         
-        # Generate the flow chart
-        dot = generate_flow_chart(chunks)
+        # 'auto' switches to the fast layout for large charts
+        layout = choose_layout(chunks, data.get('layout', 'auto'))
+        
+        if data.get('format') == 'json':
+            return jsonify({
+                'success': True,
+                'graph': get_flow_chart_graph(chunks, layout, bool(data.get('positions')))
+            })
         
-        # Render the graph to a file
-        output_path = 'static/flow_chart'
-        dot.render(output_path, format='svg', cleanup=True)
+        # Identical charts are served from the cache without running dot again
+        svg_file, key, layout = get_chart_svg(chunks, layout)
         
-        return jsonify({
+        response = {
             'success': True,
-            'svg_path': output_path + '.svg'
-        })
+            'svg_path': url_for('get_chart', key=key),
+            'layout': layout
+        }
+        if data.get('inline'):
+            with open(svg_file, encoding='utf-8') as f:
+                response['svg'] = f.read()
+        return jsonify(response)
         
+    except RenderTimeout as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/charts/<key>.svg')
+def get_chart(key):
+    # Chart URLs are content-addressed, so browsers may cache them forever
+    if not re.fullmatch(r'[0-9a-f]{64}', key):
+        return jsonify({'error': 'Chart not found'}), 404
+    return send_from_directory(
+        os.path.abspath(CHART_CACHE_DIR),
+        f'{key}.svg',
+        mimetype='image/svg+xml',
+        max_age=365 * 24 * 3600
+    )
+
+@app.route('/search')
+def search_topics():
+    """
+    Chapters of every analyzed episode that discuss the query, best first:
+    GET /search?q=ai+regulation&limit=20
+    """
+    if topic_index is None:
+        return jsonify({'error': 'Topic index is disabled'}), 404
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    try:
+        results = topic_index.search(query, limit)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    for result in results:
+        result['url'] = f"https://www.youtube.com/watch?v={result['video_id']}&t={int(result['start'])}s"
+    return jsonify({'query': query, 'results': results})
+
+@app.route('/metrics')
+def get_metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    if not metrics.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Offline stand-in for youtube_fetcher, for ingest.py --fetchers and tests.
+
+Every video ID maps to a deterministic synthetic video (see
+pipeline.make_video); playlists and channels list made-up video IDs.
+FAKE_YOUTUBE_MINUTES, FAKE_YOUTUBE_CHAPTERS, FAKE_YOUTUBE_PLAYLIST_SIZE
+and FAKE_YOUTUBE_LATENCY (seconds per call) shape the data.
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pipeline import make_video  # noqa: E402
+
+FAKE_YOUTUBE_MINUTES = float(os.getenv('FAKE_YOUTUBE_MINUTES', '30'))
+FAKE_YOUTUBE_CHAPTERS = int(os.getenv('FAKE_YOUTUBE_CHAPTERS', '6'))
+FAKE_YOUTUBE_PLAYLIST_SIZE = int(os.getenv('FAKE_YOUTUBE_PLAYLIST_SIZE', '20'))
+FAKE_YOUTUBE_LATENCY = float(os.getenv('FAKE_YOUTUBE_LATENCY', '0.05'))
+
+
+def _video(video_id):
+    seed = int(hashlib.sha256(video_id.encode('utf-8')).hexdigest()[:8], 16)
+    return make_video(seed, FAKE_YOUTUBE_MINUTES, FAKE_YOUTUBE_CHAPTERS)
+
+
+def fetch_transcript(video_id, refresh=False):
+    time.sleep(FAKE_YOUTUBE_LATENCY)
+    return _video(video_id)[0]
+
+
+def fetch_description(video_id, refresh=False):
+    time.sleep(FAKE_YOUTUBE_LATENCY)
+    return _video(video_id)[1]
+
+
+def list_playlist_videos(playlist_id):
+    time.sleep(FAKE_YOUTUBE_LATENCY)
+    prefix = hashlib.sha256(playlist_id.encode('utf-8')).hexdigest()[:5]
+    return [f'{prefix}{index:06d}' for index in range(FAKE_YOUTUBE_PLAYLIST_SIZE)]
+
+
+def channel_uploads_playlist(channel_id):
+    time.sleep(FAKE_YOUTUBE_LATENCY)
+    return 'UU' + channel_id[2:]
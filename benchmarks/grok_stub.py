@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for the Grok API, for offline benchmarks.
+
+Serves POST /v1/chat/completions with deterministic JSON insights built
+from the prompt's own words: a "chunks" list for batch prompts (one entry
+per "=== Chunk N ===" section), a single object otherwise. Latency and
+429 responses (with retry-after-ms) are injected from a seeded RNG so runs
+are reproducible.
+
+Usage:
+    python benchmarks/grok_stub.py --port 8089 --latency 0.3 --rate-limit 0.05
+    XAI_API_BASE=http://127.0.0.1:8089/v1 XAI_API_KEY=stub python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK_HEADER = re.compile(r'^=== Chunk (\d+) ===$', re.MULTILINE)
+WORD = re.compile(r'[a-z]{5,}')
+
+
+def fake_insights(text):
+    """Points and topics made of the longest distinct words in text."""
+    words = sorted(set(WORD.findall(text.lower())), key=lambda word: (-len(word), word))
+    return {
+        'main_points': [f"The speakers discuss {word}" for word in words[:3]] or ["Small talk"],
+        'related_topics': [word.capitalize() for word in words[3:7]]
+    }
+
+
+def fake_content(prompt):
+    sections = CHUNK_HEADER.split(prompt)
+    if len(sections) == 1:
+        return json.dumps(fake_insights(prompt))
+    # ['preamble', '0', 'text of chunk 0', '1', 'text of chunk 1', ...]
+    return json.dumps({'chunks': [
+        {'index': int(index), **fake_insights(text)}
+        for index, text in zip(sections[1::2], sections[2::2])
+    ]})
+
+
+class StubConfig:
+    """Injected behaviour, shared by all handler threads."""
+
+    def __init__(self, latency=0.2, jitter=0.1, rate_limit=0.0, retry_after_ms=200, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after_ms = retry_after_ms
+        self.requests = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Return (delay in seconds, whether to answer 429) for the next request."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            throttle = self._random.random() < self.rate_limit
+            if throttle:
+                self.rate_limited += 1
+        return delay, throttle
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API, so the shared connection pool is exercised
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, {'error': {'message': 'Not found'}})
+            return
+
+        config = self.server.config
+        delay, throttle = config.draw()
+        if throttle:
+            self._send(429, {'error': {'message': 'Rate limit exceeded', 'type': 'rate_limit'}},
+                       {'retry-after-ms': str(config.retry_after_ms)})
+            return
+        time.sleep(delay)
+
+        prompt = '\n'.join(message.get('content') or '' for message in body.get('messages', []))
+        content = fake_content(prompt)
+        # Same rough estimate the app uses (chunking.estimate_tokens)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self._send(200, {
+            'id': f'stub-{config.requests}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(config, host='127.0.0.1', port=0):
+    """Serve the stub on a daemon thread; returns the server (server_address has the port)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name='grok-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.1, help='+/- seconds around --latency')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='fraction of calls answered with 429')
+    parser.add_argument('--retry-after-ms', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.jitter, args.rate_limit, args.retry_after_ms, args.seed)
+    server = start_stub(config, args.host, args.port)
+    print(f"Grok stub listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
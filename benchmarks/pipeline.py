@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Offline pipeline benchmark: drives /get_transcript and /generate_flow_chart
+through Flask's test client with synthetic videos, fake YouTube fetchers
+and the local Grok stub (benchmarks/grok_stub.py). Nothing touches the
+network, and the synthetic videos and injected latency/429s are seeded,
+so runs are reproducible.
+
+Every run analyzes a new video, so the analysis and chart caches start
+cold. Reports latency percentiles per stage (the endpoints plus the
+pipeline stages from metrics.stage_seconds), throughput and peak Python
+memory per endpoint and per pipeline stage (tracemalloc, sampled around
+every metrics stage). Results can be saved as a baseline and later runs
+checked against it.
+
+Usage:
+    python benchmarks/pipeline.py                       # 60 min, 12 chapters, 5 runs
+    python benchmarks/pipeline.py --minutes 180 --chapters 0 --rate-limit 0.05
+    python benchmarks/pipeline.py --save-baseline       # writes benchmarks/baselines/<name>.json
+    python benchmarks/pipeline.py --check               # exit 1 if slower than the baseline
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, 'benchmarks', 'baselines')
+# Stages timed inside run_pipeline (see app.pipeline_events)
+PIPELINE_STAGES = ('fetch_transcript', 'fetch_chapters', 'chunk', 'compact', 'analyze')
+
+VOCABULARY = (
+    'economy inflation markets interest rates housing energy climate policy '
+    'election campaign voters history empire revolution science physics '
+    'quantum biology evolution genetics medicine vaccines nutrition sleep '
+    'exercise training discipline startup founders funding software models '
+    'language learning reasoning robots hardware chips manufacturing supply '
+    'chains shipping ocean space rockets satellites moon mars telescope '
+    'music guitar album touring writing novels poetry philosophy ethics '
+    'consciousness meditation religion family childhood friendship'
+).split()
+FILLER = 'you know I think that is the thing about it and so we were like really'.split()
+
+
+def make_video(seed, minutes, chapters, segment_seconds=4.0):
+    """
+    Synthetic transcript segments and description for one video. Lines look
+    like auto-captions: rolling repeats of the previous line's tail and the
+    odd [Music] tag, so compaction has real work to do.
+    """
+    rng = random.Random(seed)
+    segments = []
+    previous = []
+    start = 0.0
+    while start < minutes * 60:
+        if rng.random() < 0.02:
+            text = '[Music]'
+            previous = []
+        else:
+            words = [rng.choice(VOCABULARY if rng.random() < 0.4 else FILLER) for _ in range(rng.randint(6, 12))]
+            if previous and rng.random() < 0.5:
+                words = previous[-3:] + words
+            text = ' '.join(words)
+            previous = words
+        segments.append({'start': round(start, 2), 'duration': segment_seconds, 'text': text})
+        start += segment_seconds
+
+    lines = [f'Synthetic episode {seed}.', '']
+    for index in range(chapters):
+        at = int(index * minutes * 60 / chapters)
+        hours, remainder = divmod(at, 3600)
+        stamp = f'{hours}:{remainder // 60:02d}:{remainder % 60:02d}' if hours else f'{remainder // 60:02d}:{remainder % 60:02d}'
+        lines.append(f'{stamp} Part {index + 1}: {rng.choice(VOCABULARY)} and {rng.choice(VOCABULARY)}')
+    return segments, '\n'.join(lines)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    return {
+        'p50': percentile(samples, 0.50),
+        'p95': percentile(samples, 0.95),
+        'p99': percentile(samples, 0.99),
+        'mean': sum(samples) / len(samples)
+    }
+
+
+def configure_environment(stub_url, chart_dir):
+    """Point the app at the stub and keep every cache in memory or in chart_dir."""
+    os.environ.update({
+        'XAI_API_BASE': stub_url,
+        'XAI_API_KEY': 'offline-benchmark',
+        'YOUTUBE_API_KEY': 'offline-benchmark',
+        'ANALYSIS_CACHE_PATH': '',
+        'FETCH_CACHE_PATH': '',
+        'TOPIC_INDEX_PATH': '',
+        # Repeated runs of one video must not be replayed from the last run
+        'SINGLEFLIGHT_PATH': '',
+        'CHART_CACHE_DIR': chart_dir,
+        'METRICS_ENABLED': '1',
+        'METRICS_LOG_TIMINGS': '0'
+    })
+
+
+class StagePeaks:
+    """
+    Largest peak of traced memory (KiB above the stage's start) per stage.
+    tracemalloc keeps a single peak, so before every reset it is folded
+    into each open stage, which keeps nested stages and stages running
+    on other threads (the transcript fetch) correct.
+    """
+
+    def __init__(self):
+        self.peaks = {}
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _fold(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for entry in self._open.values():
+            entry[1] = max(entry[1], peak)
+
+    @contextmanager
+    def track(self, name):
+        token = object()
+        with self._lock:
+            self._fold()
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            entry = self._open[token] = [current, current]
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._fold()
+                del self._open[token]
+                peak = max(0, entry[1] - entry[0]) / 1024
+                self.peaks[name] = max(self.peaks.get(name, 0.0), peak)
+
+
+def track_stages(metrics, stage_peaks):
+    """Sample peak memory around every Timings.stage and metrics.stage."""
+    timings_stage = metrics.Timings.stage
+    stage = metrics.stage
+
+    @contextmanager
+    def tracked_timings_stage(self, name):
+        with stage_peaks.track(name), timings_stage(self, name):
+            yield
+
+    @contextmanager
+    def tracked_stage(name):
+        with stage_peaks.track(name), stage(name):
+            yield
+
+    metrics.Timings.stage = tracked_timings_stage
+    metrics.stage = tracked_stage
+
+
+def timed_call(function, stage_peaks, name):
+    """Run function as stage name, returning (result, seconds)."""
+    start = time.perf_counter()
+    with stage_peaks.track(name):
+        result = function()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(args):
+    from grok_stub import StubConfig, start_stub
+
+    stub_config = StubConfig(args.latency, args.jitter, args.rate_limit, args.retry_after_ms, args.seed)
+    stub = start_stub(stub_config)
+    chart_dir = tempfile.mkdtemp(prefix='podcast-bench-charts-')
+    configure_environment(f'http://127.0.0.1:{stub.server_address[1]}/v1', chart_dir)
+
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    import metrics
+
+    videos = {}
+
+    def fake_fetch_transcript(video_id, refresh=False):
+        time.sleep(args.youtube_latency)
+        return videos[video_id][0]
+
+    def fake_fetch_description(video_id, refresh=False):
+        time.sleep(args.youtube_latency)
+        return videos[video_id][1]
+
+    app_module.fetch_transcript = fake_fetch_transcript
+    app_module.fetch_description = fake_fetch_description
+    client = app_module.app.test_client()
+
+    render_svg = not args.no_svg and shutil.which('dot') is not None
+    if not args.no_svg and not render_svg:
+        print("Graphviz 'dot' not found; skipping the SVG render stage")
+
+    latencies = {}
+    stage_peaks = StagePeaks()
+    track_stages(metrics, stage_peaks)
+    chunk_count = 0
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    try:
+        for run in range(args.runs):
+            # 11 characters, like a real video ID
+            video_id = f'bench{args.seed:02d}{run:04d}'[:11]
+            videos[video_id] = make_video(args.seed * 100003 + run, args.minutes, args.chapters)
+            url = f'https://www.youtube.com/watch?v={video_id}'
+
+            before = metrics.stage_seconds.totals()
+            response, elapsed = timed_call(
+                lambda: client.post('/get_transcript', json={'url': url, 'analyzer': args.analyzer}),
+                stage_peaks, 'get_transcript'
+            )
+            data = response.get_json()
+            if response.status_code != 200:
+                raise RuntimeError(f"/get_transcript failed: {data}")
+            latencies.setdefault('get_transcript', []).append(elapsed)
+            after = metrics.stage_seconds.totals()
+            for stage in PIPELINE_STAGES:
+                key = (stage,)
+                seconds = after.get(key, (0.0, 0))[0] - before.get(key, (0.0, 0))[0]
+                latencies.setdefault(stage, []).append(seconds)
+
+            chunks = data['transcript_chunks']
+            chunk_count += len(chunks)
+            requests = [('flow_chart_json', {'chunks': chunks, 'format': 'json'})]
+            if render_svg:
+                requests.append(('flow_chart_svg', {'chunks': chunks, 'layout': args.layout}))
+            for stage, payload in requests:
+                response, elapsed = timed_call(
+                    lambda: client.post('/generate_flow_chart', json=payload),
+                    stage_peaks, stage
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"/generate_flow_chart failed: {response.get_json()}")
+                latencies.setdefault(stage, []).append(elapsed)
+    finally:
+        total_seconds = time.perf_counter() - started_at
+        tracemalloc.stop()
+        stub.shutdown()
+        shutil.rmtree(chart_dir, ignore_errors=True)
+
+    stages = {}
+    for stage, samples in latencies.items():
+        stages[stage] = summarize(samples)
+        if stage in stage_peaks.peaks:
+            stages[stage]['peak_kib'] = stage_peaks.peaks[stage]
+    return {
+        'scenario': scenario(args),
+        'stages': stages,
+        'throughput': {
+            'videos_per_minute': args.runs / total_seconds * 60,
+            'chunks_per_second': chunk_count / total_seconds
+        },
+        'stub': {'requests': stub_config.requests, 'rate_limited': stub_config.rate_limited}
+    }
+
+
+def scenario(args):
+    """Parameters that must match for two results to be comparable."""
+    return {
+        'minutes': args.minutes,
+        'chapters': args.chapters,
+        'runs': args.runs,
+        'analyzer': args.analyzer,
+        'layout': args.layout,
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'rate_limit': args.rate_limit,
+        'youtube_latency': args.youtube_latency,
+        'seed': args.seed
+    }
+
+
+def print_report(result):
+    print(f"{'stage':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MiB':>9}")
+    for stage, stats in result['stages'].items():
+        # Pipeline stages are part of get_transcript
+        label = f'  {stage}' if stage in PIPELINE_STAGES else stage
+        peak = f"{stats['peak_kib'] / 1024:9.1f}" if 'peak_kib' in stats else f"{'':>9}"
+        print(f"{label:<20} {stats['p50'] * 1000:9.1f} {stats['p95'] * 1000:9.1f} "
+              f"{stats['p99'] * 1000:9.1f} {peak}")
+    throughput = result['throughput']
+    print(f"throughput: {throughput['videos_per_minute']:.1f} videos/min, "
+          f"{throughput['chunks_per_second']:.1f} chapters/s")
+    print(f"stub: {result['stub']['requests']} completions, {result['stub']['rate_limited']} answered 429")
+
+
+def find_regressions(result, baseline, tolerance, min_seconds):
+    """Stages whose p50 latency or peak memory grew by more than tolerance."""
+    regressions = []
+    for stage, stats in result['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base:
+            continue
+        if stats['p50'] > base['p50'] * (1 + tolerance) and stats['p50'] - base['p50'] > min_seconds:
+            regressions.append(f"{stage}: p50 {base['p50'] * 1000:.1f} -> {stats['p50'] * 1000:.1f} ms")
+        if 'peak_kib' in stats and 'peak_kib' in base and stats['peak_kib'] > base['peak_kib'] * (1 + tolerance):
+            regressions.append(
+                f"{stage}: peak {base['peak_kib'] / 1024:.1f} -> {stats['peak_kib'] / 1024:.1f} MiB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--minutes', type=float, default=60, help='length of each synthetic video')
+    parser.add_argument('--chapters', type=int, default=12, help='0 for a video without chapters')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--analyzer', default='grok', choices=('grok', 'local', 'auto'))
+    parser.add_argument('--layout', default='auto', help='flow chart layout for the SVG render')
+    parser.add_argument('--no-svg', action='store_true', help="skip the Graphviz render")
+    parser.add_argument('--latency', type=float, default=0.2, help='stub seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='fraction of completions answered 429')
+    parser.add_argument('--retry-after-ms', type=int, default=200)
+    parser.add_argument('--youtube-latency', type=float, default=0.05, help='seconds per fake YouTube call')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--name', help='baseline name (default: derived from the scenario)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='compare against the saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, as a fraction')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='ignore p50 changes smaller than this (timer noise)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    result = run_benchmark(args)
+    print_report(result)
+
+    name = args.name or f"{args.analyzer}-{args.minutes:g}min-{args.chapters}ch"
+    baseline_path = os.path.join(BASELINE_DIR, f'{name}.json')
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Saved baseline {os.path.relpath(baseline_path, ROOT)}")
+    elif args.check:
+        if not os.path.exists(baseline_path):
+            print(f"No baseline at {os.path.relpath(baseline_path, ROOT)}; run with --save-baseline first")
+            sys.exit(2)
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['scenario'] != result['scenario']:
+            print("Baseline was recorded with different parameters; not comparable")
+            sys.exit(2)
+        regressions = find_regressions(result, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
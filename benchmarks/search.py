@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Topic search benchmark: builds a synthetic cross-episode index (100k
+chapters by default) in a temporary SQLite file and times
+TopicIndex.search over seeded queries of one to three terms.
+
+Chapter titles, topics and points draw their words from a Zipf-like
+vocabulary (the pipeline benchmark's words first, then a few thousand
+made-up ones), so a few query terms match a large share of the chapters
+and most match only a handful, as in a real catalogue. The curve is
+flattened at the top (Zipf-Mandelbrot), standing in for the stop words
+the index drops: the commonest word is in about one chapter in eight.
+
+Usage:
+    python benchmarks/search.py                         # 100k chapters, 500 queries
+    python benchmarks/search.py --chapters 20000 --queries 1000
+    python benchmarks/search.py --path /tmp/topics.sqlite3   # keep the index and reuse it next run
+"""
+
+import argparse
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYLLABLES = 'ka lo mi ra tu ven sol dar pex qui bra no zel fin gor hal'.split()
+CHAPTERS_PER_EPISODE = 10
+# Added to each rank of the Zipf curve, so the top words aren't as dominant as stop words are
+ZIPF_OFFSET = 50
+
+
+def make_vocabulary(base, size):
+    """base followed by made-up words, to size words in all."""
+    words = list(base)
+    for length in itertools.count(2):
+        for combination in itertools.product(SYLLABLES, repeat=length):
+            if len(words) >= size:
+                return words
+            words.append(''.join(combination))
+
+
+class Corpus:
+    """Seeded word draws with Zipf-like frequencies (rank r drawn in proportion to 1 / (r + ZIPF_OFFSET))."""
+
+    def __init__(self, vocabulary, seed):
+        self.vocabulary = vocabulary
+        self.cum_weights = list(itertools.accumulate(
+            1 / (rank + ZIPF_OFFSET) for rank in range(1, len(vocabulary) + 1)
+        ))
+        self.rng = random.Random(seed)
+
+    def words(self, count):
+        return self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+
+    def phrase(self, low, high):
+        return ' '.join(self.words(self.rng.randint(low, high)))
+
+    def episode(self):
+        return [
+            {
+                'chapter': self.phrase(2, 4).title(),
+                'start': index * 300,
+                'related_topics': [self.phrase(1, 3) for _ in range(4)],
+                'main_points': [f"The hosts discuss {self.phrase(4, 8)}" for _ in range(3)]
+            }
+            for index in range(CHAPTERS_PER_EPISODE)
+        ]
+
+
+def build_index(index, corpus, chapters):
+    """Index synthetic episodes until index holds chapters chapters; returns the seconds taken."""
+    have = int(index.stats()['chapters'])
+    started = time.perf_counter()
+    for number in range(have // CHAPTERS_PER_EPISODE, chapters // CHAPTERS_PER_EPISODE):
+        index.index_episode(f'bench{number:07d}', corpus.episode())
+        if number and number % 1000 == 0:
+            print(f"  indexed {number * CHAPTERS_PER_EPISODE} chapters", flush=True)
+    return time.perf_counter() - started
+
+
+def run_benchmark(args):
+    from pipeline import VOCABULARY, summarize
+    from topic_index import TopicIndex
+
+    directory = None
+    path = args.path
+    if not path:
+        directory = tempfile.mkdtemp(prefix='podcast-bench-search-')
+        path = os.path.join(directory, 'topics.sqlite3')
+    try:
+        vocabulary = make_vocabulary(VOCABULARY, args.vocabulary)
+        index = TopicIndex(path)
+        print(f"Building a {args.chapters}-chapter index in {path}")
+        build_seconds = build_index(index, Corpus(vocabulary, args.seed), args.chapters)
+
+        query_corpus = Corpus(vocabulary, args.seed + 1)
+        queries = [' '.join(query_corpus.words(query_corpus.rng.randint(1, 3))) for _ in range(args.queries)]
+        for query in queries[:args.warmup]:
+            index.search(query, args.limit)
+        samples = []
+        hits = 0
+        for query in queries:
+            started = time.perf_counter()
+            hits += len(index.search(query, args.limit))
+            samples.append(time.perf_counter() - started)
+        return {
+            'chapters': int(index.stats()['chapters']),
+            'build_seconds': build_seconds,
+            'index_mib': os.path.getsize(path) / 1024 / 1024,
+            'search': summarize(samples),
+            'mean_results': hits / len(queries)
+        }
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--chapters', type=int, default=100000)
+    parser.add_argument('--vocabulary', type=int, default=5000, help='distinct words in the synthetic corpus')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20, help='queries run before timing starts')
+    parser.add_argument('--limit', type=int, default=20, help='results per search, as /search defaults to')
+    parser.add_argument('--path', help='index file to build (or top up) and keep; default: a temporary file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(1, ROOT)
+    result = run_benchmark(args)
+    search = result['search']
+    print(f"index: {result['chapters']} chapters, {result['index_mib']:.1f} MiB, "
+          f"built in {result['build_seconds']:.1f} s")
+    print(f"search: p50 {search['p50'] * 1000:.1f} ms, p95 {search['p95'] * 1000:.1f} ms, "
+          f"p99 {search['p99'] * 1000:.1f} ms, mean {search['mean'] * 1000:.1f} ms "
+          f"({result['mean_results']:.1f} results per query)")
+
+
+if __name__ == '__main__':
+    main()
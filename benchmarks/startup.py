@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long a fresh worker takes to import the app and
+how much memory it holds afterwards.
+
+Each run imports the module in a new interpreter, so nothing is shared
+between runs (OS file caches aside).
+
+Usage:
+    python benchmarks/startup.py                # app, 10 runs
+    python benchmarks/startup.py --runs 20 --module grok_analyzer
+    python benchmarks/startup.py --top 15       # also list the slowest imports
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child: time the import and report peak RSS (KiB on Linux, bytes on macOS)
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({{'seconds': elapsed, 'rss_kib': rss}}))
+"""
+
+
+def run_once(module):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    # The app may print warnings (e.g. missing API keys) before the result
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module, top):
+    """Top-level packages by cumulative import time, from -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.rstrip()
+        # Keep the outermost import of each package
+        if name.lstrip() == name.strip() and len(name) - len(name.lstrip()) <= 3:
+            totals[name.strip()] = int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=0, help='list the N slowest imports')
+    args = parser.parse_args()
+
+    results = [run_once(args.module) for _ in range(args.runs)]
+    seconds = [result['seconds'] for result in results]
+    rss = [result['rss_kib'] for result in results]
+    print(f"import {args.module}: {args.runs} runs")
+    print(f"  time  median {statistics.median(seconds) * 1000:.0f} ms, "
+          f"min {min(seconds) * 1000:.0f} ms, max {max(seconds) * 1000:.0f} ms")
+    print(f"  peak RSS median {statistics.median(rss) / 1024:.1f} MiB")
+
+    if args.top:
+        print("slowest imports:")
+        for name, cumulative in slowest_imports(args.module, args.top):
+            print(f"  {cumulative * 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
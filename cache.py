@@ -0,0 +1,278 @@
+"""
+Small caching toolkit shared by the analyzer and the fetchers.
+
+- LRUCache: in-process, thread-safe, bounded by entry count, per-entry TTL
+- SQLiteCache: persistent on-disk tier, bounded by total value size, TTL
+- TieredCache: memory tier in front of a disk tier, with hit/miss counters
+
+Values must be JSON-serializable so they can live in the disk tier.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Sentinel returned on a cache miss, so None can be cached as a value
+MISSING = object()
+
+
+def cache_key(*parts: str) -> str:
+    """Build a content-addressed key from the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Persistent cache stored in a single SQLite table.
+
+    When the stored values exceed max_bytes, the least recently used
+    entries are evicted. The database runs in WAL mode so several app
+    workers can share one file.
+
+    Reads stay off the write lock: an entry's access time is only updated
+    when it is more than touch_interval seconds old, so recency is exact
+    to within that interval. The total size is kept in a stats row by
+    triggers, so eviction never has to sum the whole table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = 'cache',
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        touch_interval: float = 60
+    ):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing a module never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            table = self.table
+            # One transaction, so a table created by an older version gets
+            # its stats row before any other worker writes through the triggers
+            conn.executescript(
+                'BEGIN IMMEDIATE;'
+                f'CREATE TABLE IF NOT EXISTS {table} ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+                'expires_at REAL, accessed_at REAL NOT NULL);'
+                f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at);'
+                f'CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at);'
+                f'CREATE TABLE IF NOT EXISTS {table}_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);'
+                f"INSERT OR IGNORE INTO {table}_stats SELECT 'bytes', COALESCE(SUM(size), 0) FROM {table};"
+                f'CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON {table} BEGIN '
+                f"UPDATE {table}_stats SET value = value + NEW.size WHERE name = 'bytes'; END;"
+                f'CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE OF size ON {table} BEGIN '
+                f"UPDATE {table}_stats SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END;"
+                f'CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON {table} BEGIN '
+                f"UPDATE {table}_stats SET value = value - OLD.size WHERE name = 'bytes'; END;"
+                'COMMIT;'
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Any:
+        return self.get_entry(key)[0]
+
+    def get_entry(self, key: str) -> Tuple[Any, Optional[float]]:
+        """(value, expires_at) of key, or (MISSING, None); expires_at is None if it never expires."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                f'SELECT value, expires_at, accessed_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING, None
+            value, expires_at, accessed_at = row
+            if expires_at is not None and expires_at <= now:
+                # Expired rows are purged by the next set()
+                return MISSING, None
+            if now - accessed_at > self.touch_interval:
+                conn.execute(
+                    f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key)
+                )
+                conn.commit()
+        return json.loads(value), expires_at
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        payload = json.dumps(value)
+        with self._lock:
+            conn = self._connect()
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete
+            # would skip the size trigger
+            conn.execute(
+                f'INSERT INTO {self.table} (key, value, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'size = excluded.size, expires_at = excluded.expires_at, accessed_at = excluded.accessed_at',
+                (key, payload, len(payload), expires_at, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            f'DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?',
+            (now,)
+        )
+        total = conn.execute(
+            f"SELECT value FROM {self.table}_stats WHERE name = 'bytes'"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries from least to most recently used until we fit again
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute(
+            f'SELECT key, size FROM {self.table} ORDER BY accessed_at'
+        ):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany(f'DELETE FROM {self.table} WHERE key = ?', doomed)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(f'DELETE FROM {self.table}')
+            conn.commit()
+
+    def total_bytes(self) -> int:
+        """Size of all stored values, including expired ones not purged yet."""
+        with self._lock:
+            return self._connect().execute(
+                f"SELECT value FROM {self.table}_stats WHERE name = 'bytes'"
+            ).fetchone()[0]
+
+
+class TieredCache:
+    """Memory LRU in front of an optional SQLite tier, with hit/miss counters."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'sets': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self._count('memory_hits')
+            return value
+        if self.disk is not None:
+            try:
+                value, expires_at = self.disk.get_entry(key)
+            except sqlite3.Error as e:
+                print(f"Warning: cache read failed: {str(e)}")
+                value = MISSING
+            if value is not MISSING:
+                self._count('disk_hits')
+                # Keep the entry's own expiry (e.g. a short-lived negative
+                # entry written by another worker), not the memory tier's default
+                remaining = expires_at - time.time() if expires_at is not None else None
+                if remaining is None or remaining > 0:
+                    self.memory.set(key, value, remaining)
+                return value
+        self._count('misses')
+        return MISSING
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._count('sets')
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, ttl)
+            except sqlite3.Error as e:
+                print(f"Warning: cache write failed: {str(e)}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (
+            (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        )
+        stats['memory_entries'] = len(self.memory)
+        return stats
@@ -0,0 +1,91 @@
+"""
+Bounded on-disk cache of rendered flow charts.
+
+Charts are stored as <key>.svg (or another extension, e.g. laid-out JSON
+graphs), where the key hashes everything that
+affects the drawing (chapter titles, points, topics and the chart style).
+Identical charts are served without running Graphviz again, concurrent
+renders never overwrite each other, and the least recently used files are
+evicted once the directory holds more than max_files charts.
+"""
+
+import os
+import tempfile
+import threading
+from typing import List, Optional
+
+from cache import cache_key
+
+
+def chart_key(chunks: List[dict], style: str) -> str:
+    """Content hash of the parts of the chunks that end up in the chart."""
+    parts = [style]
+    for chunk in chunks:
+        parts.append(chunk.get('chapter', ''))
+        parts.append('\x1f'.join(chunk.get('main_points') or []))
+        parts.append('\x1f'.join(chunk.get('related_topics') or []))
+    return cache_key(*parts)
+
+
+def _mtime(entry: os.DirEntry) -> float:
+    try:
+        return entry.stat().st_mtime
+    except FileNotFoundError:
+        # Removed by another worker mid-scan; sort it first
+        return 0.0
+
+
+class ChartCache:
+    """Chart files keyed by chart_key, evicted least recently used first."""
+
+    def __init__(self, directory: str, max_files: int = 200, extension: str = 'svg'):
+        self.directory = directory
+        self.max_files = max_files
+        self.extension = extension
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.{self.extension}')
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of a cached chart, marking it as recently used."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store a rendered chart atomically and return its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        with self._lock:
+            try:
+                entries = [
+                    entry for entry in os.scandir(self.directory)
+                    if entry.name.endswith(f'.{self.extension}')
+                ]
+            except FileNotFoundError:
+                return
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=_mtime)
+            for entry in entries[:len(entries) - self.max_files]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,174 @@
+"""
+Split transcripts into per-chapter chunks.
+
+chunk_transcript works on a structured Transcript, so the "MM:SS - text"
+display string is never parsed back.
+
+Chapter boundaries are found with bisect over compact arrays built in a
+single pass over the transcript, so splitting is O(lines + chapters log
+lines) instead of rescanning every line for every chapter.
+
+Videos without chapters fall back to fixed time windows, and chapters too
+long for one prompt are split into pieces that fit a token budget, so
+prompt sizes (and per-call latency) stay bounded.
+"""
+
+import os
+from array import array
+from bisect import bisect_left
+from typing import Optional
+
+from transcript import Transcript, format_timestamp
+
+# Prompt budget per analyzed piece; longer chapters are split to fit
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '3000'))
+# Window length used when a video has no chapters
+CHUNK_WINDOW_SECONDS = float(os.getenv('CHUNK_WINDOW_SECONDS', '600'))
+CHARS_PER_TOKEN = 4
+
+
+def parse_timestamp(time_str: str) -> int:
+    """Convert an MM:SS or HH:MM:SS timestamp to seconds."""
+    time_parts = time_str.split(':')
+    if len(time_parts) == 3:
+        hours, minutes, seconds = map(int, time_parts)
+        return hours * 3600 + minutes * 60 + seconds
+    minutes, seconds = map(int, time_parts)
+    return minutes * 60 + seconds
+
+
+def _monotone_bounds(times):
+    """
+    Return the running maximum and the suffix minimum of times.
+
+    Both are non-decreasing, which keeps chapter lookups bisectable even if
+    caption times aren't monotonic: the first entry with time >= t is the
+    first with prefix_max >= t, and the last entry with time < t is the last
+    with suffix_min < t. For sorted input both are just times itself.
+    """
+    prefix_max = array(times.typecode, times)
+    for k in range(1, len(prefix_max)):
+        if prefix_max[k] < prefix_max[k - 1]:
+            prefix_max[k] = prefix_max[k - 1]
+    suffix_min = array(times.typecode, times)
+    for k in range(len(suffix_min) - 2, -1, -1):
+        if suffix_min[k] > suffix_min[k + 1]:
+            suffix_min[k] = suffix_min[k + 1]
+    return prefix_max, suffix_min
+
+
+def _chapter_spans(times, sorted_chapters):
+    """
+    Yield (chapter, next_chapter_time, first, last) for each chapter, where
+    first is the index of the first entry in times at or after the chapter
+    start and last is the index of the last entry before the next chapter.
+    Either is None when no entry qualifies.
+    """
+    prefix_max, suffix_min = _monotone_bounds(times)
+
+    # Each chapter runs until the next one starts; the last runs to the end
+    next_times = [chapter['time'] for chapter in sorted_chapters[1:]] + [float('inf')]
+
+    for chapter, next_time in zip(sorted_chapters, next_times):
+        first = bisect_left(prefix_max, chapter['time'])
+        last = bisect_left(suffix_min, next_time) - 1
+        yield (
+            chapter,
+            next_time,
+            first if first < len(times) else None,
+            last if last >= 0 else None
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def window_chapters(transcript: Transcript, window_seconds: float) -> list:
+    """Fixed-length pseudo-chapters for videos whose description has no chapters."""
+    chapters = []
+    start = 0.0
+    end = transcript.end
+    while start < end:
+        stop = min(start + window_seconds, end)
+        chapters.append({
+            'time': start,
+            'title': f"{format_timestamp(start)} - {format_timestamp(stop)}"
+        })
+        start += window_seconds
+    return chapters
+
+
+def split_to_budget(transcript: Transcript, start_index: int, end_index: int, max_tokens: int) -> list:
+    """
+    Split segments start_index..end_index (inclusive) into pieces of roughly
+    equal size that each fit in max_tokens. Returns the piece texts.
+
+    Pieces break on segment boundaries; a single segment larger than the
+    budget becomes a piece of its own.
+    """
+    texts = transcript.texts
+    total = sum(len(texts[i]) + 1 for i in range(start_index, end_index + 1))
+    budget = max_tokens * CHARS_PER_TOKEN
+    if total <= budget:
+        return [transcript.text_between(start_index, end_index)]
+
+    # Aim for evenly sized pieces rather than full pieces plus a short tail:
+    # cut at the segment nearest each multiple of total / piece_count, but
+    # never let a piece outgrow the budget
+    target = total / -(-total // budget)
+    pieces = []
+    piece_start = start_index
+    size = 0
+    consumed = 0
+    for i in range(start_index, end_index + 1):
+        segment_size = len(texts[i]) + 1
+        boundary = target * (len(pieces) + 1)
+        if size and (size + segment_size > budget or consumed + segment_size / 2 > boundary):
+            pieces.append(transcript.text_between(piece_start, i - 1))
+            piece_start = i
+            size = 0
+        size += segment_size
+        consumed += segment_size
+    pieces.append(transcript.text_between(piece_start, end_index))
+    return pieces
+
+
+def chunk_transcript(
+    transcript: Transcript,
+    chapters: list,
+    max_tokens: Optional[int] = None,
+    window_seconds: Optional[float] = None
+) -> list:
+    """
+    Split a structured transcript into chunks based on chapter timestamps.
+
+    Each chunk carries the chapter title, its start and end time in seconds,
+    the plain text of the segments that start inside it, and 'pieces': that
+    text split to fit the max_tokens prompt budget (usually a single piece).
+    Videos without chapters are split into fixed windows of window_seconds.
+    """
+    max_tokens = max_tokens or CHUNK_MAX_TOKENS
+    window_seconds = window_seconds or CHUNK_WINDOW_SECONDS
+    if not len(transcript):
+        return []
+
+    sorted_chapters = sorted(chapters, key=lambda x: x['time'])
+    if not sorted_chapters:
+        sorted_chapters = window_chapters(transcript, window_seconds)
+
+    chunks = []
+    for chapter, next_time, first, last in _chapter_spans(transcript.starts, sorted_chapters):
+        start_index = first if first is not None else 0
+        end_index = last if last is not None else len(transcript) - 1
+        if start_index <= end_index:
+            chunks.append({
+                'chapter': chapter['title'],
+                'start': chapter['time'],
+                'end': next_time if next_time != float('inf') else transcript.end,
+                'text': transcript.text_between(start_index, end_index),
+                'pieces': split_to_budget(transcript, start_index, end_index, max_tokens)
+            })
+
+    return chunks
@@ -0,0 +1,109 @@
+"""
+Transcript compaction before analysis.
+
+Auto-generated captions waste a lot of prompt space: rolling captions
+repeat the tail of the previous line, non-speech tags like [Music] carry
+no content, and text that went through the display format has an
+"MM:SS - " prefix on every line. compact_text removes all of that (and,
+optionally, hesitations and stutters) while keeping one caption line per
+line, so the analyzers see the same words in fewer tokens.
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple
+
+from chunking import estimate_tokens
+
+COMPACT_TRANSCRIPTS = os.getenv('COMPACT_TRANSCRIPTS', '1') == '1'
+COMPACT_REMOVE_FILLERS = os.getenv('COMPACT_REMOVE_FILLERS', '0') == '1'
+# Longest caption overlap (in words) looked for between consecutive lines
+MAX_OVERLAP_WORDS = 40
+# Shorter overlaps ("the", "of the") are usually ordinary speech, not rolling captions
+MIN_OVERLAP_WORDS = 3
+
+TIMESTAMP_PREFIX_RE = re.compile(r'^\s*(?:\d+:)?\d{1,2}:\d{2}\s*-\s*')
+NON_SPEECH_RE = re.compile(r'\[[^\]]*\]|\((?:music|applause|laughter|laughs|inaudible)\)|>>', re.IGNORECASE)
+FILLERS = {'um', 'umm', 'uh', 'uhh', 'uh-huh', 'erm', 'er', 'ah', 'hmm', 'mm', 'mhm'}
+
+
+def _normalize(word: str) -> str:
+    return word.lower().strip('.,!?;:"\'')
+
+
+def _overlap(previous: List[str], words: List[str]) -> int:
+    """
+    Length of the longest tail of previous that the line repeats at its
+    start, or 0 if it is shorter than MIN_OVERLAP_WORDS.
+    """
+    longest = min(len(previous), len(words), MAX_OVERLAP_WORDS)
+    for size in range(longest, MIN_OVERLAP_WORDS - 1, -1):
+        if previous[-size:] == words[:size]:
+            return size
+    return 0
+
+
+def _remove_fillers(words: List[str]) -> List[str]:
+    """Drop hesitations and immediate word repeats ("I I think" -> "I think")."""
+    kept = []
+    previous = None
+    for word in words:
+        normalized = _normalize(word)
+        if normalized in FILLERS or (normalized and normalized == previous):
+            continue
+        kept.append(word)
+        previous = normalized
+    return kept
+
+
+def compact_text(text: str, remove_fillers: bool = COMPACT_REMOVE_FILLERS) -> str:
+    """
+    Compact caption text line by line: strip timestamp prefixes and
+    non-speech tags, drop words a line repeats from the end of the
+    previous one, and skip lines left empty.
+    """
+    lines = []
+    # Normalized tail of the text kept so far, for overlap detection
+    tail: List[str] = []
+    for line in text.split('\n'):
+        line = NON_SPEECH_RE.sub(' ', TIMESTAMP_PREFIX_RE.sub('', line))
+        words = line.split()
+        if remove_fillers:
+            words = _remove_fillers(words)
+        if not words:
+            continue
+        normalized = [_normalize(word) for word in words]
+        overlap = _overlap(tail, normalized)
+        if overlap == len(words):
+            # Nothing new on this line
+            continue
+        lines.append(' '.join(words[overlap:]))
+        tail = (tail + normalized[overlap:])[-MAX_OVERLAP_WORDS:]
+    return '\n'.join(lines)
+
+
+def compact_pieces(
+    chunk_pieces: List[List[str]],
+    remove_fillers: bool = COMPACT_REMOVE_FILLERS
+) -> Tuple[List[List[str]], Dict[str, float]]:
+    """
+    Compact every piece of every chunk and report the estimated prompt
+    tokens before and after, and the reduction as a fraction.
+    """
+    tokens_before = 0
+    tokens_after = 0
+    compacted = []
+    for pieces in chunk_pieces:
+        compacted_pieces = []
+        for piece in pieces:
+            compact = compact_text(piece, remove_fillers)
+            tokens_before += estimate_tokens(piece)
+            tokens_after += estimate_tokens(compact)
+            compacted_pieces.append(compact)
+        compacted.append(compacted_pieces)
+    stats = {
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'reduction': round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0
+    }
+    return compacted, stats
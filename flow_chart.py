@@ -0,0 +1,304 @@
+"""
+Flow chart generation and rendering with Graphviz.
+
+Three layouts are available:
+- 'detailed': dot with orthogonal edges (the nicest, but orthogonal routing
+  gets very slow as chapters and labels grow)
+- 'fast': dot with straight edges and capped crossing-minimization work
+- 'force': sfdp force-directed placement for very large charts
+
+'auto' picks 'fast' above a size threshold, and a render that exceeds
+FLOW_CHART_TIMEOUT is redone with the fast layout (under the same
+timeout) instead of failing.
+
+Topics that several chapters share (after merging near-identical wordings,
+see topic_dedup) are drawn once, in a 'Shared Topics' cluster linked from
+each of those chapters, instead of being repeated in every chapter.
+
+flow_chart_json exports the same chart as a compact cluster/node/edge
+description (optionally with Graphviz layout coordinates) so the browser
+can draw it without a server-side SVG render.
+"""
+
+import json
+import os
+import subprocess
+
+from topic_dedup import canonical_topics
+
+FLOW_CHART_TIMEOUT = float(os.getenv('FLOW_CHART_TIMEOUT', '10'))  # seconds
+# Above either threshold 'auto' switches to the fast layout
+FLOW_CHART_FAST_CHAPTERS = int(os.getenv('FLOW_CHART_FAST_CHAPTERS', '25'))
+FLOW_CHART_FAST_LABEL_CHARS = int(os.getenv('FLOW_CHART_FAST_LABEL_CHARS', '20000'))
+
+LAYOUTS = {
+    'detailed': {
+        'engine': 'dot',
+        'graph': {'rankdir': 'LR', 'splines': 'ortho'}
+    },
+    'fast': {
+        'engine': 'dot',
+        # Straight edges skip spline routing; the limits cap network simplex
+        # and mincross iterations, which dominate on big graphs
+        'graph': {'rankdir': 'LR', 'splines': 'line', 'nslimit': '2', 'nslimit1': '2', 'mclimit': '0.2'}
+    },
+    'force': {
+        'engine': 'sfdp',
+        'graph': {'splines': 'false', 'overlap': 'prism'}
+    }
+}
+
+
+# Color palette for chapters (pastel colors that work well in both light/dark modes)
+CHAPTER_COLORS = [
+    '#FFB3BA',  # Light pink
+    '#BAFFC9',  # Light green
+    '#BAE1FF',  # Light blue
+    '#FFFFBA',  # Light yellow
+    '#E8BAFF',  # Light purple
+    '#FFD9BA',  # Light orange
+    '#B3FFE0',  # Light mint
+    '#FFB3E6',  # Light magenta
+]
+SHARED_TOPICS_COLOR = '#D9D9D9'
+
+EDGE_STYLES = {
+    'detail': 'dotted',  # heading -> its list
+    'link': 'dashed',    # main points -> related topics
+    'topic': 'solid',    # related topics -> a shared topic
+}
+
+
+class RenderTimeout(Exception):
+    """Raised when Graphviz doesn't finish within the allowed time."""
+
+
+def choose_layout(chunks, requested='auto'):
+    """Resolve 'auto' (or an unknown name) to a concrete layout for these chunks."""
+    if requested in LAYOUTS:
+        return requested
+    label_chars = sum(
+        len(chunk.get('chapter', ''))
+        + sum(len(point) for point in chunk.get('main_points') or [])
+        + sum(len(topic) for topic in chunk.get('related_topics') or [])
+        for chunk in chunks
+    )
+    if len(chunks) > FLOW_CHART_FAST_CHAPTERS or label_chars > FLOW_CHART_FAST_LABEL_CHARS:
+        return 'fast'
+    return 'detailed'
+
+
+def pipe_with_timeout(dot, fmt='svg', timeout=None):
+    """Run the graph's layout engine on its source, giving up after timeout seconds."""
+    try:
+        completed = subprocess.run(
+            [dot.engine, f'-T{fmt}'],
+            input=dot.source.encode('utf-8'),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout,
+            check=True
+        )
+    except subprocess.TimeoutExpired as e:
+        raise RenderTimeout(f'{dot.engine} took longer than {timeout} seconds') from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.decode('utf-8', 'replace').strip() or str(e)) from e
+    return completed.stdout
+
+
+def render_flow_chart(chunks, layout='auto', fmt='svg', timeout=None):
+    """
+    Render the chunks' flow chart and return (output bytes, layout used).
+
+    If the chosen layout times out, the chart is rendered again with the
+    fast layout (with the same timeout) so the user still gets a chart.
+    RenderTimeout is raised if that times out too.
+    """
+    timeout = FLOW_CHART_TIMEOUT if timeout is None else timeout
+    layout = choose_layout(chunks, layout)
+    try:
+        return pipe_with_timeout(generate_flow_chart(chunks, layout), fmt, timeout), layout
+    except RenderTimeout as e:
+        if layout == 'fast':
+            raise RenderTimeout(f'Flow chart rendering timed out: {str(e)}') from e
+        print(f"Warning: {str(e)}; falling back to the fast layout")
+    try:
+        return pipe_with_timeout(generate_flow_chart(chunks, 'fast'), fmt, timeout), 'fast'
+    except RenderTimeout as e:
+        raise RenderTimeout(
+            f'Flow chart rendering timed out with the {layout} layout and the fast fallback: {str(e)}'
+        ) from e
+
+
+def flow_chart_graph(chunks):
+    """
+    Describe the chart as plain data: one cluster per chapter, its nodes and
+    the edges between them. This is what generate_flow_chart draws, and what
+    the browser renders itself when it asks for JSON.
+    """
+    clusters = []
+    nodes = []
+    edges = []
+    previous_anchor = None
+    
+    canonical = canonical_topics(chunks)
+    shared = [position for position, topic in enumerate(canonical['topics']) if len(topic['chapters']) > 1]
+    
+    # For each chunk, create a cluster for the chapter and its details
+    for i, chunk in enumerate(chunks):
+        chapter_color = CHAPTER_COLORS[i % len(CHAPTER_COLORS)]
+        clusters.append({'id': f'cluster_{i}', 'label': chunk['chapter'], 'color': chapter_color})
+        main_points = chunk.get('main_points') or []
+        # Topics only this chapter mentions are listed in it; shared ones are linked
+        related_topics = [
+            canonical['topics'][position]['label']
+            for position in canonical['chapter_topics'][i]
+            if position not in shared
+        ]
+        shared_links = [position for position in canonical['chapter_topics'][i] if position in shared]
+        
+        # Main points: a heading node plus the points grouped in one compact node
+        if main_points:
+            nodes.append({'id': f'main_points_{i}', 'cluster': i, 'kind': 'heading', 'label': 'Key Points'})
+            nodes.append({'id': f'points_{i}', 'cluster': i, 'kind': 'list', 'label': '• ' + '\n• '.join(main_points)})
+            edges.append({'source': f'main_points_{i}', 'target': f'points_{i}', 'kind': 'detail'})
+        
+        # Related topics, grouped the same way
+        has_topics = bool(related_topics or shared_links)
+        if has_topics:
+            nodes.append({'id': f'topics_{i}', 'cluster': i, 'kind': 'heading', 'label': 'Related Topics'})
+        if related_topics:
+            nodes.append({'id': f'topic_list_{i}', 'cluster': i, 'kind': 'list', 'label': '• ' + '\n• '.join(related_topics)})
+            edges.append({'source': f'topics_{i}', 'target': f'topic_list_{i}', 'kind': 'detail'})
+        for position in shared_links:
+            edges.append({'source': f'topics_{i}', 'target': f'shared_topic_{position}', 'kind': 'topic'})
+        
+        # Connect main points and topics if both exist
+        if main_points and has_topics:
+            edges.append({'source': f'main_points_{i}', 'target': f'topics_{i}', 'kind': 'link'})
+        
+        # Connect chapters in sequence, skipping chapters with nothing to show
+        anchor = f'main_points_{i}' if main_points else f'topics_{i}' if has_topics else None
+        if anchor:
+            if previous_anchor:
+                edges.append({'source': previous_anchor, 'target': anchor, 'kind': 'sequence', 'color': chapter_color})
+            previous_anchor = anchor
+    
+    # One extra cluster, after the chapters, holds the shared topics
+    if shared:
+        clusters.append({'id': 'cluster_shared', 'label': 'Shared Topics', 'color': SHARED_TOPICS_COLOR, 'shared': True})
+        for position in shared:
+            nodes.append({
+                'id': f'shared_topic_{position}',
+                'cluster': len(chunks),
+                'kind': 'topic',
+                'label': canonical['topics'][position]['label']
+            })
+    
+    return {'clusters': clusters, 'nodes': nodes, 'edges': edges}
+
+
+def generate_flow_chart(chunks, layout='detailed'):
+    # Imported here so workers that never render a chart don't pay for it
+    import graphviz
+
+    # Create a new directed graph
+    dot = graphviz.Digraph(comment='Chapter Flow Visualization', engine=LAYOUTS[layout]['engine'])
+    
+    # Set graph attributes for better visualization
+    dot.attr(**LAYOUTS[layout]['graph'])
+    dot.attr('node', fontname='Arial', style='filled', fontcolor='#333333')
+    
+    graph = flow_chart_graph(chunks)
+    nodes_by_cluster = {}
+    for node in graph['nodes']:
+        nodes_by_cluster.setdefault(node['cluster'], []).append(node)
+    
+    for i, cluster in enumerate(graph['clusters']):
+        with dot.subgraph(name=cluster['id']) as c:
+            # Set subgraph attributes
+            c.attr(
+                label=cluster['label'],
+                style='rounded,filled',
+                color=cluster['color'],
+                fillcolor=f"{cluster['color']}80",  # Add transparency
+                fontcolor='#333333',
+                penwidth='2'
+            )
+            for node in nodes_by_cluster.get(i, []):
+                c.node(
+                    node['id'],
+                    node['label'],
+                    shape='box',
+                    style='filled' if node['kind'] == 'heading' else 'filled,rounded',
+                    fillcolor='white',
+                    margin='0.2'
+                )
+    
+    for edge in graph['edges']:
+        if edge['kind'] == 'sequence':
+            # Chapter-to-chapter edges are thicker and colored
+            dot.edge(edge['source'], edge['target'], color=edge['color'], penwidth='2', constraint='true')
+        elif edge['kind'] == 'topic':
+            # Links to shared topics mustn't pull the chapters out of sequence
+            dot.edge(edge['source'], edge['target'], style=EDGE_STYLES['topic'], color='#888888', constraint='false')
+        else:
+            dot.edge(edge['source'], edge['target'], style=EDGE_STYLES[edge['kind']])
+    
+    return dot
+
+
+def _points(value):
+    """Parse a Graphviz "x,y x,y ..." list (dropping e,/s, arrow markers) into pairs."""
+    points = []
+    for token in value.split():
+        parts = token.split(',')
+        if parts[0] in ('e', 's'):
+            continue
+        points.append([round(float(parts[0]), 1), round(float(parts[1]), 1)])
+    return points
+
+
+def flow_chart_json(chunks, positions=False, layout='auto'):
+    """
+    Compact JSON-ready description of the chart for client-side rendering.
+
+    With positions=True, Graphviz lays the chart out once (no drawing) and
+    the result carries cluster boxes, node centers/sizes and edge routes in
+    points, with y growing downwards.
+    """
+    graph = flow_chart_graph(chunks)
+    if not positions:
+        return graph
+    
+    output, layout = render_flow_chart(chunks, layout, fmt='json')
+    laid_out = json.loads(output)
+    height = float(laid_out['bb'].split(',')[3])
+    
+    def flip(point):
+        return [point[0], round(height - point[1], 1)]
+    
+    objects = {obj['_gvid']: obj for obj in laid_out.get('objects', [])}
+    by_name = {obj['name']: obj for obj in objects.values()}
+    for cluster in graph['clusters']:
+        obj = by_name.get(cluster['id'])
+        if obj and 'bb' in obj:
+            x1, y1, x2, y2 = map(float, obj['bb'].split(','))
+            cluster['bb'] = [x1, round(height - y2, 1), x2, round(height - y1, 1)]
+    for node in graph['nodes']:
+        obj = by_name.get(node['id'])
+        if obj and 'pos' in obj:
+            node['pos'] = flip(_points(obj['pos'])[0])
+            node['size'] = [round(float(obj['width']) * 72, 1), round(float(obj['height']) * 72, 1)]
+    routes = {}
+    for edge in laid_out.get('edges', []):
+        if 'pos' in edge:
+            key = (objects[edge['tail']]['name'], objects[edge['head']]['name'])
+            routes[key] = [flip(point) for point in _points(edge['pos'])]
+    for edge in graph['edges']:
+        route = routes.get((edge['source'], edge['target']))
+        if route:
+            edge['points'] = route
+    graph['bb'] = [0, 0, float(laid_out['bb'].split(',')[2]), height]
+    graph['layout'] = layout
+    return graph
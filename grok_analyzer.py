@@ -22,18 +22,127 @@ For web integration, see the Flask example in the comments below.
 import os
 import time
 import json
-from typing import Dict, Any, Optional, List
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Iterator, Tuple
 from dotenv import load_dotenv
+from cache import LRUCache, SQLiteCache, TieredCache, MISSING, cache_key
+from chunking import estimate_tokens
+from rate_limiter import RateLimiter, backoff_delay, retry_after_seconds
+from insights import (
+    INSIGHTS_SCHEMA, BATCH_INSIGHTS_SCHEMA, InvalidInsights,
+    parse_insights, parse_batch_insights, parse_insights_text
+)
+from local_analyzer import extract_insights_local
+import metrics
+
+if TYPE_CHECKING:
+    # The OpenAI SDK and httpx are imported on first use (see get_client);
+    # they account for most of the app's import time
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Configuration
-XAI_API_BASE = "https://api.x.ai/v1"
+XAI_API_BASE = os.getenv("XAI_API_BASE", "https://api.x.ai/v1")
+XAI_MAX_CONNECTIONS = int(os.getenv("XAI_MAX_CONNECTIONS", "20"))
+XAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("XAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+XAI_KEEPALIVE_EXPIRY = float(os.getenv("XAI_KEEPALIVE_EXPIRY", "120"))  # seconds
+XAI_CONNECT_TIMEOUT = float(os.getenv("XAI_CONNECT_TIMEOUT", "5"))  # seconds
+XAI_READ_TIMEOUT = float(os.getenv("XAI_READ_TIMEOUT", "60"))  # seconds
+GROK_MODEL = os.getenv("GROK_MODEL", "grok-beta")
+# Bump whenever the chunk analysis prompt or parser changes so cached
+# analyses produced by the old prompt are no longer served
+PROMPT_VERSION = "2"
+# How chunk analyses are requested: "json_schema" (structured output),
+# "json_object" (JSON mode) or "text" for providers with neither
+XAI_RESPONSE_FORMAT = os.getenv("XAI_RESPONSE_FORMAT", "json_schema")
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 1  # seconds
+# Provider quota shared by every request in this process (0 = no limit)
+XAI_REQUESTS_PER_MINUTE = float(os.getenv("XAI_REQUESTS_PER_MINUTE", "0"))
+XAI_TOKENS_PER_MINUTE = float(os.getenv("XAI_TOKENS_PER_MINUTE", "0"))
+XAI_MAX_CONCURRENCY = int(os.getenv("XAI_MAX_CONCURRENCY", str(XAI_MAX_CONNECTIONS)))
+XAI_MIN_CONCURRENCY = int(os.getenv("XAI_MIN_CONCURRENCY", "1"))
+# Chunk analysis backend: "grok", "local" (offline TF-IDF) or "auto"
+# (Grok, falling back to local when the API is down or rate limited)
+ANALYZER_BACKEND = os.getenv("ANALYZER_BACKEND", "auto")
+ANALYZER_BACKENDS = ("grok", "local", "auto")
+# In auto mode, don't wait out a Retry-After pause longer than this (seconds)
+LOCAL_FALLBACK_MAX_WAIT = float(os.getenv("LOCAL_FALLBACK_MAX_WAIT", "10"))
+ANALYSIS_MAX_WORKERS = int(os.getenv("ANALYSIS_MAX_WORKERS", "8"))
+# Adjacent small chunks are packed into one request up to these limits
+ANALYSIS_BATCH_MAX_TOKENS = int(os.getenv("ANALYSIS_BATCH_MAX_TOKENS", "3000"))
+ANALYSIS_BATCH_MAX_CHUNKS = int(os.getenv("ANALYSIS_BATCH_MAX_CHUNKS", "8"))
+ANALYSIS_BATCH_OUTPUT_TOKENS = 400  # completion budget per chunk in a batch
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", ".cache/analysis.sqlite3")
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))  # seconds
+ANALYSIS_CACHE_MEMORY_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "2048"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Chunk analyses keyed by (chunk text, model, prompt version)
+analysis_cache = TieredCache(
+    LRUCache(max_entries=ANALYSIS_CACHE_MEMORY_ENTRIES, ttl=ANALYSIS_CACHE_TTL),
+    SQLiteCache(
+        ANALYSIS_CACHE_PATH,
+        table='chunk_analyses',
+        max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+        ttl=ANALYSIS_CACHE_TTL
+    ) if ANALYSIS_CACHE_PATH else None
+)
+
+# Every Grok call in the process goes through this limiter
+rate_limiter = RateLimiter(
+    requests_per_minute=XAI_REQUESTS_PER_MINUTE,
+    tokens_per_minute=XAI_TOKENS_PER_MINUTE,
+    max_concurrency=XAI_MAX_CONCURRENCY,
+    min_concurrency=XAI_MIN_CONCURRENCY
+)
+
+metrics.register_cache('analysis', analysis_cache)
+llm_request_seconds = metrics.histogram(
+    'podcast_llm_request_seconds',
+    'Latency of each Grok API call, including failed attempts',
+    ('outcome',)
+)
+llm_requests = metrics.counter(
+    'podcast_llm_requests_total',
+    'Grok API calls by outcome (success, rate_limited, error)',
+    ('outcome',)
+)
+llm_retries = metrics.counter('podcast_llm_retries_total', 'Grok API calls retried after a failure')
+llm_tokens = metrics.counter(
+    'podcast_llm_tokens_total',
+    'Tokens reported by the Grok API (direction is prompt or completion)',
+    ('direction',)
+)
+chunks_analyzed = metrics.counter(
+    'podcast_chunks_analyzed_total',
+    'Analyzed chunks by source (cache, grok, local, failed)',
+    ('source',)
+)
+metrics.gauge(
+    'podcast_llm_concurrency_limit',
+    'Current adaptive limit on Grok calls in flight',
+    lambda: rate_limiter.stats()['concurrency_limit']
+)
+metrics.gauge(
+    'podcast_llm_in_flight',
+    'Grok calls in flight',
+    lambda: rate_limiter.stats()['in_flight']
+)
+metrics.gauge(
+    'podcast_llm_paused_seconds',
+    'Seconds left in a Retry-After pause shared by all Grok calls',
+    rate_limiter.paused_for
+)
+
+class AnalysisUnavailable(Exception):
+    """Raised when Grok can't analyze a chunk (no key, API down or rate limited)."""
 
 # Sample chapters for testing
 SAMPLE_CHAPTERS = [
@@ -57,12 +166,15 @@ SAMPLE_CHAPTERS = [
     }
 ]
 
-def get_api_key() -> str:
+def get_api_key(interactive: bool = True) -> Optional[str]:
     """
     Get the API key from .env file or prompt the user.
-    Returns the API key as a string.
+    Returns the API key as a string, or None if it is missing and
+    interactive is False (web workers must never block on input()).
     """
     api_key = os.getenv("XAI_API_KEY")
+    if not api_key and not interactive:
+        return None
     if not api_key:
         print("Warning: XAI_API_KEY not found in .env file.")
         print("Please create a .env file with your API key:")
@@ -76,9 +188,167 @@ def get_api_key() -> str:
             print("API key has been saved to .env file for future use.")
         except Exception as e:
             print(f"Warning: Could not save API key to .env file: {str(e)}")
+        os.environ["XAI_API_KEY"] = api_key
             
     return api_key
 
+# Process-wide Grok client, shared by every request thread
+_client: Optional['OpenAI'] = None
+_client_lock = threading.Lock()
+
+def get_client() -> 'OpenAI':
+    """
+    Return the shared Grok client, creating it on first use.
+
+    The client wraps a single pooled httpx connection pool with keep-alive,
+    so concurrent chunk analyses reuse TLS connections instead of opening a
+    new one per call. OpenAI clients are safe to share across threads.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = get_api_key(interactive=False)
+                if not api_key:
+                    raise RuntimeError("XAI_API_KEY not found in environment variables")
+                import httpx
+                from openai import OpenAI
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=XAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=XAI_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=XAI_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(XAI_READ_TIMEOUT, connect=XAI_CONNECT_TIMEOUT)
+                )
+                _client = OpenAI(
+                    api_key=api_key,
+                    base_url=XAI_API_BASE,
+                    http_client=http_client,
+                    # Retries go through the shared rate limiter instead
+                    max_retries=0
+                )
+    return _client
+
+def close_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+atexit.register(close_client)
+
+def create_chat_completion(
+    messages: List[Dict[str, str]],
+    max_tokens: int = 500,
+    client: Optional['OpenAI'] = None,
+    max_retries: int = MAX_RETRIES,
+    response_format: Optional[Dict[str, Any]] = None
+) -> 'ChatCompletion':
+    """
+    Call the chat completions API through the process-wide rate limiter.
+
+    Rate limits (429), server errors and connection failures are retried
+    with jittered exponential backoff. A Retry-After from the server pauses
+    every caller in the process, not just this one. Other errors, or the
+    last failure once retries run out, are raised.
+    """
+    from openai import RateLimitError, APIConnectionError, InternalServerError
+
+    client = client or get_client()
+    estimated_tokens = estimate_tokens(''.join(m['content'] for m in messages)) + max_tokens
+    extra = {'response_format': response_format} if response_format else {}
+    
+    for attempt in range(max_retries):
+        retry_after = None
+        try:
+            with rate_limiter.slot(estimated_tokens):
+                # Timed inside the slot so queueing for quota isn't counted as latency
+                started_at = time.perf_counter()
+                try:
+                    response = client.chat.completions.create(
+                        model=GROK_MODEL,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=0.7,
+                        stream=False,
+                        **extra
+                    )
+                finally:
+                    elapsed = time.perf_counter() - started_at
+        except RateLimitError as e:
+            retry_after = retry_after_seconds(e.response.headers)
+            rate_limiter.on_rate_limited(retry_after)
+            error = e
+            outcome = 'rate_limited'
+        except (APIConnectionError, InternalServerError) as e:
+            error = e
+            outcome = 'error'
+        else:
+            usage = getattr(response, 'usage', None)
+            rate_limiter.on_success(estimated_tokens, usage.total_tokens if usage else None)
+            llm_request_seconds.observe(elapsed, outcome='success')
+            llm_requests.inc(outcome='success')
+            if usage:
+                llm_tokens.inc(usage.prompt_tokens or 0, direction='prompt')
+                llm_tokens.inc(usage.completion_tokens or 0, direction='completion')
+            return response
+        
+        llm_request_seconds.observe(elapsed, outcome=outcome)
+        llm_requests.inc(outcome=outcome)
+        if attempt < max_retries - 1:
+            llm_retries.inc()
+            if retry_after:
+                # rate_limiter.slot() waits out the shared pause
+                print(f"Rate limited. Retrying in {retry_after:.1f} seconds...")
+            else:
+                delay = backoff_delay(attempt, INITIAL_RETRY_DELAY)
+                print(f"Grok request failed ({type(error).__name__}). Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+    
+    raise error
+
+# Cleared when the provider rejects response_format, so later calls go
+# straight to plain text plus the tolerant parser
+_response_format_supported = XAI_RESPONSE_FORMAT in ("json_schema", "json_object")
+
+def create_structured_completion(
+    messages: List[Dict[str, str]],
+    schema_name: str,
+    schema: Dict[str, Any],
+    max_tokens: int = 500,
+    client: Optional['OpenAI'] = None
+) -> str:
+    """
+    Request a JSON answer matching schema, as structured output or JSON
+    mode per XAI_RESPONSE_FORMAT, and return the message content.
+    """
+    from openai import BadRequestError
+
+    global _response_format_supported
+    response_format = None
+    if _response_format_supported:
+        if XAI_RESPONSE_FORMAT == "json_schema":
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": schema_name, "schema": schema, "strict": True}
+            }
+        else:
+            response_format = {"type": "json_object"}
+    try:
+        response = create_chat_completion(
+            messages, max_tokens=max_tokens, client=client, response_format=response_format
+        )
+    except BadRequestError as e:
+        if not response_format or 'response_format' not in str(e):
+            raise
+        print(f"Provider rejected response_format ({str(e)}). Falling back to plain text.")
+        _response_format_supported = False
+        response = create_chat_completion(messages, max_tokens=max_tokens, client=client)
+    return response.choices[0].message.content or ''
+
 def create_analysis_prompt(chapter_content: str) -> List[Dict[str, str]]:
     """
     Create the messages for the API call with the conversation analysis prompt.
@@ -100,25 +370,95 @@ Conversation:
         {"role": "user", "content": user_message}
     ]
 
-def extract_insights_from_chunk(text_chunk: str) -> dict:
+def analyzer_version(backend: Optional[str] = None) -> str:
     """
-    Analyzes a chunk of podcast transcription and extracts main points and related topics
-    using the Grok-beta API.
-    
-    Args:
-        text_chunk: String containing the transcription text to analyze
-        
-    Returns:
-        Dictionary with two keys:
-        - 'main_points': List of strings representing main talking points
-        - 'related_topics': List of strings representing related topics
+    What produces a backend's analyses, so results stored for an older
+    model or prompt version are not reused.
     """
-    # Initialize the OpenAI client with xAI's API endpoint
-    api_key = get_api_key()
-    client = OpenAI(
-        api_key=api_key,
-        base_url=XAI_API_BASE
-    )
+    backend = backend or ANALYZER_BACKEND
+    if backend == "local":
+        return "local"
+    return f"{backend}:{GROK_MODEL}:{PROMPT_VERSION}"
+
+def _cached_insights(text_chunk: str) -> Optional[dict]:
+    """Cached analysis of a chunk (single or batched), or None."""
+    cached = analysis_cache.get(cache_key(text_chunk, GROK_MODEL, PROMPT_VERSION))
+    if cached is MISSING:
+        return None
+    chunks_analyzed.inc(source='cache')
+    return {
+        'main_points': list(cached['main_points']),
+        'related_topics': list(cached['related_topics'])
+    }
+
+def _grok_client(max_wait: Optional[float] = None) -> 'OpenAI':
+    """
+    Shared client for a chunk analysis, raising AnalysisUnavailable if there
+    is none or (when max_wait is given) every call is paused for longer
+    than max_wait seconds by a Retry-After.
+    """
+    try:
+        client = get_client()
+    except Exception as e:
+        raise AnalysisUnavailable(f"Error creating Grok client: {str(e)}") from e
+
+    paused_for = rate_limiter.paused_for()
+    if max_wait is not None and paused_for > max_wait:
+        raise AnalysisUnavailable(f"Grok is rate limited for another {paused_for:.0f} seconds")
+    return client
+
+def _parse_or_repair(messages: List[Dict[str, str]], content: str, client: 'OpenAI') -> dict:
+    """
+    Parse a chunk analysis, falling back to the tolerant text parser and
+    then to one repair request that shows the model what was wrong.
+    Raises AnalysisUnavailable if nothing usable comes back, so an empty
+    result is never cached or shown as a success.
+    """
+    try:
+        return parse_insights(content)
+    except InvalidInsights as e:
+        error = e
+    result = parse_insights_text(content)
+    if result['main_points']:
+        return result
+
+    repair_messages = messages + [
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": f"""That response was invalid: {str(error)}.
+Reply with only the corrected JSON object: {{"main_points": ["..."], "related_topics": ["..."]}}"""}
+    ]
+    try:
+        repaired = create_structured_completion(
+            repair_messages, "chunk_insights", INSIGHTS_SCHEMA, client=client
+        )
+    except Exception as e:
+        raise AnalysisUnavailable(f"Error repairing chunk analysis: {str(e)}") from e
+    try:
+        return parse_insights(repaired)
+    except InvalidInsights as e:
+        result = parse_insights_text(repaired)
+        if result['main_points']:
+            return result
+        raise AnalysisUnavailable(f"Unusable chunk analysis after repair: {str(e)}") from e
+
+def analyze_chunk_with_grok(text_chunk: str, max_wait: Optional[float] = None) -> dict:
+    """
+    Analyze a chunk with Grok, serving cached analyses first.
+
+    Raises AnalysisUnavailable if there is no client, the API call fails,
+    no usable analysis comes back even after a repair request, or (when
+    max_wait is given) every call is paused for longer than max_wait
+    seconds by a Retry-After.
+    """
+    if not text_chunk.strip():
+        # e.g. a chapter of nothing but [Music] after compaction
+        return {'main_points': [], 'related_topics': []}
+    key = cache_key(text_chunk, GROK_MODEL, PROMPT_VERSION)
+    cached = _cached_insights(text_chunk)
+    if cached is not None:
+        return cached
+
+    client = _grok_client(max_wait)
     
     # Create the analysis prompt
     messages = [
@@ -131,69 +471,274 @@ Keep the output concise and focused on the most important elements."""},
 1. Main talking points (core arguments, key statements, central ideas)
 2. Related topics (connected subjects, references, tangential ideas)
 
+Respond with only a JSON object of the form:
+{{"main_points": ["..."], "related_topics": ["..."]}}
+
 Transcript chunk:
 {text_chunk}"""}
     ]
     
-    # Make the API call with retry logic
-    retry_count = 0
-    delay = INITIAL_RETRY_DELAY
+    # Make the API call (rate limited, with retries)
+    try:
+        content = create_structured_completion(messages, "chunk_insights", INSIGHTS_SCHEMA, client=client)
+    except Exception as e:
+        raise AnalysisUnavailable(f"Error analyzing chunk: {str(e)}") from e
     
-    while retry_count < MAX_RETRIES:
+    result = _parse_or_repair(messages, content, client)
+    
+    # Only successful responses are cached
+    analysis_cache.set(key, result)
+    chunks_analyzed.inc(source='grok')
+    return result
+
+def batch_chunks(
+    text_chunks: List[str],
+    max_tokens: Optional[int] = None,
+    max_chunks: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Group adjacent chunks into batches of indices whose combined size stays
+    within max_tokens, with at most max_chunks per batch. Chunks already at
+    the budget end up alone.
+    """
+    max_tokens = max_tokens or ANALYSIS_BATCH_MAX_TOKENS
+    max_chunks = max_chunks or ANALYSIS_BATCH_MAX_CHUNKS
+    batches = []
+    batch = []
+    batch_tokens = 0
+    for index, text in enumerate(text_chunks):
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) == max_chunks):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(index)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def create_batch_prompt(text_chunks: List[str]) -> List[Dict[str, str]]:
+    """Messages asking for JSON insights for several chunks, identified by index."""
+    sections = "\n\n".join(
+        f"=== Chunk {index} ===\n{text}" for index, text in enumerate(text_chunks)
+    )
+    return [
+        {"role": "system", "content": """You are an analytical summarizer focused on extracting key insights from podcast transcripts.
+For each transcript chunk you are given:
+1. Identify the main talking points - core arguments, key statements, and central ideas
+2. Extract related topics - connected subjects, references, or tangential ideas mentioned
+Keep the output concise and focused on the most important elements. Analyze every chunk on its own."""},
+        {"role": "user", "content": f"""Analyze each of the following {len(text_chunks)} podcast transcript chunks.
+Respond with only a JSON object with one entry per chunk, for example:
+{{"chunks": [{{"index": 0, "main_points": ["..."], "related_topics": ["..."]}}, {{"index": 1, "main_points": ["..."], "related_topics": ["..."]}}]}}
+
+{sections}"""}
+    ]
+
+def analyze_batch_with_grok(text_chunks: List[str], max_wait: Optional[float] = None) -> List[dict]:
+    """
+    Analyze several chunks with one Grok request and fan the results back
+    out, in input order. Cached chunks are skipped; chunks the response
+    leaves out are analyzed on their own.
+
+    Raises AnalysisUnavailable like analyze_chunk_with_grok.
+    """
+    results: List[Optional[dict]] = [_cached_insights(text) for text in text_chunks]
+    pending = [
+        index for index, result in enumerate(results)
+        if result is None and text_chunks[index].strip()
+    ]
+
+    if len(pending) > 1:
+        client = _grok_client(max_wait)
+        texts = [text_chunks[index] for index in pending]
         try:
-            response: ChatCompletion = client.chat.completions.create(
-                model="grok-beta",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-                stream=False
+            content = create_structured_completion(
+                create_batch_prompt(texts),
+                "batch_insights",
+                BATCH_INSIGHTS_SCHEMA,
+                max_tokens=ANALYSIS_BATCH_OUTPUT_TOKENS * len(texts),
+                client=client
             )
-            
-            # Parse the response to extract main points and related topics
-            content = response.choices[0].message.content
-            
-            # Initialize the result dictionary
-            result = {
-                'main_points': [],
-                'related_topics': []
-            }
-            
-            # Split the response into sections and parse
-            sections = content.split('\n\n')
-            current_section = None
-            
-            for section in sections:
-                section = section.strip()
-                if not section:
-                    continue
-                    
-                if 'main' in section.lower() or 'talking points' in section.lower():
-                    current_section = 'main_points'
-                    continue
-                elif 'related' in section.lower() or 'topics' in section.lower():
-                    current_section = 'related_topics'
-                    continue
-                
-                if current_section:
-                    # Split by bullet points or numbers
-                    points = [p.strip('- 1234567890.') for p in section.split('\n')]
-                    points = [p.strip() for p in points if p.strip()]
-                    result[current_section].extend(points)
-            
-            return result
-            
         except Exception as e:
-            if "429" in str(e) and retry_count < MAX_RETRIES - 1:
-                print(f"Rate limited. Retrying in {delay} seconds...")
-                time.sleep(delay)
-                delay *= 2  # Exponential backoff
-                retry_count += 1
-                continue
-            print(f"Error analyzing chunk: {str(e)}")
-            return {'main_points': [], 'related_topics': []}
+            raise AnalysisUnavailable(f"Error analyzing batch: {str(e)}") from e
+
+        parsed = parse_batch_insights(content, len(texts))
+        for position, insights in parsed.items():
+            index = pending[position]
+            results[index] = insights
+            analysis_cache.set(cache_key(text_chunks[index], GROK_MODEL, PROMPT_VERSION), insights)
+        chunks_analyzed.inc(len(parsed), source='grok')
+        if len(parsed) < len(texts):
+            print(f"Batch response covered {len(parsed)} of {len(texts)} chunks; analyzing the rest one by one")
+
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = analyze_chunk_with_grok(text_chunks[index], max_wait)
+    return results
+
+def extract_insights_from_chunk(text_chunk: str, backend: Optional[str] = None) -> dict:
+    """
+    Analyzes a chunk of podcast transcription and extracts main points and related topics.
+    
+    Args:
+        text_chunk: String containing the transcription text to analyze
+        backend: "grok", "local" or "auto" (default ANALYZER_BACKEND); in
+            auto mode a chunk Grok can't analyze gets local insights
+        
+    Returns:
+        Dictionary with two keys:
+        - 'main_points': List of strings representing main talking points
+        - 'related_topics': List of strings representing related topics
+        Both are empty if the chunk could not be analyzed.
+    """
+    backend = backend or ANALYZER_BACKEND
+    if backend not in ANALYZER_BACKENDS:
+        raise ValueError(f"Unknown analyzer backend: {backend}")
+    if backend == "local":
+        chunks_analyzed.inc(source='local')
+        return extract_insights_local([text_chunk])[0]
+    try:
+        return analyze_chunk_with_grok(text_chunk, LOCAL_FALLBACK_MAX_WAIT if backend == "auto" else None)
+    except AnalysisUnavailable as e:
+        if backend == "auto":
+            print(f"{str(e)}. Using local analysis.")
+            chunks_analyzed.inc(source='local')
+            return extract_insights_local([text_chunk])[0]
+        print(str(e))
+        chunks_analyzed.inc(source='failed')
+        return {'main_points': [], 'related_topics': []}
+
+def extract_insights_from_batch(text_chunks: List[str]) -> List[dict]:
+    """
+    Batched counterpart of extract_insights_from_chunk, used by the
+    pipeline: one insights dict per chunk, empty for chunks that could
+    not be analyzed.
+    """
+    try:
+        return analyze_batch_with_grok(text_chunks)
+    except AnalysisUnavailable as e:
+        print(str(e))
+        chunks_analyzed.inc(len(text_chunks), source='failed')
+        return [{'main_points': [], 'related_topics': []} for _ in text_chunks]
+
+def iter_chunk_insights(
+    text_chunks: List[str],
+    max_workers: Optional[int] = None,
+    backend: Optional[str] = None
+) -> Iterator[Tuple[int, dict]]:
+    """
+    Analyze chunks concurrently, yielding (index, insights) pairs as each
+    chunk finishes. Adjacent small chunks share one request (see
+    batch_chunks), and at most max_workers requests are in flight at once.
+
+    backend is "grok", "local" or "auto" (default ANALYZER_BACKEND). The
+    local backend analyzes every chunk in one offline pass. In auto mode,
+    chunks Grok can't analyze (no key, API errors, a long rate-limit
+    pause) get local insights instead; otherwise a chunk that fails is
+    reported with empty insights so one bad chunk doesn't take down the
+    rest of the episode. Each insights dict also says where it came from
+    in 'source': "grok" (including cached Grok results), "local" or
+    "failed".
+    """
+    if not text_chunks:
+        return
+    backend = backend or ANALYZER_BACKEND
+    if backend not in ANALYZER_BACKENDS:
+        raise ValueError(f"Unknown analyzer backend: {backend}")
+    if backend == "local":
+        chunks_analyzed.inc(len(text_chunks), source='local')
+        for index, insights in enumerate(extract_insights_local(text_chunks)):
+            yield index, dict(insights, source='local')
+        return
+
+    if backend == "auto":
+        analyze = partial(analyze_batch_with_grok, max_wait=LOCAL_FALLBACK_MAX_WAIT)
+    else:
+        analyze = extract_insights_from_batch
+    local_results = None
+
+    batches = batch_chunks(text_chunks)
+    max_workers = max_workers or ANALYSIS_MAX_WORKERS
+    executor = ThreadPoolExecutor(
+        max_workers=min(max_workers, len(batches)),
+        thread_name_prefix="grok-analysis"
+    )
+    try:
+        futures = {
+            executor.submit(analyze, [text_chunks[index] for index in batch]): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                batch_insights = future.result()
+                source = 'grok'
+            except AnalysisUnavailable as e:
+                print(f"{str(e)}. Using local analysis for chunks {batch[0]}-{batch[-1]}.")
+                if local_results is None:
+                    # One pass over the whole episode, so IDF sees every chunk
+                    local_results = extract_insights_local(text_chunks)
+                batch_insights = [local_results[index] for index in batch]
+                source = 'local'
+                chunks_analyzed.inc(len(batch), source='local')
+            except Exception as e:
+                print(f"Error analyzing chunks {batch[0]}-{batch[-1]}: {str(e)}")
+                batch_insights = [{'main_points': [], 'related_topics': []} for _ in batch]
+                source = 'failed'
+                chunks_analyzed.inc(len(batch), source='failed')
+            for index, insights in zip(batch, batch_insights):
+                yield index, dict(insights, source=source)
+    finally:
+        # Drop queued work if the caller stops consuming early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def merge_insights(analyses: List[dict]) -> dict:
+    """
+    Merge the insights of a chapter's pieces (in order) into one result,
+    dropping points and topics repeated across pieces. The source is
+    "local" or "failed" if any piece's was, "grok" otherwise.
+    """
+    merged = {'main_points': [], 'related_topics': []}
+    sources = {analysis.get('source', 'grok') for analysis in analyses}
+    for key in merged:
+        seen = set()
+        for analysis in analyses:
+            for item in analysis[key]:
+                normalized = item.strip().lower()
+                if normalized not in seen:
+                    seen.add(normalized)
+                    merged[key].append(item)
+    merged['source'] = next((source for source in ('local', 'failed') if source in sources), 'grok')
+    return merged
+
+def iter_merged_insights(
+    chunk_pieces: List[List[str]],
+    max_workers: Optional[int] = None,
+    backend: Optional[str] = None
+) -> Iterator[Tuple[int, dict]]:
+    """
+    Analyze every piece of every chunk concurrently and yield
+    (chunk_index, insights) once all pieces of a chunk have finished.
+    """
+    texts = []
+    owners = []
+    for chunk_index, pieces in enumerate(chunk_pieces):
+        for piece in pieces:
+            texts.append(piece)
+            owners.append(chunk_index)
+
+    results: Dict[int, Dict[int, dict]] = {index: {} for index in range(len(chunk_pieces))}
+    for piece_index, insights in iter_chunk_insights(texts, max_workers, backend):
+        chunk_index = owners[piece_index]
+        results[chunk_index][piece_index] = insights
+        if len(results[chunk_index]) == len(chunk_pieces[chunk_index]):
+            finished = results.pop(chunk_index)
+            yield chunk_index, merge_insights([finished[i] for i in sorted(finished)])
 
 def analyze_chapter(
-    client: OpenAI,
+    client: 'OpenAI',
     chapter: Dict[str, str],
     max_retries: int = MAX_RETRIES
 ) -> Optional[Dict[str, str]]:
@@ -203,32 +748,17 @@ def analyze_chapter(
     """
     print(f"\nAnalyzing {chapter['title']}...")
     messages = create_analysis_prompt(chapter['content'])
-    retry_count = 0
-    delay = INITIAL_RETRY_DELAY
 
-    while retry_count < max_retries:
-        try:
-            response: ChatCompletion = client.chat.completions.create(
-                model="grok-beta",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-                stream=False
-            )
-            return {
-                "title": chapter['title'],
-                "analysis": response.choices[0].message.content
-            }
+    try:
+        response = create_chat_completion(messages, client=client, max_retries=max_retries)
+    except Exception as e:
+        print(f"Error analyzing chapter: {str(e)}")
+        return None
 
-        except Exception as e:
-            if "429" in str(e) and retry_count < max_retries - 1:
-                print(f"Rate limited. Retrying in {delay} seconds...")
-                time.sleep(delay)
-                delay *= 2  # Exponential backoff
-                retry_count += 1
-                continue
-            print(f"Error analyzing chapter: {str(e)}")
-            return None
+    return {
+        "title": chapter['title'],
+        "analysis": response.choices[0].message.content
+    }
 
 def save_analysis(analyses: List[Dict[str, str]], filename: str = "analysis.txt") -> None:
     """Save the analyses to a file."""
@@ -246,12 +776,9 @@ def save_analysis(analyses: List[Dict[str, str]], filename: str = "analysis.txt"
 
 def main():
     """Main function to run the conversation analysis."""
-    # Initialize the OpenAI client with xAI's API endpoint
-    api_key = get_api_key()
-    client = OpenAI(
-        api_key=api_key,
-        base_url=XAI_API_BASE
-    )
+    # Prompt for the API key if needed, then use the shared client
+    get_api_key()
+    client = get_client()
 
     # Analyze each chapter
     analyses = []
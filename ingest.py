@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion: run fetch -> chunk -> analyze -> render for many videos.
+
+Sources may be video URLs or IDs, playlist URLs or IDs, and channel URLs
+or IDs (all of a channel's uploads), given on the command line or one per
+line in --file. Videos are processed on a pool of worker processes, with
+separate limits on how many videos may be fetching, analyzing or rendering
+at once across the pool.
+
+Progress is checkpointed in a SQLite store (--store), which also keeps each
+video's result and flow chart. Running the same command again skips the
+videos already done and retries the ones that failed or were interrupted;
+chunks finished before a crash are not re-analyzed (see manifests.py).
+
+--fetchers names a module to use instead of youtube_fetcher (it must define
+fetch_transcript, fetch_description, list_playlist_videos and
+channel_uploads_playlist), e.g. benchmarks.fake_youtube for offline runs.
+
+Usage:
+    python ingest.py https://www.youtube.com/playlist?list=PL... UC... dQw4w9WgXcQ
+    python ingest.py --file sources.txt --workers 4 --analyze-concurrency 2
+    python ingest.py --fetchers benchmarks.fake_youtube --workers 0 PLofflineplaylist01
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+INGEST_STORE_PATH = os.getenv('INGEST_STORE_PATH', '.cache/ingest.sqlite3')
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+CHANNEL_ID_RE = re.compile(r'^UC[A-Za-z0-9_-]{22}$')
+# Playlist IDs: user playlists (PL), uploads (UU), likes (LL), mixes (RD), ...
+PLAYLIST_ID_RE = re.compile(r'^(?:PL|UU|LL|FL|OL|RD)[A-Za-z0-9_-]{10,}$')
+
+
+def parse_source(source: str) -> Tuple[str, str]:
+    """
+    Classify a command-line source as ('video' | 'playlist' | 'channel', id).
+    Raises ValueError for anything unrecognized.
+    """
+    source = source.strip()
+    match = re.search(r'[?&]list=([A-Za-z0-9_-]+)', source)
+    if match and '/playlist' in source:
+        return 'playlist', match.group(1)
+    match = re.search(r'youtube\.com/channel/(UC[A-Za-z0-9_-]{22})', source)
+    if match:
+        return 'channel', match.group(1)
+    match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/|youtube\.com/v/)([^&\n?#/]+)', source)
+    if match:
+        return 'video', match.group(1)
+    if CHANNEL_ID_RE.match(source):
+        return 'channel', source
+    if PLAYLIST_ID_RE.match(source):
+        return 'playlist', source
+    if VIDEO_ID_RE.match(source):
+        return 'video', source
+    raise ValueError(f"Not a video, playlist or channel: {source}")
+
+
+class IngestStore:
+    """
+    Checkpoint and result store: one row per video with its status, and the
+    result (as returned by /get_transcript) plus SVG once it is done.
+    Only the main process writes to it.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'video_id TEXT PRIMARY KEY, source TEXT NOT NULL, status TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, error TEXT, seconds REAL, updated_at REAL NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'video_id TEXT PRIMARY KEY, analyzer TEXT NOT NULL, result TEXT NOT NULL, '
+            'svg TEXT, created_at REAL NOT NULL)'
+        )
+        self.conn.commit()
+
+    def add(self, video_ids: List[str], source: str) -> None:
+        """Register videos as pending; videos already known keep their state."""
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO videos (video_id, source, status, updated_at) VALUES (?, ?, ?, ?)',
+            [(video_id, source, PENDING, now) for video_id in video_ids]
+        )
+        self.conn.commit()
+
+    def todo(self, video_ids: List[str], max_attempts: int) -> List[str]:
+        """Videos not done yet, in the given order, that still have attempts left."""
+        rows = {
+            video_id: (status, attempts)
+            for video_id, status, attempts in self.conn.execute('SELECT video_id, status, attempts FROM videos')
+        }
+        # RUNNING means the last run stopped in the middle of the video, so it is retried
+        return [
+            video_id for video_id in video_ids
+            if rows[video_id][0] != DONE and rows[video_id][1] < max_attempts
+        ]
+
+    def mark_running(self, video_id: str) -> None:
+        self.conn.execute(
+            'UPDATE videos SET status = ?, attempts = attempts + 1, updated_at = ? WHERE video_id = ?',
+            (RUNNING, time.time(), video_id)
+        )
+        self.conn.commit()
+
+    def mark_done(self, video_id: str, analyzer: str, result: dict, svg: Optional[str], seconds: float) -> None:
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO results (video_id, analyzer, result, svg, created_at) VALUES (?, ?, ?, ?, ?)',
+            (video_id, analyzer, json.dumps(result), svg, now)
+        )
+        self.conn.execute(
+            'UPDATE videos SET status = ?, error = NULL, seconds = ?, updated_at = ? WHERE video_id = ?',
+            (DONE, seconds, now, video_id)
+        )
+        self.conn.commit()
+
+    def mark_failed(self, video_id: str, error: str) -> None:
+        self.conn.execute(
+            'UPDATE videos SET status = ?, error = ?, updated_at = ? WHERE video_id = ?',
+            (FAILED, error, time.time(), video_id)
+        )
+        self.conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM videos GROUP BY status'))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# Per-process worker state, set by init_worker
+_limits: Dict[str, Any] = {}
+
+
+def load_fetchers(module_name: Optional[str]):
+    """The fetcher module: youtube_fetcher, or a stand-in with the same functions."""
+    return importlib.import_module(module_name or 'youtube_fetcher')
+
+
+def init_worker(limits: Dict[str, Any], fetchers: Optional[str], workers: int = 1) -> None:
+    """
+    Runs once in each worker process (and in-process with --workers 0).
+    Each process has its own Grok rate limiter, so it gets 1/workers of
+    XAI_REQUESTS_PER_MINUTE and XAI_TOKENS_PER_MINUTE.
+    """
+    _limits.update(limits)
+    if workers > 1:
+        import grok_analyzer
+        grok_analyzer.rate_limiter.set_quota(
+            grok_analyzer.XAI_REQUESTS_PER_MINUTE / workers,
+            grok_analyzer.XAI_TOKENS_PER_MINUTE / workers
+        )
+    if fetchers:
+        # run_pipeline looks these up on the app module
+        import app
+        module = load_fetchers(fetchers)
+        app.fetch_transcript = module.fetch_transcript
+        app.fetch_description = module.fetch_description
+
+
+def process_video(video_id: str, analyzer: str, layout: str, render: bool) -> Tuple[dict, Optional[str], float]:
+    """
+    Fetch, chunk, analyze and (optionally) render one video, holding each
+    stage's semaphore while it runs. Returns (result, svg, seconds).
+    """
+    import app
+    from flow_chart import render_flow_chart, choose_layout
+
+    started_at = time.perf_counter()
+    result = None
+    # run_pipeline only does work when asked for its next event, so the
+    # semaphores gate its stages: fetch and chunk run up to the 'transcript'
+    # event, the analysis after it
+    with closing(app.run_pipeline(video_id, analyzer)) as events:
+        with _limits['fetch']:
+            event = next(events)
+        result = event
+        topics = []
+        with _limits['analyze']:
+            for event in events:
+                if event['type'] == 'done':
+                    topics = event['topics']
+
+    chunks = result['transcript_chunks']
+    svg = None
+    if render and chunks:
+        layout = choose_layout(chunks, layout)
+        with _limits['render']:
+            output, used_layout = render_flow_chart(chunks, layout)
+        svg = output.decode('utf-8')
+        # Also serve it from the web app's chart cache
+        app.store_chart(chunks, layout, output, used_layout)
+
+    return {
+        'success': True,
+        'transcript': result['transcript'],
+        'chapters': result['chapters'],
+        'transcript_chunks': chunks,
+        'compaction': result['compaction'],
+        'reused_chunks': result['reused_chunks'],
+        'topics': topics
+    }, svg, time.perf_counter() - started_at
+
+
+def expand_sources(sources: List[str], fetchers) -> List[Tuple[str, List[str]]]:
+    """Resolve each source to (source, [video IDs]); playlists and channels cost API calls."""
+    expanded = []
+    for source in sources:
+        kind, source_id = parse_source(source)
+        if kind == 'video':
+            video_ids = [source_id]
+        elif kind == 'playlist':
+            video_ids = fetchers.list_playlist_videos(source_id)
+        else:
+            playlist_id = fetchers.channel_uploads_playlist(source_id)
+            if not playlist_id:
+                print(f"Channel not found: {source_id}")
+                continue
+            video_ids = fetchers.list_playlist_videos(playlist_id)
+        print(f"{source}: {len(video_ids)} videos")
+        expanded.append((source, video_ids))
+    return expanded
+
+
+def run(args) -> Dict[str, int]:
+    """Ingest every video from args.sources; returns counts by final status."""
+    sources = list(args.sources)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            sources.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+    store = IngestStore(args.store)
+    try:
+        video_ids = []
+        for source, ids in expand_sources(sources, load_fetchers(args.fetchers)):
+            store.add(ids, source)
+            video_ids.extend(video_id for video_id in ids if video_id not in video_ids)
+        todo = store.todo(video_ids, args.max_attempts)
+        print(f"{len(video_ids)} videos, {len(video_ids) - len(todo)} already done or out of attempts, "
+              f"{len(todo)} to process")
+        if todo:
+            process_all(store, todo, args)
+        return store.counts()
+    finally:
+        store.close()
+
+
+def process_all(store: IngestStore, todo: List[str], args) -> None:
+    context = multiprocessing.get_context(args.start_method)
+    limits = {
+        'fetch': context.BoundedSemaphore(args.fetch_concurrency),
+        'analyze': context.BoundedSemaphore(args.analyze_concurrency),
+        'render': context.BoundedSemaphore(args.render_concurrency)
+    }
+    render = not args.no_render
+    started_at = time.perf_counter()
+    finished = 0
+
+    def report(video_id, outcome):
+        elapsed = time.perf_counter() - started_at
+        rate = finished / elapsed * 3600 if elapsed else 0.0
+        print(f"[{finished}/{len(todo)}] {video_id} {outcome} ({rate:.1f} videos/hour)")
+
+    def record(video_id, future_or_call):
+        nonlocal finished
+        try:
+            result, svg, seconds = future_or_call()
+        except Exception as e:
+            finished += 1
+            store.mark_failed(video_id, f'{type(e).__name__}: {str(e)}')
+            report(video_id, f'failed: {str(e)}')
+            return
+        finished += 1
+        store.mark_done(video_id, args.analyzer, result, svg, seconds)
+        report(video_id, f'done in {seconds:.1f}s, {len(result["transcript_chunks"])} chunks, '
+                         f'{len(result["reused_chunks"])} reused')
+
+    if args.workers == 0:
+        # Everything in this process; handy for debugging and for tests that patch fetchers
+        init_worker(limits, args.fetchers)
+        for video_id in todo:
+            store.mark_running(video_id)
+            record(video_id, lambda: process_video(video_id, args.analyzer, args.layout, render))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(limits, args.fetchers, args.workers)
+        ) as executor:
+            # Keep a bounded number of videos queued so a crash leaves few RUNNING rows
+            queue = iter(todo)
+            running = {}
+            for video_id in queue:
+                store.mark_running(video_id)
+                running[executor.submit(process_video, video_id, args.analyzer, args.layout, render)] = video_id
+                if len(running) >= args.workers * 2:
+                    break
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(running.pop(future), future.result)
+                    video_id = next(queue, None)
+                    if video_id is not None:
+                        store.mark_running(video_id)
+                        running[executor.submit(
+                            process_video, video_id, args.analyzer, args.layout, render
+                        )] = video_id
+
+    elapsed = time.perf_counter() - started_at
+    print(f"Processed {finished} videos in {elapsed / 60:.1f} min "
+          f"({finished / elapsed * 3600 if elapsed else 0.0:.1f} videos/hour)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('sources', nargs='*', help='video, playlist or channel URLs or IDs')
+    parser.add_argument('--file', help='file with one source per line')
+    parser.add_argument('--store', default=INGEST_STORE_PATH, help='SQLite checkpoint and result store')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='worker processes (0 runs everything in this process)')
+    parser.add_argument('--fetch-concurrency', type=int, default=4, help='videos fetching at once')
+    parser.add_argument('--analyze-concurrency', type=int, default=2,
+                        help='videos being analyzed at once (the Grok RPM/TPM limits are split evenly '
+                             'between worker processes)')
+    parser.add_argument('--render-concurrency', type=int, default=2, help='Graphviz renders at once')
+    parser.add_argument('--analyzer', default=None, choices=('grok', 'local', 'auto'))
+    parser.add_argument('--layout', default='auto', help='flow chart layout')
+    parser.add_argument('--no-render', action='store_true', help="don't render flow charts")
+    parser.add_argument('--max-attempts', type=int, default=3, help='give up on a video after this many tries')
+    parser.add_argument('--fetchers', help='module to use instead of youtube_fetcher')
+    parser.add_argument('--start-method', default='spawn', choices=multiprocessing.get_all_start_methods())
+    args = parser.parse_args(argv)
+    if not args.sources and not args.file:
+        parser.error('give at least one source or --file')
+
+    if args.analyzer is None:
+        from grok_analyzer import ANALYZER_BACKEND
+        args.analyzer = ANALYZER_BACKEND
+    return args
+
+
+def main():
+    counts = run(parse_args())
+    print(', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if counts.get(FAILED):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Parsing and validation of Grok insight responses.
+
+Responses are requested as JSON ({"main_points": [...], "related_topics":
+[...]}, or a "chunks" list of those for batches). parse_insights validates
+that shape strictly so a bad answer can be sent back for one repair;
+parse_insights_text is a tolerant fallback for providers without JSON
+mode that reads "Main points" / "Related topics" sections of plain text.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+INSIGHT_FIELDS = ('main_points', 'related_topics')
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# JSON schema for a single chunk's insights (structured output mode)
+INSIGHTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "main_points": _STRING_LIST,
+        "related_topics": _STRING_LIST
+    },
+    "required": list(INSIGHT_FIELDS),
+    "additionalProperties": False
+}
+
+# JSON schema for a batch: one entry per chunk, identified by its index
+BATCH_INSIGHTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "chunks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "main_points": _STRING_LIST,
+                    "related_topics": _STRING_LIST
+                },
+                "required": ["index", *INSIGHT_FIELDS],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["chunks"],
+    "additionalProperties": False
+}
+
+# "- point", "* point", "• point", "1. point", "2) point"
+BULLET_RE = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s+')
+RELATED_HEADING_RE = re.compile(r'\b(related|topics?|themes?)\b', re.IGNORECASE)
+MAIN_HEADING_RE = re.compile(r'\b(main|key|talking|points?|ideas|takeaways)\b', re.IGNORECASE)
+MAX_HEADING_WORDS = 5
+
+
+class InvalidInsights(ValueError):
+    """Raised when a response doesn't match the expected insights shape."""
+
+
+def extract_json(content: str) -> Any:
+    """Decode the JSON object in a response, ignoring code fences or chatter around it."""
+    start = content.find('{')
+    end = content.rfind('}')
+    if start == -1 or end < start:
+        raise InvalidInsights("response contains no JSON object")
+    try:
+        return json.loads(content[start:end + 1])
+    except ValueError as e:
+        raise InvalidInsights(f"response is not valid JSON ({str(e)})") from e
+
+
+def validate_insights(data: Any) -> Dict[str, List[str]]:
+    """Check one insights object and return it with items stripped."""
+    if not isinstance(data, dict):
+        raise InvalidInsights("expected a JSON object")
+    insights = {}
+    for field in INSIGHT_FIELDS:
+        items = data.get(field)
+        if not isinstance(items, list):
+            raise InvalidInsights(f'"{field}" must be a list of strings')
+        if not all(isinstance(item, str) for item in items):
+            raise InvalidInsights(f'"{field}" must only contain strings')
+        insights[field] = [item.strip() for item in items if item.strip()]
+    if not insights['main_points']:
+        raise InvalidInsights('"main_points" is empty')
+    return insights
+
+
+def parse_insights(content: str) -> Dict[str, List[str]]:
+    """Strictly parse a single-chunk JSON response, raising InvalidInsights."""
+    return validate_insights(extract_json(content or ''))
+
+
+def parse_batch_insights(content: str, count: int) -> Dict[int, Dict[str, List[str]]]:
+    """
+    Parse a batch response into {index: insights}. Entries that are
+    missing, out of range or invalid are left out so the caller can retry
+    those chunks alone. Objects keyed by index are accepted too.
+    """
+    try:
+        data = extract_json(content or '')
+    except InvalidInsights:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    if isinstance(data.get('chunks'), list):
+        entries = [
+            (entry.get('index'), entry)
+            for entry in data['chunks'] if isinstance(entry, dict)
+        ]
+    else:
+        entries = list(data.items())
+
+    results = {}
+    for key, value in entries:
+        try:
+            index = int(str(key).strip())
+        except ValueError:
+            continue
+        if not 0 <= index < count:
+            continue
+        try:
+            results[index] = validate_insights(value)
+        except InvalidInsights:
+            continue
+    return results
+
+
+def parse_insights_text(content: str) -> Dict[str, List[str]]:
+    """
+    Tolerant parser for plain-text answers: lines under a "main points"
+    heading are points, lines under a "related topics" / "themes" heading
+    are topics. Leading bullets and list numbers are removed, but digits
+    inside a point are kept.
+    """
+    result = {'main_points': [], 'related_topics': []}
+    try:
+        # The model may have answered in JSON even without JSON mode
+        data = extract_json(content or '')
+    except InvalidInsights:
+        data = None
+    if isinstance(data, dict) and any(isinstance(data.get(field), list) for field in INSIGHT_FIELDS):
+        for field in INSIGHT_FIELDS:
+            items = data.get(field)
+            if isinstance(items, list):
+                result[field] = [item.strip() for item in items if isinstance(item, str) and item.strip()]
+        return result
+
+    current_section = None
+    for line in (content or '').splitlines():
+        line = line.strip().replace('**', '').replace('__', '')
+        if not line:
+            continue
+        section = _heading_section(line)
+        if section:
+            current_section = section
+            continue
+        if current_section:
+            point = BULLET_RE.sub('', line).strip()
+            if point:
+                result[current_section].append(point)
+    return result
+
+
+def _heading_section(line: str) -> Optional[str]:
+    """The section a heading line starts ("main_points" / "related_topics"), or None."""
+    bulleted = bool(BULLET_RE.match(line))
+    text = BULLET_RE.sub('', line.lstrip('#')).strip()
+    # A bulleted line is only a heading if it ends with a colon ("1. Main points:")
+    if bulleted and not text.endswith(':'):
+        return None
+    text = text.rstrip(':').strip()
+    if not text or len(text.split()) > MAX_HEADING_WORDS:
+        return None
+    if RELATED_HEADING_RE.search(text):
+        return 'related_topics'
+    if MAIN_HEADING_RE.search(text):
+        return 'main_points'
+    return None
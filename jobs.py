@@ -0,0 +1,310 @@
+"""
+Background job queue for long-running video analyses.
+
+Jobs run on a bounded thread pool so web workers can return a job ID right
+away. Submitting a job with the same key as one that is still queued or
+running returns the existing job instead of starting a duplicate.
+
+Job state and results live in a SQLiteJobStore (one WAL-mode SQLite file,
+like the single-flight store), so under several app workers any of them
+can report, return or cancel a job that another one runs, and duplicate
+submissions are caught across workers. The worker running a job renews
+its heartbeat; a queued or running job whose heartbeat goes stale (its
+worker died) is reported as failed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Seconds between checks of the store for a cancellation requested by another worker
+CANCEL_CHECK_INTERVAL = 1.0
+WORKER_LOST = 'The worker running this job went away'
+
+COLUMNS = (
+    'id', 'key', 'status', 'completed', 'total', 'result', 'error',
+    'created_at', 'updated_at', 'heartbeat_at', 'cancel_requested'
+)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function once cancellation has been requested."""
+
+
+class SQLiteJobStore:
+    """Job rows in one SQLite file shared by every worker process (or ':memory:')."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing a module never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit, so claim() can take the write lock up front with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL,'
+                ' completed INTEGER NOT NULL, total INTEGER NOT NULL, result TEXT, error TEXT,'
+                ' created_at REAL NOT NULL, updated_at REAL NOT NULL, heartbeat_at REAL NOT NULL,'
+                ' cancel_requested INTEGER NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);'
+            )
+            self._conn = conn
+        return self._conn
+
+    def claim(self, key: str, job_id: str, lease: float, retention: float) -> Optional[dict]:
+        """
+        Record a new queued job under key, unless a live one (queued or
+        running, not cancelled, heartbeat within lease) exists: that job's
+        row is returned instead.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if now - self._purged_at > 60:
+                    conn.execute(
+                        f'DELETE FROM jobs WHERE status IN ({",".join("?" * len(FINISHED_STATES))}) '
+                        'AND updated_at < ?',
+                        (*FINISHED_STATES, now - retention)
+                    )
+                    self._purged_at = now
+                row = conn.execute(
+                    f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE key = ? AND status IN (?, ?) '
+                    'AND cancel_requested = 0 AND heartbeat_at >= ? ORDER BY created_at DESC LIMIT 1',
+                    (key, *ACTIVE_STATES, now - lease)
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        f'INSERT INTO jobs ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})',
+                        (job_id, key, QUEUED, 0, 0, None, None, now, now, now, 0)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def get(self, job_id: str, lease: float) -> Optional[dict]:
+        """A job's row; an active job whose heartbeat is older than lease is marked failed."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? '
+                'WHERE id = ? AND status IN (?, ?) AND heartbeat_at < ?',
+                (FAILED, WORKER_LOST, now, job_id, *ACTIVE_STATES, now - lease)
+            )
+            row = conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._connect().execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id)
+            )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connect().executemany(
+                'UPDATE jobs SET heartbeat_at = ? WHERE id = ?', [(now, job_id) for job_id in job_ids]
+            )
+
+    def request_cancel(self, job_id: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                'UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)',
+                (job_id, *ACTIVE_STATES)
+            )
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+
+class Job:
+    """State of a single background job, as stored; jobs run in this process also accept updates."""
+
+    def __init__(self, row: dict, store: Optional[SQLiteJobStore] = None):
+        self.id = row['id']
+        self.key = row['key']
+        self.status = row['status']
+        self.completed = row['completed']
+        self.total = row['total']
+        self.result: Any = json.loads(row['result']) if row['result'] is not None else None
+        self.error: Optional[str] = row['error']
+        self.created_at = row['created_at']
+        self.updated_at = row['updated_at']
+        self._store = store
+        self._cancel_event = threading.Event()
+        if row['cancel_requested']:
+            self._cancel_event.set()
+        self._cancel_checked_at = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        if not self._cancel_event.is_set() and self._store is not None:
+            # Another worker may have cancelled it; the store is checked at most once a second
+            now = time.time()
+            if now - self._cancel_checked_at >= CANCEL_CHECK_INTERVAL:
+                self._cancel_checked_at = now
+                if self._store.cancel_requested(self.id):
+                    self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Called by job functions at safe points to stop early."""
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def set_progress(self, completed: int, total: int) -> None:
+        self.completed = completed
+        self.total = total
+        self.updated_at = time.time()
+        if self._store is not None:
+            self._store.update(self.id, completed=completed, total=total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'key': self.key,
+            'status': self.status,
+            'progress': {'completed': self.completed, 'total': self.total},
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class _Heartbeat(threading.Thread):
+    """Renews the heartbeats of the jobs this process is running or has queued."""
+
+    def __init__(self, manager: 'JobManager', interval: float):
+        super().__init__(name='job-heartbeat', daemon=True)
+        self.manager = manager
+        self.interval = interval
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self.manager._lock:
+                job_ids = list(self.manager._local)
+            if not job_ids:
+                continue
+            try:
+                self.manager.store.heartbeat(job_ids)
+            except sqlite3.Error as e:
+                print(f"Warning: job heartbeat failed: {str(e)}")
+
+
+class JobManager:
+    """Runs job functions on a worker pool and tracks their state in a shared store."""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        retention: float = 3600,
+        store: Optional[SQLiteJobStore] = None,
+        lease: float = 30
+    ):
+        self.retention = retention
+        self.lease = lease
+        self.store = store or SQLiteJobStore(':memory:')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        # Jobs queued or running in this process
+        self._local: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[_Heartbeat] = None
+
+    def submit(self, key: str, fn: Callable[[Job], Any]) -> Job:
+        """
+        Queue fn(job) to run in the background. If a job with the same key
+        is still queued or running (in any worker), that job is returned
+        instead.
+        """
+        job_id = uuid.uuid4().hex
+        existing = self.store.claim(key, job_id, self.lease, self.retention)
+        if existing is not None:
+            with self._lock:
+                return self._local.get(existing['id']) or Job(existing)
+        job = Job(self.store.get(job_id, self.lease), self.store)
+        with self._lock:
+            self._local[job.id] = job
+            if self._heartbeat is None:
+                self._heartbeat = _Heartbeat(self, self.lease / 3)
+                self._heartbeat.start()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self.store.get(job_id, self.lease)
+        return Job(row) if row is not None else None
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation. Queued jobs never start; running jobs stop at their next check."""
+        with self._lock:
+            local = self._local.get(job_id)
+        if local is not None:
+            local._cancel_event.set()
+        self.store.request_cancel(job_id)
+        return self.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        fields: Dict[str, Any] = {'status': FAILED, 'error': 'Job was interrupted'}
+        try:
+            job.raise_if_cancelled()
+            job.status = RUNNING
+            self.store.update(job.id, status=RUNNING)
+            result = fn(job)
+            job.raise_if_cancelled()
+            fields = {'status': SUCCEEDED, 'result': json.dumps(result)}
+            job.result = result
+        except JobCancelled:
+            fields = {'status': CANCELLED}
+        except Exception as e:
+            fields = {'status': FAILED, 'error': str(e)}
+            job.error = str(e)
+        finally:
+            job.status = fields['status']
+            job.updated_at = time.time()
+            try:
+                self.store.update(job.id, **fields)
+            except sqlite3.Error as e:
+                print(f"Warning: failed to record the outcome of job {job.id}: {str(e)}")
+            with self._lock:
+                self._local.pop(job.id, None)
@@ -0,0 +1,184 @@
+"""
+Offline insight extraction with TF-IDF.
+
+Produces the same {'main_points', 'related_topics'} shape as the Grok
+analyzer without any network calls:
+
+- related topics are each chunk's highest-weighted TF-IDF unigrams and
+  bigrams, with IDF computed across all chunks of the episode
+- main points are the sentences closest to their chunk's TF-IDF vector
+  (extractive summarization), skipping near-duplicates
+
+All chunks of an episode are vectorized in one pass, so a whole episode
+takes well under a second. numpy and scikit-learn are imported on first
+use, since they are slow to import and only needed when this backend runs.
+"""
+
+import os
+import re
+from typing import List
+
+LOCAL_MAX_POINTS = int(os.getenv('LOCAL_MAX_POINTS', '4'))
+LOCAL_MAX_TOPICS = int(os.getenv('LOCAL_MAX_TOPICS', '6'))
+# Sentence length bounds in words (see _sentences)
+MAX_SENTENCE_WORDS = 40
+TARGET_SENTENCE_WORDS = 15
+MIN_SENTENCE_WORDS = 6
+BIGRAM_BOOST = 1.5
+# Sentences more similar than this to an already chosen point are skipped
+REDUNDANCY_THRESHOLD = 0.5
+
+# Conversational filler that TF-IDF would otherwise love in podcast speech
+FILLER_WORDS = {
+    'um', 'uh', 'yeah', 'okay', 'ok', 'like', 'know', 'just', 'really', 'gonna',
+    'wanna', 'gotta', 'kinda', 'sorta', 'actually', 'basically', 'literally',
+    'right', 'mean', 'thing', 'things', 'stuff', 'lot', 'going', 'think', 'say',
+    'said', 'music', 'applause', 'laughter', 'oh', 'hey', 'got', 'get', 'don',
+    've', 'll', 're', 'didn', 'doesn', 'isn', 'let', 'sure', 'want', 'guys'
+}
+
+# Dropped from extracted sentences
+HESITATIONS = {'um', 'uh', 'erm', 'hmm', 'mm'}
+
+NON_SPEECH_RE = re.compile(r'\[[^\]]*\]')
+TOKEN_PATTERN = r"(?u)\b[a-zA-Z][a-zA-Z-]+\b"
+
+
+def _sentences(text: str) -> List[str]:
+    """
+    Split text into sentences. Auto-captions are mostly unpunctuated, so
+    caption line breaks also end a sentence once it is long enough, and
+    runs without any break are cut at MAX_SENTENCE_WORDS.
+    """
+    sentences = []
+    words = []
+
+    def flush():
+        if len(words) >= MIN_SENTENCE_WORDS:
+            sentences.append(' '.join(words))
+        words.clear()
+
+    for line in NON_SPEECH_RE.sub(' ', text).split('\n'):
+        for word in line.split():
+            if word.lower().strip(',.') in HESITATIONS:
+                continue
+            words.append(word)
+            if word[-1] in '.!?' or len(words) >= MAX_SENTENCE_WORDS:
+                flush()
+        if len(words) >= TARGET_SENTENCE_WORDS:
+            flush()
+    flush()
+    return sentences
+
+
+def _pick_topics(terms, weights, max_topics: int) -> List[str]:
+    """
+    Pick the highest-weighted terms, preferring a bigram over the unigrams
+    it contains ("language models" rather than "language" and "models").
+    """
+    import numpy as np
+
+    # Bigrams are rarer than their words, so give them a head start
+    boosted = weights * np.array([BIGRAM_BOOST if ' ' in term else 1.0 for term in terms])
+    topics = []
+    for term_index in np.argsort(-boosted):
+        term = terms[term_index]
+        words = term.split()
+        if len(words) == 1:
+            if any(term in topic.split() for topic in topics):
+                continue
+            topics.append(term)
+        else:
+            covered = [topic for topic in topics if topic in words]
+            if any(len(topic.split()) > 1 and set(words) & set(topic.split()) for topic in topics):
+                continue
+            if covered:
+                # Upgrade the unigram already chosen to this bigram
+                topics[topics.index(covered[0])] = term
+                for topic in covered[1:]:
+                    topics.remove(topic)
+            else:
+                topics.append(term)
+        if len(topics) == max_topics:
+            break
+    return topics
+
+
+def extract_insights_local(
+    text_chunks: List[str],
+    max_points: int = LOCAL_MAX_POINTS,
+    max_topics: int = LOCAL_MAX_TOPICS
+) -> List[dict]:
+    """
+    Extract main points and related topics for every chunk of an episode.
+
+    Returns one {'main_points', 'related_topics'} dict per chunk, in order.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
+
+    results = [{'main_points': [], 'related_topics': []} for _ in text_chunks]
+    if not text_chunks:
+        return results
+
+    vectorizer = TfidfVectorizer(
+        stop_words=list(ENGLISH_STOP_WORDS | FILLER_WORDS),
+        token_pattern=TOKEN_PATTERN,
+        ngram_range=(1, 2),
+        sublinear_tf=True,
+        # With only a couple of chunks every term is "common"; keep them all
+        max_df=0.9 if len(text_chunks) > 2 else 1.0
+    )
+    try:
+        chunk_matrix = vectorizer.fit_transform(
+            [NON_SPEECH_RE.sub(' ', text) for text in text_chunks]
+        ).tocsr()
+    except ValueError:
+        # Nothing but stop words
+        return results
+    terms = vectorizer.get_feature_names_out()
+
+    # Related topics: top-weighted terms per chunk
+    for index in range(len(text_chunks)):
+        row = chunk_matrix.getrow(index)
+        topics = _pick_topics(terms[row.indices], row.data, max_topics)
+        results[index]['related_topics'] = [topic.capitalize() for topic in topics]
+
+    # Main points: score every sentence of every chunk against its own chunk
+    # vector in one sparse operation
+    sentences = []
+    owners = []
+    for index, text in enumerate(text_chunks):
+        for sentence in _sentences(text):
+            sentences.append(sentence)
+            owners.append(index)
+    if not sentences:
+        return results
+
+    sentence_matrix = vectorizer.transform(sentences).tocsr()
+    owners = np.asarray(owners)
+    scores = np.asarray(sentence_matrix.multiply(chunk_matrix[owners]).sum(axis=1)).ravel()
+
+    order = np.lexsort((-scores, owners))
+    start = 0
+    while start < len(order):
+        index = owners[order[start]]
+        end = start
+        while end < len(order) and owners[order[end]] == index:
+            end += 1
+        chosen = []
+        for sentence_index in order[start:end]:
+            if scores[sentence_index] <= 0:
+                break
+            if chosen:
+                similarity = sentence_matrix[chosen].dot(sentence_matrix[sentence_index].T).max()
+                if similarity > REDUNDANCY_THRESHOLD:
+                    continue
+            chosen.append(sentence_index)
+            if len(chosen) == max_points:
+                break
+        # Keep the points in the order they were said
+        results[index]['main_points'] = [sentences[i] for i in sorted(chosen)]
+        start = end
+
+    return results
@@ -0,0 +1,128 @@
+"""
+Per-video analysis manifests for incremental re-analysis.
+
+A manifest records, for each chunk of the last analysis of a video, its
+boundaries, a hash of the text that was sent to the analyzer and the
+insights that came back. When the video is submitted again (typically
+after the creator fixed a chapter timestamp), chunks whose hash is
+unchanged reuse the stored insights, so only the chapters around the edit
+are analyzed again. Hashes are matched regardless of position, so
+inserting or removing a chapter doesn't invalidate the ones after it.
+
+Manifests are stored per (video, analyzer version); a new model or prompt
+version starts from scratch. Each chunk also records where its insights
+came from, and only Grok results are kept: a chunk that fell back to local
+analysis during an outage is analyzed by Grok again next time. Local
+results are never reused at all, because the local analyzer weighs terms
+against the whole episode (TF-IDF), so analyzing only the changed chunks
+would leave it with too few documents to tell them apart; it is cheap
+enough to rerun over every chunk.
+"""
+
+import os
+import time
+from typing import Dict, List, Optional
+
+import metrics
+from cache import LRUCache, SQLiteCache, TieredCache, MISSING, cache_key
+
+MANIFEST_CACHE_PATH = os.getenv(
+    'MANIFEST_CACHE_PATH', os.getenv('ANALYSIS_CACHE_PATH', '.cache/analysis.sqlite3')
+)
+MANIFEST_TTL = float(os.getenv('MANIFEST_TTL', str(30 * 24 * 3600)))  # seconds
+
+manifest_cache = TieredCache(
+    LRUCache(max_entries=256, ttl=MANIFEST_TTL),
+    SQLiteCache(
+        MANIFEST_CACHE_PATH,
+        table='video_manifests',
+        ttl=MANIFEST_TTL
+    ) if MANIFEST_CACHE_PATH else None
+)
+metrics.register_cache('manifests', manifest_cache)
+chunks_reused = metrics.counter(
+    'podcast_chunks_reused_total',
+    'Chunks whose stored insights were reused because their text was unchanged'
+)
+
+
+def _keeps(source: str) -> bool:
+    """Whether insights from source may be stored and reused (see the module docstring)."""
+    return source == 'grok'
+
+
+def chunk_hash(pieces: List[str]) -> str:
+    """Hash of the text a chunk sends to the analyzer (after compaction)."""
+    return cache_key(*pieces)
+
+
+def load_manifest(video_id: str, version: str) -> Optional[dict]:
+    """The manifest of the last analysis of a video with this version, or None."""
+    manifest = manifest_cache.get(f'{video_id}:{version}')
+    return None if manifest is MISSING else manifest
+
+
+def reusable_insights(manifest: Optional[dict], hashes: List[str]) -> Dict[int, dict]:
+    """
+    Stored insights for the chunks (by index into hashes) whose text is
+    unchanged since the analysis recorded in manifest. Entries without a
+    Grok source (see _keeps) are ignored.
+    """
+    if not manifest:
+        return {}
+    stored = {
+        chunk['hash']: chunk
+        for chunk in manifest['chunks']
+        if _keeps(chunk.get('source', ''))
+    }
+    reused = {}
+    for index, digest in enumerate(hashes):
+        chunk = stored.get(digest)
+        if chunk is not None:
+            reused[index] = {
+                'main_points': list(chunk['main_points']),
+                'related_topics': list(chunk['related_topics']),
+                'source': chunk['source']
+            }
+    chunks_reused.inc(len(reused))
+    return reused
+
+
+def save_manifest(
+    video_id: str,
+    version: str,
+    chapters: List[dict],
+    chunks: List[dict],
+    hashes: List[str],
+    sources: List[str]
+) -> None:
+    """
+    Record the chunks of a finished analysis. sources says where each
+    chunk's insights came from ('grok', 'local' or 'failed'). Chunks
+    without insights, or with local insights (see _keeps), are left out so
+    they are analyzed again next time.
+    """
+    manifest_cache.set(f'{video_id}:{version}', {
+        'chapters': chapters,
+        'chunks': [
+            {
+                'hash': digest,
+                'source': source,
+                'chapter': chunk['chapter'],
+                'start': chunk['start'],
+                'end': chunk['end'],
+                'main_points': chunk.get('main_points') or [],
+                'related_topics': chunk.get('related_topics') or []
+            }
+            for chunk, digest, source in zip(chunks, hashes, sources)
+            if (chunk.get('main_points') or chunk.get('related_topics')) and _keeps(source)
+        ],
+        'updated_at': time.time()
+    })
+
+
+def changed_chapters(old: Optional[List[dict]], new: List[dict]) -> int:
+    """Number of chapters added, removed, retimed or renamed between two lists."""
+    old_set = {(chapter['time'], chapter['title']) for chapter in old or []}
+    new_set = {(chapter['time'], chapter['title']) for chapter in new}
+    return len(old_set ^ new_set)
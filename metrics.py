@@ -0,0 +1,361 @@
+"""
+Pipeline metrics, exposed in the Prometheus text format at /metrics.
+
+- Counter: monotonically increasing totals (LLM calls, 429s, tokens, ...)
+- Histogram: latency distributions with fixed buckets
+- Gauge: values read from a callback when /metrics is scraped (cache hit
+  counters, rate limiter state), so hot paths pay nothing for them
+- Timings: per-request stage timer that also feeds the stage histogram and
+  can log one JSON line per request (METRICS_LOG_TIMINGS=1)
+
+With METRICS_ENABLED=0 every metric is a shared no-op object, so the
+instrumented code costs a method call and nothing else.
+
+Metrics live in the worker process; with several app workers each one
+reports its own numbers.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+# Print one JSON line with the stage timings of every pipeline run
+METRICS_LOG_TIMINGS = os.getenv('METRICS_LOG_TIMINGS', '0') == '1'
+
+# Seconds; spans a cached stage (~1 ms) up to a slow Graphviz render or LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Name, help text and label names shared by every metric type."""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}'
+        ] + self._samples()
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # Per label set: [per-bucket counts (not cumulative), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the block takes, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[float, int]]:
+        """(sum, count) per label value tuple, e.g. to diff around a benchmark run."""
+        with self._lock:
+            return {key: (total, count) for key, (_, total, count) in self._values.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            )
+        lines = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Read at scrape time from callback, which returns a number or a dict
+    mapping label value tuples to numbers. type_name may be 'counter' for
+    totals kept elsewhere (e.g. TieredCache.stats()).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Tuple[str, ...] = (),
+        type_name: str = 'gauge'
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type_name = type_name
+
+    def _samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Warning: metric {self.name} failed: {str(e)}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+
+class _NoopMetric:
+    """Stands in for every metric type when metrics are disabled."""
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        pass
+
+    def observe(self, value: float, **labels: str) -> None:
+        pass
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        yield
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[float, int]]:
+        return {}
+
+
+_NOOP = _NoopMetric()
+
+
+class Registry:
+    """Holds the process's metrics in registration order."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric):
+        if not self.enabled:
+            return _NOOP
+        with self._lock:
+            # Re-registering (e.g. a module reloaded in development) returns the original
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        labelnames: Tuple[str, ...] = (),
+        type_name: str = 'gauge'
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, callback, labelnames, type_name))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(enabled=METRICS_ENABLED)
+counter = registry.counter
+histogram = registry.histogram
+gauge = registry.gauge
+render = registry.render
+
+stage_seconds = histogram(
+    'podcast_stage_seconds',
+    'Time spent in each pipeline stage',
+    ('stage',)
+)
+
+
+# Several caches share the cache metrics, so their callbacks are chained
+_cache_lookups: List[Callable[[], dict]] = []
+_cache_entries: List[Callable[[], dict]] = []
+
+
+def _merge(callbacks: List[Callable[[], dict]]) -> Callable[[], dict]:
+    def collect():
+        merged = {}
+        for callback in callbacks:
+            merged.update(callback())
+        return merged
+    return collect
+
+
+def register_cache(name: str, cache) -> None:
+    """Export a TieredCache's lookup counters and memory size under cache=name."""
+    if not METRICS_ENABLED:
+        return
+
+    def lookups():
+        stats = cache.stats()
+        return {
+            (name, result): stats[stat]
+            for result, stat in (('memory_hit', 'memory_hits'), ('disk_hit', 'disk_hits'), ('miss', 'misses'))
+        }
+
+    _cache_lookups.append(lookups)
+    _cache_entries.append(lambda: {(name,): len(cache.memory)})
+
+
+gauge(
+    'podcast_cache_lookups_total',
+    'Cache lookups by cache and result (memory_hit, disk_hit, miss)',
+    _merge(_cache_lookups),
+    ('cache', 'result'),
+    type_name='counter'
+)
+gauge(
+    'podcast_cache_memory_entries',
+    'Entries held in each cache\'s memory tier',
+    _merge(_cache_entries),
+    ('cache',)
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage outside a pipeline run (e.g. a chart render)."""
+    with stage_seconds.time(stage=name):
+        yield
+
+
+class Timings:
+    """
+    Stage timings of one pipeline run. A stage entered several times (e.g.
+    once per step of a generator) adds up; log() observes each stage's
+    total in podcast_stage_seconds and prints them as one JSON line when
+    METRICS_LOG_TIMINGS is set. Stages timed on other threads (e.g. the
+    transcript fetch) may overlap.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.stages: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def log(self, outcome: str = 'ok') -> None:
+        total = time.perf_counter() - self.started_at
+        with self._lock:
+            stages = dict(self.stages)
+        for name, seconds in stages.items():
+            stage_seconds.observe(seconds, stage=name)
+        stage_seconds.observe(total, stage='total')
+        if not METRICS_LOG_TIMINGS:
+            return
+        stages = {name: round(seconds, 4) for name, seconds in stages.items()}
+        print(json.dumps({
+            'event': 'pipeline_timings',
+            **self.fields,
+            'outcome': outcome,
+            'total_seconds': round(total, 4),
+            'stages': stages
+        }))
@@ -0,0 +1,193 @@
+"""
+Process-wide rate limiting for Grok API calls.
+
+Every request thread goes through one RateLimiter, so concurrent users
+share the provider quota instead of each backing off on their own:
+
+- TokenBucket: requests-per-minute and tokens-per-minute budgets
+- AdaptiveConcurrency: AIMD limit on calls in flight (grow by one per
+  window of successes, halve on a 429)
+- A shared pause honoring Retry-After, so one 429 holds back every caller
+- backoff_delay: full-jitter exponential backoff for retries
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Iterator, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute.
+
+    reserve() takes tokens immediately (possibly going into debt) and
+    returns how long the caller must wait, so waiters are served in order.
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take amount tokens and return the seconds to wait before using them."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens reserved but not used (e.g. an overestimate)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """Additive-increase / multiplicative-decrease limit on calls in flight."""
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[int] = None):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial if initial is not None else max_limit)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        # +1 for every `limit` successes, i.e. roughly one step per window
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self) -> None:
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+
+
+class RateLimiter:
+    """Combines the RPM/TPM buckets, AIMD concurrency and Retry-After pauses."""
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency)
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def set_quota(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """Replace the RPM/TPM budgets, e.g. with this process's share of them."""
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def _wait_for_pause(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0) -> Iterator[None]:
+        """Wait for quota and a concurrency slot, then hold the slot for one call."""
+        self._wait_for_pause()
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if delay > 0:
+            time.sleep(delay)
+        self.concurrency.acquire()
+        try:
+            # A 429 elsewhere may have paused everyone while we queued
+            self._wait_for_pause()
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        self.concurrency.on_success()
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Shrink concurrency and, if the server said when, pause every caller until then."""
+        self.concurrency.on_throttle()
+        if retry_after:
+            with self._lock:
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+
+    def paused_for(self) -> float:
+        """Seconds until a Retry-After pause ends (0 when not paused)."""
+        with self._lock:
+            return max(0.0, self._resume_at - time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            'concurrency_limit': int(self.concurrency.limit),
+            'in_flight': self.concurrency.in_flight,
+            'paused_for': self.paused_for()
+        }
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """
+    Read retry-after-ms, or Retry-After as seconds or an HTTP date, from
+    response headers. None if neither is present or readable.
+    """
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            # HTTP-date form, e.g. "Wed, 21 Oct 2015 07:28:00 GMT"
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
@@ -0,0 +1,316 @@
+"""
+Single-flight coalescing of pipeline runs across app workers.
+
+When many requests for the same video arrive at once (a popular video was
+just shared), only the first one runs the pipeline. It becomes the
+flight's owner and publishes every event it produces to a store shared by
+all workers on the machine; the other requests, in any worker process,
+follow the flight by reading those events back as they appear, so a load
+spike costs one transcript fetch and one set of Grok calls instead of N.
+
+- The owner renews a lease while it runs. If its worker dies, followers
+  notice the stale lease and one of them takes the flight over.
+- If the owner's client goes away, the flight is marked abandoned and a
+  follower takes over instead of the run being lost. A taken-over flight
+  starts from its first event again; callers drop what they already saw.
+- A finished flight is replayed to requests arriving within
+  SINGLEFLIGHT_REPLAY seconds, covering the tail of a spike.
+- If the store fails (locked for too long, disk full), callers fall back
+  to running the pipeline alone; a follower starts from the first event.
+
+SQLiteFlightStore is the local store (one WAL-mode SQLite file, safe to
+share between processes). Any object with the same claim / heartbeat /
+publish / finish / read methods can replace it, e.g. one backed by Redis
+when workers run on several machines.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import metrics
+
+SINGLEFLIGHT_PATH = os.getenv('SINGLEFLIGHT_PATH', '.cache/singleflight.sqlite3')
+SINGLEFLIGHT_LEASE = float(os.getenv('SINGLEFLIGHT_LEASE', '30'))  # seconds without a heartbeat before takeover
+SINGLEFLIGHT_REPLAY = float(os.getenv('SINGLEFLIGHT_REPLAY', '10'))  # seconds a finished flight is replayed
+SINGLEFLIGHT_POLL = float(os.getenv('SINGLEFLIGHT_POLL', '0.05'))  # follower poll interval, doubling up to 0.5s
+MAX_POLL = 0.5
+# Finished flights and their events are deleted after this long
+RETENTION = 600
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+ABANDONED = 'abandoned'
+
+flights = metrics.counter(
+    'podcast_singleflight_total',
+    'Pipeline requests by single-flight role (owner, follower, takeover)',
+    ('role',)
+)
+
+
+class FlightFailed(Exception):
+    """The flight's owner failed; raised in followers with the owner's error message."""
+
+
+class SQLiteFlightStore:
+    """Flights and their events in one SQLite file shared by every worker process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so importing a module never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit, so claim() can take the write lock up front with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(
+                'CREATE TABLE IF NOT EXISTS flights ('
+                ' key TEXT PRIMARY KEY, owner TEXT NOT NULL, status TEXT NOT NULL,'
+                ' heartbeat_at REAL NOT NULL, finished_at REAL, error_type TEXT, error TEXT);'
+                'CREATE TABLE IF NOT EXISTS flight_events ('
+                ' key TEXT NOT NULL, owner TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL,'
+                ' PRIMARY KEY (key, owner, seq)) WITHOUT ROWID;'
+            )
+            self._conn = conn
+        return self._conn
+
+    def claim(self, key: str, token: str, lease: float, replay: float) -> Tuple[bool, str]:
+        """
+        Become the owner of key's flight unless a live (or recently
+        finished) one exists. Returns (owned, owner token).
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if now - self._purged_at > 60:
+                    self._purge(conn, now)
+                row = conn.execute(
+                    'SELECT owner, status, heartbeat_at, finished_at FROM flights WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    owner, status, heartbeat_at, finished_at = row
+                    if status == RUNNING and heartbeat_at >= now - lease:
+                        conn.execute('COMMIT')
+                        return False, owner
+                    if status == DONE and finished_at >= now - replay:
+                        conn.execute('COMMIT')
+                        return False, owner
+                conn.execute('DELETE FROM flight_events WHERE key = ?', (key,))
+                conn.execute(
+                    'INSERT OR REPLACE INTO flights (key, owner, status, heartbeat_at) VALUES (?, ?, ?, ?)',
+                    (key, token, RUNNING, now)
+                )
+                conn.execute('COMMIT')
+                return True, token
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _purge(self, conn: sqlite3.Connection, now: float) -> None:
+        cutoff = now - RETENTION
+        conn.execute(
+            'DELETE FROM flight_events WHERE key IN '
+            '(SELECT key FROM flights WHERE status != ? AND finished_at < ?)',
+            (RUNNING, cutoff)
+        )
+        conn.execute('DELETE FROM flights WHERE status != ? AND finished_at < ?', (RUNNING, cutoff))
+        self._purged_at = now
+
+    def heartbeat(self, key: str, token: str) -> bool:
+        """Renew the owner's lease; False if the flight was taken over."""
+        with self._lock:
+            cursor = self._connect().execute(
+                'UPDATE flights SET heartbeat_at = ? WHERE key = ? AND owner = ? AND status = ?',
+                (time.time(), key, token, RUNNING)
+            )
+            return cursor.rowcount > 0
+
+    def publish(self, key: str, token: str, seq: int, event: str) -> None:
+        with self._lock:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO flight_events (key, owner, seq, event) VALUES (?, ?, ?, ?)',
+                (key, token, seq, event)
+            )
+
+    def finish(self, key: str, token: str, status: str, error_type: str = None, error: str = None) -> None:
+        with self._lock:
+            now = time.time()
+            self._connect().execute(
+                'UPDATE flights SET status = ?, heartbeat_at = ?, finished_at = ?, error_type = ?, error = ? '
+                'WHERE key = ? AND owner = ?',
+                (status, now, now, error_type, error, key, token)
+            )
+
+    def read(self, key: str, owner: str, after: int) -> Tuple[Optional[tuple], List[Tuple[int, str]]]:
+        """
+        The flight's (owner, status, heartbeat_at, error_type, error), or
+        None if it is gone, and owner's events after seq after. The state
+        is read first, so a finished state comes with every event.
+        """
+        with self._lock:
+            conn = self._connect()
+            state = conn.execute(
+                'SELECT owner, status, heartbeat_at, error_type, error FROM flights WHERE key = ?', (key,)
+            ).fetchone()
+            events = conn.execute(
+                'SELECT seq, event FROM flight_events WHERE key = ? AND owner = ? AND seq > ? ORDER BY seq',
+                (key, owner, after)
+            ).fetchall()
+        return state, events
+
+
+class _Heartbeat(threading.Thread):
+    """Renews an owner's lease in the background until stopped."""
+
+    def __init__(self, store, key: str, token: str, interval: float):
+        super().__init__(name='singleflight-heartbeat', daemon=True)
+        self.store = store
+        self.key = key
+        self.token = token
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                if not self.store.heartbeat(self.key, self.token):
+                    return
+            except sqlite3.Error as e:
+                print(f"Warning: single-flight heartbeat failed: {str(e)}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class SingleFlight:
+    """Shares one run of an event-producing function between concurrent callers."""
+
+    def __init__(
+        self,
+        store,
+        lease: float = SINGLEFLIGHT_LEASE,
+        replay: float = SINGLEFLIGHT_REPLAY,
+        poll: float = SINGLEFLIGHT_POLL
+    ):
+        self.store = store
+        self.lease = lease
+        self.replay = replay
+        self.poll = poll
+
+    def stream(
+        self,
+        key: str,
+        producer: Callable[[], Iterator[dict]],
+        reraise: Tuple[type, ...] = ()
+    ) -> Iterator[dict]:
+        """
+        Yield the events of producer() (JSON-serializable dicts), running it
+        only if no other caller is already running it for key. Errors of
+        the owner are raised in followers too: as the same class if it is
+        listed in reraise, as FlightFailed otherwise.
+        """
+        token = uuid.uuid4().hex
+        try:
+            owned, owner = self.store.claim(key, token, self.lease, self.replay)
+        except sqlite3.Error as e:
+            print(f"Warning: single-flight store unavailable, running {key} alone: {str(e)}")
+            yield from producer()
+            return
+        if owned:
+            flights.inc(role='owner')
+            yield from self._lead(key, token, producer)
+            return
+
+        flights.inc(role='follower')
+        seq = 0
+        delay = self.poll
+        while True:
+            try:
+                state, events = self.store.read(key, owner, seq)
+            except sqlite3.Error as e:
+                print(f"Warning: single-flight read failed, running {key} alone: {str(e)}")
+                yield from producer()
+                return
+            for seq, event in events:
+                yield json.loads(event)
+            delay = self.poll if events else min(delay * 2, MAX_POLL)
+
+            current, status, heartbeat_at = state[:3] if state else (None, None, 0)
+            if current == owner and status == DONE:
+                return
+            if current == owner and status == FAILED:
+                error_type, error = state[3:]
+                error_class = next((cls for cls in reraise if cls.__name__ == error_type), FlightFailed)
+                raise error_class(error)
+            if current != owner or status == ABANDONED or heartbeat_at < time.time() - self.lease:
+                # The owner went away: take over, or follow whoever did
+                try:
+                    owned, owner = self.store.claim(key, token, self.lease, self.replay)
+                except sqlite3.Error as e:
+                    print(f"Warning: single-flight takeover failed, running {key} alone: {str(e)}")
+                    yield from producer()
+                    return
+                seq = 0
+                if owned:
+                    flights.inc(role='takeover')
+                    yield from self._lead(key, token, producer)
+                    return
+                continue
+            time.sleep(delay)
+
+    def _lead(self, key: str, token: str, producer: Callable[[], Iterator[dict]]) -> Iterator[dict]:
+        heartbeat = _Heartbeat(self.store, key, token, self.lease / 3)
+        heartbeat.start()
+        status = ABANDONED
+        error_type = error = None
+        publishing = True
+        seq = 0
+        try:
+            with closing(producer()) as events:
+                for event in events:
+                    seq += 1
+                    if publishing:
+                        try:
+                            self.store.publish(key, token, seq, json.dumps(event))
+                        except sqlite3.Error as e:
+                            # Followers take over once the lease runs out
+                            print(f"Warning: single-flight publish failed for {key}: {str(e)}")
+                            publishing = False
+                            heartbeat.stop()
+                    yield event
+            status = DONE
+        except GeneratorExit:
+            # Our caller went away; a follower will take the flight over
+            raise
+        except Exception as e:
+            status = FAILED
+            error_type, error = type(e).__name__, str(e)
+            raise
+        finally:
+            heartbeat.stop()
+            if publishing:
+                try:
+                    self.store.finish(key, token, status, error_type, error)
+                except sqlite3.Error as e:
+                    print(f"Warning: single-flight finish failed for {key}: {str(e)}")
+
+
+# Shared by the app's request handlers; None when SINGLEFLIGHT_PATH is empty
+single_flight = SingleFlight(SQLiteFlightStore(SINGLEFLIGHT_PATH)) if SINGLEFLIGHT_PATH else None
@@ -31,12 +31,17 @@ function formatTime(seconds) {
     return `${minutes}:${remainingSeconds.toString().padStart(2, '0')}`;
 }
 
+// Chart currently on screen: { url, chunks, chart, panZoom, initialState }. Resubmitting
+// the same video patches it instead of drawing it again.
+let currentFlowChart = null;
+
 function getTranscript() {
     const url = document.getElementById('youtubeUrl').value;
     if (!url) {
         showError('Please enter a YouTube URL');
         return;
     }
+    const sameVideo = currentFlowChart !== null && currentFlowChart.url === url;
 
     // Show loading indicator
     document.getElementById('loading').style.display = 'block';
@@ -44,47 +49,92 @@ function getTranscript() {
     document.getElementById('transcriptSection').style.display = 'none';
     document.getElementById('chaptersContainer').style.display = 'none';
     document.getElementById('chunksContainer').style.display = 'none';
-    document.getElementById('flowChartContainer').style.display = 'none';
+    if (!sameVideo) {
+        document.getElementById('flowChartContainer').style.display = 'none';
+    }
 
-    // Send request to server
-    fetch('/get_transcript', {
+    // Stream results from the server: transcript and chapters arrive first,
+    // then each chapter's analysis as soon as it is ready
+    let chunks = [];
+    fetch('/stream_transcript', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({ url: url })
     })
-    .then(response => response.json())
-    .then(data => {
-        document.getElementById('loading').style.display = 'none';
-        
-        if (data.error) {
-            showError(data.error);
-            return;
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(data => {
+                throw new Error(data.error || 'An error occurred while fetching the transcript');
+            });
         }
-
-        if (data.success) {
-            if (data.transcript) {
-                displayTranscript(data.transcript);
-                document.getElementById('transcriptContainer').style.display = 'block';
-            }
-            if (data.chapters && data.chapters.length > 0) {
-                displayChapters(data.chapters);
-                document.getElementById('chaptersContainer').style.display = 'block';
-            }
-            if (data.transcript_chunks && data.transcript_chunks.length > 0) {
-                displayChunks(data.transcript_chunks);
-                generateFlowChart(data.transcript_chunks);
+        return readNdjson(response, event => {
+            if (event.type === 'transcript') {
+                document.getElementById('loading').style.display = 'none';
+                chunks = event.transcript_chunks;
+                if (event.transcript) {
+                    displayTranscript(event.transcript);
+                    document.getElementById('transcriptContainer').style.display = 'block';
+                }
+                if (event.chapters && event.chapters.length > 0) {
+                    displayChapters(event.chapters);
+                    document.getElementById('chaptersContainer').style.display = 'block';
+                }
+                if (chunks.length > 0) {
+                    displayChunks(chunks);
+                }
+            } else if (event.type === 'chunk') {
+                chunks[event.index].main_points = event.main_points;
+                chunks[event.index].related_topics = event.related_topics;
+                updateChunk(event.index, chunks[event.index]);
+            } else if (event.type === 'done') {
+                if (sameVideo && currentFlowChart.chunks.length === chunks.length) {
+                    patchFlowChart(chunks);
+                } else if (chunks.length > 0) {
+                    generateFlowChart(chunks, url);
+                }
+            } else if (event.type === 'error') {
+                throw new Error(event.error);
             }
-        }
+        });
     })
     .catch(error => {
         document.getElementById('loading').style.display = 'none';
-        showError('An error occurred while fetching the transcript');
+        showError(error.message || 'An error occurred while fetching the transcript');
         console.error('Error:', error);
     });
 }
 
+function readNdjson(response, onEvent) {
+    // Read a newline-delimited JSON stream, calling onEvent for each line
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(line => {
+                if (line.trim()) {
+                    onEvent(JSON.parse(line));
+                }
+            });
+            if (done) {
+                if (buffer.trim()) {
+                    onEvent(JSON.parse(buffer));
+                }
+                return;
+            }
+            return pump();
+        });
+    }
+
+    return pump();
+}
+
 function displayTranscript(transcript) {
     const container = document.getElementById('transcriptContainer');
     const section = document.getElementById('transcriptSection');
@@ -125,9 +175,9 @@ function displayChapters(chapters) {
             transcriptLines.forEach(line => {
                 const timeMatch = line.textContent.match(/^(\d{1,2}:\d{2}(?::\d{2})?)/);
                 if (timeMatch) {
-                    const timeStr = timeMatch[1];
-                    const [minutes, seconds] = timeStr.split(':').map(Number);
-                    const lineTime = minutes * 60 + seconds;
+                    // Lines are MM:SS or H:MM:SS
+                    const lineTime = timeMatch[1].split(':').map(Number)
+                        .reduce((total, part) => total * 60 + part, 0);
                     const diff = Math.abs(lineTime - chapter.time);
                     
                     if (diff < minDiff) {
@@ -196,43 +246,11 @@ function displayChunks(chunks) {
         const contentDiv = document.createElement('div');
         contentDiv.className = 'chunk-content';
         
-        // Create main points section
-        if (chunk.main_points && chunk.main_points.length > 0) {
-            const mainPointsDiv = document.createElement('div');
-            mainPointsDiv.className = 'analysis-section';
-            
-            const mainPointsTitle = document.createElement('h5');
-            mainPointsTitle.textContent = 'Main Points:';
-            mainPointsDiv.appendChild(mainPointsTitle);
-            
-            const mainPointsList = document.createElement('ul');
-            chunk.main_points.forEach(point => {
-                const li = document.createElement('li');
-                li.textContent = point;
-                mainPointsList.appendChild(li);
-            });
-            mainPointsDiv.appendChild(mainPointsList);
-            contentDiv.appendChild(mainPointsDiv);
-        }
-        
-        // Create related topics section
-        if (chunk.related_topics && chunk.related_topics.length > 0) {
-            const topicsDiv = document.createElement('div');
-            topicsDiv.className = 'analysis-section';
-            
-            const topicsTitle = document.createElement('h5');
-            topicsTitle.textContent = 'Related Topics:';
-            topicsDiv.appendChild(topicsTitle);
-            
-            const topicsList = document.createElement('ul');
-            chunk.related_topics.forEach(topic => {
-                const li = document.createElement('li');
-                li.textContent = topic;
-                topicsList.appendChild(li);
-            });
-            topicsDiv.appendChild(topicsList);
-            contentDiv.appendChild(topicsDiv);
-        }
+        // Analysis goes first; it is filled in when the chunk finishes
+        const analysisDiv = document.createElement('div');
+        analysisDiv.className = 'chunk-analysis';
+        renderChunkAnalysis(analysisDiv, chunk);
+        contentDiv.appendChild(analysisDiv);
         
         // Create collapsible transcript text section
         const transcriptToggle = document.createElement('button');
@@ -269,14 +287,115 @@ function displayChunks(chunks) {
     container.style.display = 'block';
 }
 
-function generateFlowChart(chunks) {
+function updateChunk(index, chunk) {
+    // Fill in a chapter's analysis once it arrives from the stream
+    const section = document.getElementById(`chunk-${index}`);
+    if (section) {
+        renderChunkAnalysis(section.querySelector('.chunk-analysis'), chunk);
+    }
+}
+
+function renderChunkAnalysis(analysisDiv, chunk) {
+    analysisDiv.innerHTML = '';
+    
+    // Chunks from the stream have no analysis until their chapter finishes
+    if (chunk.main_points === undefined && chunk.related_topics === undefined) {
+        const pending = document.createElement('p');
+        pending.className = 'chunk-pending';
+        pending.textContent = 'Analyzing chapter...';
+        analysisDiv.appendChild(pending);
+        return;
+    }
+    
+    // Create main points section
+    if (chunk.main_points && chunk.main_points.length > 0) {
+        const mainPointsDiv = document.createElement('div');
+        mainPointsDiv.className = 'analysis-section';
+        
+        const mainPointsTitle = document.createElement('h5');
+        mainPointsTitle.textContent = 'Main Points:';
+        mainPointsDiv.appendChild(mainPointsTitle);
+        
+        const mainPointsList = document.createElement('ul');
+        chunk.main_points.forEach(point => {
+            const li = document.createElement('li');
+            li.textContent = point;
+            mainPointsList.appendChild(li);
+        });
+        mainPointsDiv.appendChild(mainPointsList);
+        analysisDiv.appendChild(mainPointsDiv);
+    }
+    
+    // Create related topics section
+    if (chunk.related_topics && chunk.related_topics.length > 0) {
+        const topicsDiv = document.createElement('div');
+        topicsDiv.className = 'analysis-section';
+        
+        const topicsTitle = document.createElement('h5');
+        topicsTitle.textContent = 'Related Topics:';
+        topicsDiv.appendChild(topicsTitle);
+        
+        const topicsList = document.createElement('ul');
+        chunk.related_topics.forEach(topic => {
+            const li = document.createElement('li');
+            li.textContent = topic;
+            topicsList.appendChild(li);
+        });
+        topicsDiv.appendChild(topicsList);
+        analysisDiv.appendChild(topicsDiv);
+    }
+}
+
+function chartChunks(chunks) {
+    // The parts of each chunk that show up in the chart, copied
+    return chunks.map(chunk => JSON.stringify([chunk.chapter, chunk.main_points || [], chunk.related_topics || []]));
+}
+
+function patchFlowChart(chunks) {
+    // Redraw only the clusters whose chapter title or analysis changed
+    const previous = currentFlowChart;
+    const current = chartChunks(chunks);
+    const changed = current
+        .map((chunk, index) => chunk === previous.chunks[index] ? -1 : index)
+        .filter(index => index >= 0);
+    if (changed.length === 0) return;
+
+    fetch('/generate_flow_chart', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ chunks: chunks, format: 'json' })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            console.error('Error generating flow chart:', data.error);
+            return;
+        }
+        if (previous.chart.patch(data.graph, changed)) {
+            previous.chunks = current;
+            previous.panZoom.updateBBox();
+            previous.chart.renderVisible(previous.panZoom);
+        } else {
+            // Clusters appeared or disappeared; draw the chart again
+            generateFlowChart(chunks, previous.url);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+    });
+}
+
+function generateFlowChart(chunks, url) {
     // Send chunks to backend to generate flow chart
     fetch('/generate_flow_chart', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ chunks: chunks })
+        // Ask for the chart as JSON and draw it here instead of rendering SVG on the server
+        body: JSON.stringify({ chunks: chunks, format: 'json' })
     })
     .then(response => response.json())
     .then(data => {
@@ -285,187 +404,51 @@ function generateFlowChart(chunks) {
             const container = document.getElementById('flowChartContainer');
             const content = document.getElementById('flowChartContent');
             
-            // Load the SVG file
-            fetch(data.svg_path)
-                .then(response => response.text())
-                .then(svg => {
-                    content.innerHTML = svg;
-                    container.style.display = 'block';
-                    
-                    // Initialize SVG Pan Zoom
-                    const panZoom = svgPanZoom(content.querySelector('svg'), {
-                        zoomEnabled: true,
-                        controlIconsEnabled: false,
-                        fit: true,
-                        center: true,
-                        minZoom: 0.1,
-                        maxZoom: 10,
-                        zoomScaleSensitivity: 0.5
-                    });
-                    
-                    // Store initial state after first fit
-                    const initialState = {
-                        zoom: panZoom.getZoom(),
-                        pan: panZoom.getPan()
-                    };
-                    
-                    // Add event listeners for zoom controls
-                    document.getElementById('zoomIn').addEventListener('click', () => {
-                        const currentZoom = panZoom.getZoom();
-                        if (currentZoom < panZoom.getMaxZoom()) {
-                            panZoom.zoomIn();
-                        }
-                    });
-                    
-                    document.getElementById('zoomOut').addEventListener('click', () => {
-                        const currentZoom = panZoom.getZoom();
-                        if (currentZoom > initialState.zoom * 0.1) {
-                            panZoom.zoomOut();
-                        }
-                    });
-                    
-                    document.getElementById('resetZoom').addEventListener('click', () => {
-                        // Reset to initial state
-                        panZoom.zoom(initialState.zoom);
-                        panZoom.pan(initialState.pan.x, initialState.pan.y);
-                    });
-                    
-                    // Handle window resize
-                    let resizeTimeout;
-                    window.addEventListener('resize', () => {
-                        // Clear any existing timeout
-                        if (resizeTimeout) {
-                            clearTimeout(resizeTimeout);
-                        }
-                        
-                        // Set a new timeout to prevent multiple rapid calls
-                        resizeTimeout = setTimeout(() => {
-                            panZoom.resize();
-                            panZoom.fit();
-                            panZoom.center();
-                            
-                            // Update initial state after resize
-                            initialState.zoom = panZoom.getZoom();
-                            initialState.pan = panZoom.getPan();
-                        }, 250);
-                    });
-                    
-                    // Add export functionality
-                    const exportBtn = document.getElementById('exportChart');
-                    const youtubeUrl = document.getElementById('youtubeUrl').value;
-                    const videoId = youtubeUrl.match(/(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)/)?.[1] || 'chart';
-                    
-                    // Create and append dropdown
-                    const dropdownTemplate = document.getElementById('exportFormatTemplate');
-                    const dropdown = dropdownTemplate.content.cloneNode(true);
-                    exportBtn.appendChild(dropdown);
-                    
-                    const exportDropdown = exportBtn.querySelector('.export-dropdown');
-                    
-                    // Toggle dropdown on button click
-                    exportBtn.addEventListener('click', (e) => {
-                        if (e.target.closest('.export-format-btn')) return;
-                        exportDropdown.classList.toggle('show');
-                    });
-                    
-                    // Close dropdown when clicking outside
-                    document.addEventListener('click', (e) => {
-                        if (!e.target.closest('.export-btn')) {
-                            exportDropdown.classList.remove('show');
-                        }
-                    });
-                    
-                    // Handle format selection
-                    exportDropdown.addEventListener('click', async (e) => {
-                        if (!e.target.classList.contains('export-format-btn')) return;
-                        
-                        const format = e.target.textContent.toLowerCase();
-                        const svg = content.querySelector('svg');
-                        const filename = `youtube-${videoId}-flow-chart.${format}`;
-                        
-                        // Store current pan/zoom state
-                        const currentPan = panZoom.getPan();
-                        const currentZoom = panZoom.getZoom();
-                        
-                        // Reset view to show entire chart
-                        panZoom.reset();
-                        
-                        // Temporarily disable pan-zoom for export
-                        panZoom.disablePan();
-                        panZoom.disableZoom();
-                        
-                        try {
-                            if (format === 'png') {
-                                // Get the SVG's dimensions after reset
-                                const svgRect = svg.getBoundingClientRect();
-                                const viewBox = svg.viewBox.baseVal;
-                                
-                                // Configure PNG export options for highest quality
-                                const options = {
-                                    scale: 4, // Increased scale for higher quality
-                                    backgroundColor: getComputedStyle(document.documentElement)
-                                        .getPropertyValue('--bg-color')
-                                        .trim(),
-                                    encoderOptions: 1, // Highest quality
-                                    width: viewBox.width || svgRect.width * 4, // Use viewBox width if available
-                                    height: viewBox.height || svgRect.height * 4, // Use viewBox height if available
-                                    left: viewBox.x || 0, // Include full viewBox
-                                    top: viewBox.y || 0,
-                                    excludeCss: false // Include CSS styles
-                                };
-                                
-                                await saveSvgAsPng(svg, filename, options);
-                            } else if (format === 'pdf') {
-                                // Create PDF with svg2pdf
-                                const { jsPDF } = window.jspdf;
-                                const doc = new jsPDF({
-                                    orientation: 'landscape',
-                                    unit: 'pt',
-                                    format: 'a4'
-                                });
-                                
-                                // Get the SVG's original dimensions
-                                const viewBox = svg.viewBox.baseVal;
-                                const width = viewBox.width || svg.getBoundingClientRect().width;
-                                const height = viewBox.height || svg.getBoundingClientRect().height;
-                                
-                                // Calculate scale to fit PDF page while maintaining aspect ratio
-                                const pageWidth = doc.internal.pageSize.getWidth();
-                                const pageHeight = doc.internal.pageSize.getHeight();
-                                const scale = Math.min(pageWidth / width, pageHeight / height) * 0.95;
-                                
-                                await doc.svg(svg, {
-                                    x: 0,
-                                    y: 0,
-                                    width: width * scale,
-                                    height: height * scale,
-                                    viewBox: {
-                                        x: viewBox.x || 0,
-                                        y: viewBox.y || 0,
-                                        width: width,
-                                        height: height
-                                    }
-                                });
-                                
-                                doc.save(filename);
-                            }
-                        } catch (error) {
-                            console.error(`Error exporting chart as ${format}:`, error);
-                        } finally {
-                            // Restore previous pan/zoom state
-                            panZoom.zoom(currentZoom);
-                            panZoom.pan(currentPan);
-                            
-                            // Re-enable pan-zoom after export
-                            panZoom.enablePan();
-                            panZoom.enableZoom();
-                            exportDropdown.classList.remove('show');
-                        }
-                    });
-                })
-                .catch(error => {
-                    console.error('Error loading flow chart:', error);
+            // The previous chart's pan-zoom instance goes with its SVG
+            if (currentFlowChart) {
+                currentFlowChart.panZoom.destroy();
+            }
+            
+            // Build the SVG from the graph description
+            const chart = buildFlowChartSvg(data.graph);
+            content.innerHTML = '';
+            content.appendChild(chart.svg);
+            container.style.display = 'block';
+            
+            // Initialize SVG Pan Zoom
+            const panZoom = svgPanZoom(content.querySelector('svg'), {
+                zoomEnabled: true,
+                controlIconsEnabled: false,
+                fit: true,
+                center: true,
+                minZoom: 0.1,
+                maxZoom: 10,
+                zoomScaleSensitivity: 0.5
+            });
+            
+            // Only draw the contents of clusters that are on screen
+            let renderScheduled = false;
+            const renderVisible = () => {
+                if (renderScheduled) return;
+                renderScheduled = true;
+                requestAnimationFrame(() => {
+                    renderScheduled = false;
+                    chart.renderVisible(panZoom);
                 });
+            };
+            panZoom.setOnPan(renderVisible);
+            panZoom.setOnZoom(renderVisible);
+            chart.renderVisible(panZoom);
+            
+            // Store initial state after first fit, for the reset button
+            currentFlowChart = {
+                url: url,
+                chunks: chartChunks(chunks),
+                chart: chart,
+                panZoom: panZoom,
+                initialState: { zoom: panZoom.getZoom(), pan: panZoom.getPan() }
+            };
+            setupFlowChartControls();
         } else {
             console.error('Error generating flow chart:', data.error);
         }
@@ -475,6 +458,433 @@ function generateFlowChart(chunks) {
     });
 }
 
+let flowChartControlsReady = false;
+
+function setupFlowChartControls() {
+    // Zoom, export and resize handlers act on whichever chart is current,
+    // so they are registered once, not again on every redraw
+    if (flowChartControlsReady) return;
+    flowChartControlsReady = true;
+    
+    // Add event listeners for zoom controls
+    document.getElementById('zoomIn').addEventListener('click', () => {
+        const { panZoom } = currentFlowChart;
+        const currentZoom = panZoom.getZoom();
+        if (currentZoom < panZoom.getMaxZoom()) {
+            panZoom.zoomIn();
+        }
+    });
+    
+    document.getElementById('zoomOut').addEventListener('click', () => {
+        const { panZoom, initialState } = currentFlowChart;
+        const currentZoom = panZoom.getZoom();
+        if (currentZoom > initialState.zoom * 0.1) {
+            panZoom.zoomOut();
+        }
+    });
+    
+    document.getElementById('resetZoom').addEventListener('click', () => {
+        // Reset to initial state
+        const { panZoom, initialState } = currentFlowChart;
+        panZoom.zoom(initialState.zoom);
+        panZoom.pan(initialState.pan.x, initialState.pan.y);
+    });
+    
+    // Handle window resize
+    let resizeTimeout;
+    window.addEventListener('resize', () => {
+        // Clear any existing timeout
+        if (resizeTimeout) {
+            clearTimeout(resizeTimeout);
+        }
+        
+        // Set a new timeout to prevent multiple rapid calls
+        resizeTimeout = setTimeout(() => {
+            const { panZoom, initialState } = currentFlowChart;
+            panZoom.resize();
+            panZoom.fit();
+            panZoom.center();
+            
+            // Update initial state after resize
+            initialState.zoom = panZoom.getZoom();
+            initialState.pan = panZoom.getPan();
+        }, 250);
+    });
+    
+    // Add export functionality
+    const exportBtn = document.getElementById('exportChart');
+    
+    // Create and append dropdown
+    const dropdownTemplate = document.getElementById('exportFormatTemplate');
+    const dropdown = dropdownTemplate.content.cloneNode(true);
+    exportBtn.appendChild(dropdown);
+    
+    const exportDropdown = exportBtn.querySelector('.export-dropdown');
+    
+    // Toggle dropdown on button click
+    exportBtn.addEventListener('click', (e) => {
+        if (e.target.closest('.export-format-btn')) return;
+        exportDropdown.classList.toggle('show');
+    });
+    
+    // Close dropdown when clicking outside
+    document.addEventListener('click', (e) => {
+        if (!e.target.closest('.export-btn')) {
+            exportDropdown.classList.remove('show');
+        }
+    });
+    
+    // Handle format selection
+    exportDropdown.addEventListener('click', async (e) => {
+        if (!e.target.classList.contains('export-format-btn')) return;
+        
+        const { chart, panZoom, url } = currentFlowChart;
+        const videoId = url.match(/(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?#]+)/)?.[1] || 'chart';
+        const format = e.target.textContent.toLowerCase();
+        const svg = chart.svg;
+        const filename = `youtube-${videoId}-flow-chart.${format}`;
+        
+        // Store current pan/zoom state
+        const currentPan = panZoom.getPan();
+        const currentZoom = panZoom.getZoom();
+        
+        // Exports need every cluster, not just the visible ones
+        chart.renderAll();
+        
+        // Reset view to show entire chart
+        panZoom.reset();
+        
+        // Temporarily disable pan-zoom for export
+        panZoom.disablePan();
+        panZoom.disableZoom();
+        
+        // The chart's own extent (svg-pan-zoom removes the viewBox attribute)
+        const [viewX, viewY, width, height] = chart.bounds();
+        
+        try {
+            if (format === 'png') {
+                // Configure PNG export options for highest quality
+                const options = {
+                    scale: 4, // Increased scale for higher quality
+                    backgroundColor: getComputedStyle(document.documentElement)
+                        .getPropertyValue('--bg-color')
+                        .trim(),
+                    encoderOptions: 1, // Highest quality
+                    width: width,
+                    height: height,
+                    left: viewX, // Include full viewBox
+                    top: viewY,
+                    excludeCss: false // Include CSS styles
+                };
+                
+                await saveSvgAsPng(svg, filename, options);
+            } else if (format === 'pdf') {
+                // Create PDF with svg2pdf
+                const { jsPDF } = window.jspdf;
+                const doc = new jsPDF({
+                    orientation: 'landscape',
+                    unit: 'pt',
+                    format: 'a4'
+                });
+                
+                // Calculate scale to fit PDF page while maintaining aspect ratio
+                const pageWidth = doc.internal.pageSize.getWidth();
+                const pageHeight = doc.internal.pageSize.getHeight();
+                const scale = Math.min(pageWidth / width, pageHeight / height) * 0.95;
+                
+                await doc.svg(svg, {
+                    x: 0,
+                    y: 0,
+                    width: width * scale,
+                    height: height * scale,
+                    viewBox: {
+                        x: viewX,
+                        y: viewY,
+                        width: width,
+                        height: height
+                    }
+                });
+                
+                doc.save(filename);
+            }
+        } catch (error) {
+            console.error(`Error exporting chart as ${format}:`, error);
+        } finally {
+            // Restore previous pan/zoom state
+            panZoom.zoom(currentZoom);
+            panZoom.pan(currentPan);
+            
+            // Re-enable pan-zoom after export
+            panZoom.enablePan();
+            panZoom.enableZoom();
+            exportDropdown.classList.remove('show');
+        }
+    });
+}
+
+const SVG_NS = 'http://www.w3.org/2000/svg';
+const CHART_FONT_SIZE = 12;
+const CHART_LINE_HEIGHT = 16;
+const CHART_CHAR_WIDTH = 6.6;  // rough average glyph width for the chart font
+
+function svgElement(name, attributes) {
+    const element = document.createElementNS(SVG_NS, name);
+    Object.entries(attributes || {}).forEach(([key, value]) => element.setAttribute(key, value));
+    return element;
+}
+
+function svgText(lines, x, y, anchor) {
+    // Multi-line text centered vertically on y
+    const text = svgElement('text', {
+        x: x,
+        y: y - ((lines.length - 1) * CHART_LINE_HEIGHT) / 2,
+        'text-anchor': anchor || 'middle',
+        'dominant-baseline': 'middle',
+        'font-family': 'Arial',
+        'font-size': CHART_FONT_SIZE,
+        fill: '#333333'
+    });
+    lines.forEach((line, index) => {
+        const tspan = svgElement('tspan', { x: x, dy: index === 0 ? 0 : CHART_LINE_HEIGHT });
+        tspan.textContent = line;
+        text.appendChild(tspan);
+    });
+    return text;
+}
+
+function layoutFlowChart(graph) {
+    // Simple left-to-right layout used when the server sent no positions:
+    // one column per chapter, its nodes stacked top to bottom
+    const padding = 16;
+    const labelHeight = 28;
+    const gap = 14;
+    const clusterGap = 70;
+    let x = 0;
+    let height = 0;
+
+    graph.clusters.forEach((cluster, index) => {
+        const nodes = graph.nodes.filter(node => node.cluster === index);
+        if (nodes.length === 0) return;
+        nodes.forEach(node => {
+            const lines = node.label.split('\n');
+            const longest = Math.max(...lines.map(line => line.length));
+            node.size = [longest * CHART_CHAR_WIDTH + 28, lines.length * CHART_LINE_HEIGHT + 20];
+        });
+        const width = Math.max(
+            cluster.label.length * CHART_CHAR_WIDTH + 2 * padding,
+            ...nodes.map(node => node.size[0] + 2 * padding)
+        );
+        let y = labelHeight + padding;
+        nodes.forEach(node => {
+            node.pos = [x + width / 2, y + node.size[1] / 2];
+            y += node.size[1] + gap;
+        });
+        cluster.bb = [x, 0, x + width, y - gap + padding];
+        height = Math.max(height, cluster.bb[3]);
+        x += width + clusterGap;
+    });
+
+    graph.bb = [0, 0, Math.max(x - clusterGap, 1), Math.max(height, 1)];
+}
+
+function clipToBox(center, size, toward) {
+    // Point where the line from center to toward leaves the node's box
+    const dx = toward[0] - center[0];
+    const dy = toward[1] - center[1];
+    if (dx === 0 && dy === 0) return center;
+    const scale = Math.min(
+        dx !== 0 ? (size[0] / 2) / Math.abs(dx) : Infinity,
+        dy !== 0 ? (size[1] / 2) / Math.abs(dy) : Infinity
+    );
+    return [center[0] + dx * scale, center[1] + dy * scale];
+}
+
+function buildFlowChartSvg(graph) {
+    // Draw a chart from its JSON description. Cluster frames and the
+    // chapter-to-chapter edges are drawn up front; the nodes inside each
+    // cluster are only created once the cluster scrolls into view.
+    if (!graph.nodes.every(node => node.pos)) {
+        layoutFlowChart(graph);
+    }
+    const margin = 10;
+    const svg = svgElement('svg');
+    // Chart area plus the margin, as [x, y, width, height]
+    let bounds;
+    function setBounds(bb) {
+        const [minX, minY, maxX, maxY] = bb;
+        bounds = [minX - margin, minY - margin, maxX - minX + 2 * margin, maxY - minY + 2 * margin];
+        svg.setAttribute('width', bounds[2]);
+        svg.setAttribute('height', bounds[3]);
+        // svg-pan-zoom reads the viewBox when attached and then removes it;
+        // setting it again afterwards would scale the chart twice
+        if (!svg.parentNode || svg.hasAttribute('viewBox')) {
+            svg.setAttribute('viewBox', bounds.join(' '));
+        }
+    }
+    setBounds(graph.bb);
+    const defs = svgElement('defs');
+    const marker = svgElement('marker', {
+        id: 'flow-arrow', viewBox: '0 0 10 10', refX: 10, refY: 5,
+        markerWidth: 7, markerHeight: 7, orient: 'auto-start-reverse'
+    });
+    marker.appendChild(svgElement('path', { d: 'M 0 0 L 10 5 L 0 10 z', fill: 'context-stroke' }));
+    defs.appendChild(marker);
+    svg.appendChild(defs);
+
+    let nodesById = {};
+    graph.nodes.forEach(node => { nodesById[node.id] = node; });
+
+    function drawEdge(parent, edge) {
+        const source = nodesById[edge.source];
+        const target = nodesById[edge.target];
+        if (!source || !target) return;
+        const points = edge.points || [
+            clipToBox(source.pos, source.size, target.pos),
+            clipToBox(target.pos, target.size, source.pos)
+        ];
+        const styles = {
+            detail: { stroke: '#333333', 'stroke-dasharray': '2,3' },
+            link: { stroke: '#333333', 'stroke-dasharray': '6,4' },
+            sequence: { stroke: edge.color || '#333333', 'stroke-width': 2 },
+            topic: { stroke: '#888888' }
+        };
+        parent.appendChild(svgElement('polyline', Object.assign({
+            points: points.map(point => point.join(',')).join(' '),
+            fill: 'none',
+            'marker-end': 'url(#flow-arrow)'
+        }, styles[edge.kind] || styles.detail)));
+    }
+
+    function drawFrame(group, cluster) {
+        const [x1, y1, x2, y2] = cluster.bb;
+        group.appendChild(svgElement('rect', {
+            x: x1, y: y1, width: x2 - x1, height: y2 - y1, rx: 10,
+            fill: `${cluster.color}80`, stroke: cluster.color, 'stroke-width': 2
+        }));
+        group.appendChild(svgText([cluster.label], (x1 + x2) / 2, y1 + 16));
+    }
+
+    // origin is where the cluster was drawn; bb is where it is now
+    const clusterGroups = [];
+    graph.clusters.forEach((cluster, index) => {
+        if (!cluster.bb) return;
+        const group = svgElement('g', { class: 'flow-cluster' });
+        drawFrame(group, cluster);
+        svg.appendChild(group);
+        clusterGroups.push({ index: index, bb: cluster.bb, origin: cluster.bb, group: group, rendered: false });
+    });
+
+    // Edges between chapters stay visible at every zoom level
+    const sequenceEdges = svgElement('g', { class: 'flow-sequence' });
+    function drawSequenceEdges() {
+        graph.edges.filter(edge => edge.kind === 'sequence').forEach(edge => drawEdge(sequenceEdges, edge));
+    }
+    drawSequenceEdges();
+
+    function renderCluster(entry) {
+        if (entry.rendered) return;
+        entry.rendered = true;
+        graph.nodes.filter(node => node.cluster === entry.index).forEach(node => {
+            const [cx, cy] = node.pos;
+            const [width, height] = node.size;
+            entry.group.appendChild(svgElement('rect', {
+                x: cx - width / 2, y: cy - height / 2, width: width, height: height,
+                rx: node.kind === 'heading' ? 0 : 8, fill: 'white', stroke: '#333333'
+            }));
+            entry.group.appendChild(svgText(node.label.split('\n'), node.kind === 'list' ? cx - width / 2 + 14 : cx, cy,
+                node.kind === 'list' ? 'start' : 'middle'));
+        });
+        graph.edges
+            .filter(edge => edge.kind !== 'sequence' && nodesById[edge.source] && nodesById[edge.source].cluster === entry.index)
+            .forEach(edge => drawEdge(entry.group, edge));
+    }
+
+    // Node boxes are drawn over the cluster frames, sequence edges on top
+    svg.appendChild(sequenceEdges);
+
+    return {
+        svg: svg,
+        bounds() {
+            return bounds;
+        },
+        renderAll() {
+            clusterGroups.forEach(renderCluster);
+        },
+        patch(newGraph, changed) {
+            // Swap in a new description of the same chapters, redrawing only
+            // the clusters listed in changed. Clusters already drawn keep
+            // their nodes and are only moved if a changed cluster before them
+            // got wider or narrower. Returns false if the set of drawn
+            // clusters differs, in which case the chart must be rebuilt.
+            if (!newGraph.nodes.every(node => node.pos)) {
+                layoutFlowChart(newGraph);
+            }
+            const framed = [];
+            newGraph.clusters.forEach((cluster, index) => {
+                if (cluster.bb) framed.push(index);
+            });
+            if (framed.length !== clusterGroups.length ||
+                framed.some((index, position) => clusterGroups[position].index !== index)) {
+                return false;
+            }
+
+            graph = newGraph;
+            // The chart may have grown or shrunk around the changed clusters
+            setBounds(graph.bb);
+            nodesById = {};
+            graph.nodes.forEach(node => { nodesById[node.id] = node; });
+            // Links to shared topics cross clusters, and any changed chapter
+            // can move the shared topics, so everything linked to them is redrawn
+            const sharedIndex = graph.clusters.findIndex(cluster => cluster.shared);
+            if (sharedIndex >= 0) {
+                changed = changed.concat(sharedIndex, graph.edges
+                    .filter(edge => edge.kind === 'topic' && nodesById[edge.source])
+                    .map(edge => nodesById[edge.source].cluster));
+            }
+            clusterGroups.forEach(entry => {
+                const cluster = graph.clusters[entry.index];
+                if (changed.includes(entry.index) || !entry.rendered) {
+                    // Nodes of undrawn clusters are placed from the new graph later
+                    while (entry.group.firstChild) {
+                        entry.group.removeChild(entry.group.firstChild);
+                    }
+                    entry.group.removeAttribute('transform');
+                    drawFrame(entry.group, cluster);
+                    entry.origin = cluster.bb;
+                    entry.rendered = false;
+                } else {
+                    const dx = cluster.bb[0] - entry.origin[0];
+                    const dy = cluster.bb[1] - entry.origin[1];
+                    entry.group.setAttribute('transform', `translate(${dx},${dy})`);
+                }
+                entry.bb = cluster.bb;
+            });
+            while (sequenceEdges.firstChild) {
+                sequenceEdges.removeChild(sequenceEdges.firstChild);
+            }
+            drawSequenceEdges();
+            return true;
+        },
+        renderVisible(panZoom) {
+            // Visible area in chart coordinates, padded by half a screen
+            const sizes = panZoom.getSizes();
+            const pan = panZoom.getPan();
+            const zoom = sizes.realZoom;
+            const left = -pan.x / zoom;
+            const top = -pan.y / zoom;
+            const width = sizes.width / zoom;
+            const height = sizes.height / zoom;
+            clusterGroups.forEach(entry => {
+                const [x1, y1, x2, y2] = entry.bb;
+                if (x2 >= left - width / 2 && x1 <= left + width * 1.5 &&
+                    y2 >= top - height / 2 && y1 <= top + height * 1.5) {
+                    renderCluster(entry);
+                }
+            });
+        }
+    };
+}
+
 function showError(message) {
     const errorDiv = document.getElementById('error');
     const transcriptSection = document.getElementById('transcriptSection');
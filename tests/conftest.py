@@ -0,0 +1,25 @@
+"""
+Keep every cache and store the app modules open at import time out of the
+working tree: they all go to one temporary directory for the test run.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix='podcast-tests-')
+atexit.register(shutil.rmtree, _directory, ignore_errors=True)
+
+for name, filename in (
+    ('ANALYSIS_CACHE_PATH', 'analysis.sqlite3'),
+    ('FETCH_CACHE_PATH', 'youtube.sqlite3'),
+    ('JOB_STORE_PATH', 'jobs.sqlite3'),
+    ('CHART_CACHE_DIR', 'charts'),
+    ('INGEST_STORE_PATH', 'ingest.sqlite3')
+):
+    os.environ.setdefault(name, os.path.join(_directory, filename))
+# Tests that need these build their own instances
+os.environ.setdefault('TOPIC_INDEX_PATH', '')
+os.environ.setdefault('SINGLEFLIGHT_PATH', '')
+os.environ.setdefault('ANALYZER_BACKEND', 'local')
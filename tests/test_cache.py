@@ -0,0 +1,173 @@
+"""LRU order, TTL expiry and size-based eviction in the memory, disk and tiered caches."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import MISSING, LRUCache, SQLiteCache, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('cache.time.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+
+
+class LRUCacheTest(CacheTestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=10)
+        cache.set('default', 1)
+        cache.set('short', 2, ttl=1)
+        cache.set('none', None)
+        self.clock.now += 5
+        self.assertIs(cache.get('short'), MISSING)
+        self.assertEqual(cache.get('default'), 1)
+        self.assertIsNone(cache.get('none'))
+        self.clock.now += 5
+        self.assertIs(cache.get('default'), MISSING)
+        self.assertEqual(len(cache), 1)
+
+
+class SQLiteCacheTest(CacheTestCase):
+
+    def test_ttl(self):
+        cache = SQLiteCache(self.path, ttl=10)
+        cache.set('default', 'a')
+        cache.set('short', 'b', ttl=1)
+        self.assertEqual(cache.get_entry('short'), ('b', 1001.0))
+        self.clock.now += 5
+        self.assertIs(cache.get('short'), MISSING)
+        self.assertEqual(cache.get('default'), 'a')
+        # Expired rows are dropped, with their size, on the next write
+        cache.set('other', 'c')
+        self.assertEqual(cache.total_bytes(), len('"a"') + len('"c"'))
+
+    def test_evicts_least_recently_used_by_size(self):
+        # Each value is 12 bytes of JSON; three fit
+        cache = SQLiteCache(self.path, max_bytes=36, touch_interval=0)
+        for key in ('a', 'b', 'c'):
+            self.clock.now += 1
+            cache.set(key, key * 10)
+        self.clock.now += 1
+        self.assertEqual(cache.get('a'), 'a' * 10)
+        self.clock.now += 1
+        cache.set('d', 'd' * 10)
+        self.assertIs(cache.get('b'), MISSING)
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(cache.get(key), key * 10)
+        self.assertEqual(cache.total_bytes(), 36)
+
+    def test_access_time_is_only_touched_after_interval(self):
+        cache = SQLiteCache(self.path, touch_interval=60)
+        cache.set('a', 1)
+        self.clock.now += 30
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(self.accessed_at('a'), 1000.0)
+        self.clock.now += 31
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(self.accessed_at('a'), 1061.0)
+
+    def test_running_total_tracks_replace_and_delete(self):
+        cache = SQLiteCache(self.path)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'y')
+        cache.set('a', 'x')
+        self.assertEqual(cache.total_bytes(), 6)
+        cache.delete('b')
+        self.assertEqual(cache.total_bytes(), 3)
+        # Another worker sharing the file sees the same total
+        self.assertEqual(SQLiteCache(self.path).total_bytes(), 3)
+        cache.clear()
+        self.assertEqual(cache.total_bytes(), 0)
+
+    def test_total_is_seeded_from_an_existing_table(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            'CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'expires_at REAL, accessed_at REAL NOT NULL)'
+        )
+        conn.execute("INSERT INTO cache VALUES ('a', '\"abc\"', 5, NULL, 0)")
+        conn.commit()
+        conn.close()
+        cache = SQLiteCache(self.path)
+        self.assertEqual(cache.total_bytes(), 5)
+        cache.set('b', 'b')
+        self.assertEqual(cache.total_bytes(), 8)
+
+    def accessed_at(self, key):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute('SELECT accessed_at FROM cache WHERE key = ?', (key,)).fetchone()[0]
+        finally:
+            conn.close()
+
+
+class TieredCacheTest(CacheTestCase):
+
+    def test_memory_tier_evicts_lru_and_disk_tier_refills_it(self):
+        cache = TieredCache(LRUCache(max_entries=2), SQLiteCache(self.path))
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        # 'b' left the memory tier but is still on disk
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.get('c'), 3)
+        stats = cache.stats()
+        self.assertEqual(stats['disk_hits'], 1)
+        self.assertEqual(stats['memory_hits'], 2)
+        self.assertEqual(stats['memory_entries'], 2)
+
+    def test_disk_hit_keeps_remaining_ttl(self):
+        disk = SQLiteCache(self.path)
+        disk.set('a', 'value', ttl=10)
+        cache = TieredCache(LRUCache(ttl=3600), disk)
+        self.clock.now += 6
+        self.assertEqual(cache.get('a'), 'value')
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        # Promoted with the 4 seconds it had left, not the memory tier's hour
+        self.clock.now += 5
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_size_eviction_on_disk(self):
+        cache = TieredCache(LRUCache(max_entries=1), SQLiteCache(self.path, max_bytes=24, touch_interval=0))
+        for key in ('a', 'b', 'c'):
+            self.clock.now += 1
+            cache.set(key, key * 10)
+        # Only the memory tier's last entry and the disk tier's two newest survive
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.get('b'), 'b' * 10)
+        self.assertEqual(cache.get('c'), 'c' * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
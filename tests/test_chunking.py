@@ -0,0 +1,178 @@
+"""
+Regression test for the bisect-based chapter splitter.
+
+chunk_transcript must put the same lines in the same chapters as the
+original line-scanning parse_transcript_chunks, kept here verbatim as the
+reference.
+"""
+
+import random
+import re
+import unittest
+
+from chunking import chunk_transcript
+from transcript import Transcript, format_timestamp
+
+
+def reference_parse_transcript_chunks(transcript_text: str, chapters: list) -> list:
+    """Parse transcript into chunks based on chapter timestamps"""
+    chunks = []
+    lines = transcript_text.split('\n')
+
+    # Sort chapters by time
+    sorted_chapters = sorted(chapters, key=lambda x: x['time'])
+
+    # If no chapters, return empty list
+    if not sorted_chapters:
+        return []
+
+    # Add a final "chapter" at the end to capture the last section
+    sorted_chapters.append({
+        'time': float('inf'),
+        'title': 'End'
+    })
+
+    # Create a list of lines with their timestamps (if available)
+    indexed_lines = []
+    for i, line in enumerate(lines):
+        # Extract timestamp from line if available
+        timestamp_match = re.match(r'^(\d{1,2}:\d{2}(?::\d{2})?)\s*-\s*(.+)$', line)
+        if timestamp_match:
+            timestamp_str, text = timestamp_match.groups()
+
+            # Convert timestamp to seconds
+            time_parts = timestamp_str.split(':')
+            if len(time_parts) == 3:
+                hours, minutes, seconds = map(int, time_parts)
+                current_time = hours * 3600 + minutes * 60 + seconds
+            else:
+                minutes, seconds = map(int, time_parts)
+                current_time = minutes * 60 + seconds
+
+            indexed_lines.append({
+                'index': i,
+                'line': line,
+                'text': text,
+                'time': current_time,
+                'has_timestamp': True
+            })
+        else:
+            # Line without timestamp
+            indexed_lines.append({
+                'index': i,
+                'line': line,
+                'text': line,
+                'time': None,
+                'has_timestamp': False
+            })
+
+    # Process each chapter
+    for i in range(len(sorted_chapters) - 1):
+        current_chapter = sorted_chapters[i]
+        next_chapter = sorted_chapters[i + 1]
+
+        # Find the first line with a timestamp that's >= current chapter time
+        start_index = None
+        for line_info in indexed_lines:
+            if line_info['has_timestamp'] and line_info['time'] >= current_chapter['time']:
+                start_index = line_info['index']
+                break
+
+        # If no line found with timestamp >= current chapter time, use the first line
+        if start_index is None:
+            start_index = 0
+
+        # Find the last line with a timestamp that's < next chapter time
+        end_index = None
+        for line_info in reversed(indexed_lines):
+            if line_info['has_timestamp'] and line_info['time'] < next_chapter['time']:
+                end_index = line_info['index']
+                break
+
+        # If no line found with timestamp < next chapter time, use the last line
+        if end_index is None:
+            end_index = len(lines) - 1
+
+        # Extract all lines between start_index and end_index (inclusive)
+        chunk_lines = []
+        for j in range(start_index, end_index + 1):
+            if j < len(indexed_lines):
+                chunk_lines.append(indexed_lines[j]['text'])
+
+        # Add the chunk if it's not empty
+        if chunk_lines:
+            chunks.append({
+                'chapter': current_chapter['title'],
+                'text': '\n'.join(chunk_lines)
+            })
+
+    return chunks
+
+
+def make_transcript(starts, texts):
+    return Transcript.from_segments(
+        {'start': start, 'duration': 2.0, 'text': text} for start, text in zip(starts, texts)
+    )
+
+
+def display_text(transcript):
+    """The "MM:SS - text" string the reference parsed (no trailing newline)."""
+    return '\n'.join(
+        f"{format_timestamp(start)} - {text}"
+        for start, text in zip(transcript.starts, transcript.texts)
+    )
+
+
+class ChunkTranscriptRegressionTest(unittest.TestCase):
+
+    def assert_same_chunks(self, transcript, chapters):
+        expected = reference_parse_transcript_chunks(display_text(transcript), chapters)
+        # A budget large enough that no chapter is split into pieces
+        actual = chunk_transcript(transcript, chapters, max_tokens=10 ** 9)
+        self.assertEqual(
+            [(chunk['chapter'], chunk['text']) for chunk in actual],
+            [(chunk['chapter'], chunk['text']) for chunk in expected]
+        )
+
+    def test_fixed_transcripts(self):
+        transcript = make_transcript(
+            [0, 5, 12, 59, 60, 61, 125, 3599, 3600, 3725],
+            [f'line {i}' for i in range(10)]
+        )
+        cases = [
+            [{'time': 0, 'title': 'Intro'}],
+            [{'time': 0, 'title': 'Intro'}, {'time': 60, 'title': 'Main'}, {'time': 3600, 'title': 'Hour two'}],
+            # Unsorted chapters, one starting before the first caption
+            [{'time': 125, 'title': 'C'}, {'time': 0, 'title': 'A'}, {'time': 61, 'title': 'B'}],
+            # Chapters after the last caption, and two at the same time
+            [{'time': 0, 'title': 'A'}, {'time': 4000, 'title': 'Late'}, {'time': 5000, 'title': 'Later'}],
+            [{'time': 60, 'title': 'A'}, {'time': 60, 'title': 'B'}],
+            # First chapter starts mid-transcript
+            [{'time': 100, 'title': 'Only'}],
+        ]
+        for chapters in cases:
+            with self.subTest(chapters=chapters):
+                self.assert_same_chunks(transcript, chapters)
+
+    def test_randomized_transcripts(self):
+        rng = random.Random(7)
+        for _ in range(2000):
+            count = rng.randint(1, 60)
+            span = rng.choice([120, 3600, 3 * 3600])
+            starts = [rng.uniform(0, span) for _ in range(count)]
+            if rng.random() < 0.8:
+                starts.sort()
+            if rng.random() < 0.5:
+                # Whole seconds, like most caption tracks
+                starts = [float(int(start)) for start in starts]
+            transcript = make_transcript(starts, [f'text {i}' for i in range(count)])
+            chapters = [
+                {'time': rng.randint(0, span + 60), 'title': f'Chapter {i}'}
+                for i in range(rng.randint(1, 12))
+            ]
+            with self.subTest(starts=starts, chapters=chapters):
+                self.assert_same_chunks(transcript, chapters)
+
+
+if __name__ == '__main__':
+    unittest.main()
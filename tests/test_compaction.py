@@ -0,0 +1,32 @@
+"""Overlap removal in compact_text."""
+
+import unittest
+
+from compaction import compact_text
+
+
+class CompactTextTest(unittest.TestCase):
+
+    def test_rolling_captions_are_deduplicated(self):
+        text = (
+            "00:01 - so today we are talking about\n"
+            "00:03 - we are talking about the future of energy\n"
+            "00:06 - the future of energy and climate"
+        )
+        self.assertEqual(
+            compact_text(text),
+            "so today we are talking about\nthe future of energy\nand climate"
+        )
+
+    def test_short_overlaps_are_kept(self):
+        # Ordinary speech often starts a line with the word (or two) that ended the previous one
+        text = "I went to the\nthe store\nit was good to see you\nsee you again tomorrow"
+        self.assertEqual(compact_text(text), text)
+
+    def test_repeated_line_is_dropped(self):
+        text = "this is the first line\nthis is the first line\nand a second one"
+        self.assertEqual(compact_text(text), "this is the first line\nand a second one")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+End-to-end ingest.run with the offline fetchers (benchmarks.fake_youtube),
+the local analyzer and everything in one process (--workers 0).
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import ingest
+
+VIDEO_IDS = ['ingestvid01', 'ingestvid02', 'ingestvid03']
+
+
+def fake_render(chunks, layout=None, fmt='svg', timeout=None):
+    """Stands in for Graphviz where dot isn't installed."""
+    return f'<svg><!-- {len(chunks)} chapters --></svg>'.encode('utf-8'), layout
+
+
+class IngestRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.directory, 'ingest.sqlite3')
+        if shutil.which('dot') is None:
+            patcher = mock.patch('flow_chart.render_flow_chart', fake_render)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_ingest(self, *video_ids):
+        return ingest.run(ingest.parse_args([
+            *video_ids,
+            '--store', self.store_path,
+            '--fetchers', 'benchmarks.fake_youtube',
+            '--workers', '0',
+            '--analyzer', 'local'
+        ]))
+
+    def query(self, sql, *params):
+        with sqlite3.connect(self.store_path) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def attempts(self):
+        return dict(self.query('SELECT video_id, attempts FROM videos'))
+
+    def test_results_are_persisted_and_reruns_resume(self):
+        self.assertEqual(self.run_ingest(*VIDEO_IDS), {ingest.DONE: 3})
+        rows = self.query('SELECT video_id, analyzer, result, svg FROM results ORDER BY video_id')
+        self.assertEqual([row[0] for row in rows], VIDEO_IDS)
+        for video_id, analyzer, result, svg in rows:
+            result = json.loads(result)
+            self.assertEqual(analyzer, 'local')
+            self.assertTrue(result['success'])
+            self.assertTrue(result['transcript_chunks'])
+            self.assertTrue(all(chunk['main_points'] for chunk in result['transcript_chunks']))
+            self.assertIn('<svg', svg)
+        self.assertEqual(self.attempts(), dict.fromkeys(VIDEO_IDS, 1))
+
+        # Nothing left to do: a rerun processes no video
+        self.assertEqual(self.run_ingest(*VIDEO_IDS), {ingest.DONE: 3})
+        self.assertEqual(self.attempts(), dict.fromkeys(VIDEO_IDS, 1))
+
+        # One video failed and one was interrupted (left running by a crash)
+        with sqlite3.connect(self.store_path) as conn:
+            conn.execute("UPDATE videos SET status = ? WHERE video_id = ?", (ingest.FAILED, VIDEO_IDS[0]))
+            conn.execute("UPDATE videos SET status = ? WHERE video_id = ?", (ingest.RUNNING, VIDEO_IDS[1]))
+        self.assertEqual(self.run_ingest(*VIDEO_IDS), {ingest.DONE: 3})
+        self.assertEqual(self.attempts(), {VIDEO_IDS[0]: 2, VIDEO_IDS[1]: 2, VIDEO_IDS[2]: 1})
+
+    def test_failures_are_recorded_and_retried(self):
+        with mock.patch('benchmarks.fake_youtube.fetch_transcript', side_effect=RuntimeError('YouTube is down')):
+            self.assertEqual(self.run_ingest(VIDEO_IDS[0]), {ingest.FAILED: 1})
+        self.assertIn('YouTube is down', self.query('SELECT error FROM videos')[0][0])
+        self.assertEqual(self.run_ingest(VIDEO_IDS[0]), {ingest.DONE: 1})
+        self.assertEqual(self.attempts(), {VIDEO_IDS[0]: 2})
+
+    def test_rate_limits_are_split_between_worker_processes(self):
+        import grok_analyzer
+        limiter = grok_analyzer.rate_limiter
+        with mock.patch.object(grok_analyzer, 'XAI_REQUESTS_PER_MINUTE', 120), \
+                mock.patch.object(grok_analyzer, 'XAI_TOKENS_PER_MINUTE', 40000), \
+                mock.patch.object(limiter, 'requests'), mock.patch.object(limiter, 'tokens'):
+            ingest.init_worker({}, None, workers=4)
+            self.assertEqual(limiter.requests.rate * 60, 30)
+            self.assertEqual(limiter.tokens.rate * 60, 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Parsing of Grok insight responses and the single repair request."""
+
+import json
+import unittest
+from types import SimpleNamespace
+
+import grok_analyzer
+from grok_analyzer import AnalysisUnavailable, _parse_or_repair
+from insights import InvalidInsights, parse_batch_insights, parse_insights, parse_insights_text
+
+
+class FakeClient:
+    """Answers chat completions from a list of canned contents, recording each request."""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.contents.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class ParseInsightsTest(unittest.TestCase):
+
+    def test_fenced_and_prefixed_json(self):
+        payload = {'main_points': [' 3 reasons rates rose '], 'related_topics': ['Inflation']}
+        for content in (
+            json.dumps(payload),
+            f"```json\n{json.dumps(payload)}\n```",
+            f"Here is the analysis:\n{json.dumps(payload)}\nLet me know if you need more."
+        ):
+            with self.subTest(content=content):
+                self.assertEqual(
+                    parse_insights(content),
+                    {'main_points': ['3 reasons rates rose'], 'related_topics': ['Inflation']}
+                )
+
+    def test_missing_or_mistyped_fields(self):
+        for content in (
+            '',
+            'no json here',
+            '{"main_points": ["a"]}',
+            '{"main_points": "a", "related_topics": []}',
+            '{"main_points": ["a", 3], "related_topics": []}',
+            '{"main_points": [], "related_topics": ["b"]}',
+            '["a", "b"]',
+            '{"main_points": ["a"], "related_topics": [}'
+        ):
+            with self.subTest(content=content):
+                with self.assertRaises(InvalidInsights):
+                    parse_insights(content)
+
+
+class ParseBatchInsightsTest(unittest.TestCase):
+
+    def test_partial_answer_keeps_valid_entries(self):
+        content = json.dumps({'chunks': [
+            {'index': 0, 'main_points': ['first'], 'related_topics': []},
+            {'index': 1, 'main_points': 'not a list', 'related_topics': []},
+            {'index': 7, 'main_points': ['out of range'], 'related_topics': []},
+            {'index': '2', 'main_points': ['third'], 'related_topics': ['x']},
+            'not an object'
+        ]})
+        self.assertEqual(parse_batch_insights(content, 3), {
+            0: {'main_points': ['first'], 'related_topics': []},
+            2: {'main_points': ['third'], 'related_topics': ['x']}
+        })
+
+    def test_objects_keyed_by_index(self):
+        content = '```\n{"1": {"main_points": ["second"], "related_topics": []}, "x": {}}\n```'
+        self.assertEqual(parse_batch_insights(content, 2), {1: {'main_points': ['second'], 'related_topics': []}})
+
+    def test_unusable_answer(self):
+        self.assertEqual(parse_batch_insights('sorry, I cannot help', 2), {})
+        self.assertEqual(parse_batch_insights('[1, 2]', 2), {})
+
+
+class ParseInsightsTextTest(unittest.TestCase):
+
+    def test_digits_inside_points_are_kept(self):
+        content = (
+            "**Main points:**\n"
+            "1. 3 reasons the Fed raised rates\n"
+            "2) Inflation hit 9.1% in 2022\n"
+            "- 10x growth is rare\n"
+            "\n"
+            "### Related topics\n"
+            "* 2008 financial crisis\n"
+            "• Housing"
+        )
+        self.assertEqual(parse_insights_text(content), {
+            'main_points': ['3 reasons the Fed raised rates', 'Inflation hit 9.1% in 2022', '10x growth is rare'],
+            'related_topics': ['2008 financial crisis', 'Housing']
+        })
+
+    def test_json_answer_without_json_mode(self):
+        content = 'Sure! {"main_points": ["a", 5, " b "], "related_topics": "oops"}'
+        self.assertEqual(parse_insights_text(content), {'main_points': ['a', 'b'], 'related_topics': []})
+
+
+class ParseOrRepairTest(unittest.TestCase):
+
+    messages = [{'role': 'user', 'content': 'Analyze this chunk'}]
+
+    def setUp(self):
+        # Plain requests, so the fake client never sees a response_format to reject
+        self._format = grok_analyzer._response_format_supported
+        grok_analyzer._response_format_supported = False
+
+    def tearDown(self):
+        grok_analyzer._response_format_supported = self._format
+
+    def test_valid_answer_needs_no_repair(self):
+        client = FakeClient()
+        result = _parse_or_repair(self.messages, '{"main_points": ["a"], "related_topics": []}', client)
+        self.assertEqual(result['main_points'], ['a'])
+        self.assertEqual(client.requests, [])
+
+    def test_one_repair_request(self):
+        client = FakeClient('{"main_points": ["fixed"], "related_topics": ["t"]}')
+        result = _parse_or_repair(self.messages, '{"main_points": []}', client)
+        self.assertEqual(result, {'main_points': ['fixed'], 'related_topics': ['t']})
+        self.assertEqual(len(client.requests), 1)
+        repair = client.requests[0]['messages']
+        self.assertEqual(repair[:1], self.messages)
+        self.assertEqual(repair[1], {'role': 'assistant', 'content': '{"main_points": []}'})
+        self.assertIn('"related_topics" must be a list of strings', repair[2]['content'])
+
+    def test_failed_repair_raises(self):
+        client = FakeClient('still not JSON')
+        with self.assertRaises(AnalysisUnavailable):
+            _parse_or_repair(self.messages, 'nothing useful', client)
+        self.assertEqual(len(client.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""JobManager state shared between app workers through one job store."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from jobs import JobManager, SQLiteJobStore, CANCELLED, FAILED, SUCCEEDED, WORKER_LOST
+
+
+def wait_until_finished(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+class SharedJobStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'jobs.sqlite3')
+        # Two managers on one file stand in for two app worker processes
+        self.first = JobManager(max_workers=2, store=SQLiteJobStore(path))
+        self.second = JobManager(max_workers=2, store=SQLiteJobStore(path))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_other_worker_sees_progress_and_result(self):
+        release = threading.Event()
+
+        def work(job):
+            job.set_progress(1, 3)
+            release.wait(5)
+            return {'chunks': [1, 2, 3]}
+
+        job = self.first.submit('video:grok:0', work)
+        time.sleep(0.1)
+        self.assertEqual(self.second.get(job.id).to_dict()['progress'], {'completed': 1, 'total': 3})
+        release.set()
+        finished = wait_until_finished(self.second, job.id)
+        self.assertEqual(finished.status, SUCCEEDED)
+        self.assertEqual(finished.result, {'chunks': [1, 2, 3]})
+
+    def test_duplicate_submission_joins_across_workers(self):
+        release = threading.Event()
+        job = self.first.submit('video:grok:0', lambda job: release.wait(5))
+        duplicate = self.second.submit('video:grok:0', lambda job: self.fail('ran twice'))
+        self.assertEqual(duplicate.id, job.id)
+        other_key = self.second.submit('video:grok:1', lambda job: None)
+        self.assertNotEqual(other_key.id, job.id)
+        release.set()
+        wait_until_finished(self.second, job.id)
+
+    def test_cancel_from_other_worker(self):
+        def work(job):
+            while True:
+                job.raise_if_cancelled()
+                time.sleep(0.01)
+
+        job = self.first.submit('video:grok:0', work)
+        time.sleep(0.05)
+        self.second.cancel(job.id)
+        self.assertEqual(wait_until_finished(self.first, job.id).status, CANCELLED)
+
+    def test_job_of_dead_worker_fails(self):
+        store = self.first.store
+        self.assertIsNone(store.claim('video:grok:0', 'lost-job', lease=30, retention=3600))
+        store.update('lost-job', status='running', heartbeat_at=time.time() - 60)
+        job = self.second.get('lost-job')
+        self.assertEqual((job.status, job.error), (FAILED, WORKER_LOST))
+        # A new submission starts a new job instead of joining the dead one
+        replacement = self.second.submit('video:grok:0', lambda job: None)
+        self.assertNotEqual(replacement.id, 'lost-job')
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.second.get('missing'))
+        self.assertIsNone(self.second.cancel('missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
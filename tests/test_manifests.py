@@ -0,0 +1,82 @@
+"""Incremental re-analysis: which stored insights are reused, and chapter diffs."""
+
+import unittest
+import uuid
+
+from manifests import changed_chapters, chunk_hash, load_manifest, reusable_insights, save_manifest
+
+GROK_VERSION = 'grok:grok-test:1'
+CHAPTERS = [{'time': 0, 'title': 'Intro'}, {'time': 60, 'title': 'Main'}, {'time': 120, 'title': 'Outro'}]
+
+
+def make_chunk(chapter, start, points):
+    return {
+        'chapter': chapter,
+        'start': start,
+        'end': start + 60,
+        'main_points': points,
+        'related_topics': [f'{chapter} topic'] if points else []
+    }
+
+
+class ReusableInsightsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.video_id = uuid.uuid4().hex
+        self.hashes = [chunk_hash([text]) for text in ('intro text', 'main text', 'outro text')]
+        self.chunks = [
+            make_chunk('Intro', 0, ['Welcome']),
+            make_chunk('Main', 60, ['The point']),
+            make_chunk('Outro', 120, ['Goodbye'])
+        ]
+
+    def test_unchanged_grok_chunks_are_reused_by_hash(self):
+        save_manifest(self.video_id, GROK_VERSION, CHAPTERS, self.chunks, self.hashes, ['grok'] * 3)
+        manifest = load_manifest(self.video_id, GROK_VERSION)
+        self.assertEqual(manifest['chapters'], CHAPTERS)
+
+        # A chapter was inserted before 'Main': its text is new, the others moved along
+        new_hashes = [self.hashes[0], chunk_hash(['inserted text']), self.hashes[1], self.hashes[2]]
+        reused = reusable_insights(manifest, new_hashes)
+        self.assertEqual(sorted(reused), [0, 2, 3])
+        self.assertEqual(reused[2], {'main_points': ['The point'], 'related_topics': ['Main topic'], 'source': 'grok'})
+        self.assertEqual(reused[3]['main_points'], ['Goodbye'])
+
+    def test_local_fallbacks_and_failures_are_analyzed_again(self):
+        save_manifest(
+            self.video_id, GROK_VERSION, CHAPTERS,
+            [self.chunks[0], self.chunks[1], make_chunk('Outro', 120, [])],
+            self.hashes, ['grok', 'local', 'failed']
+        )
+        manifest = load_manifest(self.video_id, GROK_VERSION)
+        self.assertEqual([chunk['hash'] for chunk in manifest['chunks']], self.hashes[:1])
+        self.assertEqual(sorted(reusable_insights(manifest, self.hashes)), [0])
+
+    def test_local_version_reuses_nothing(self):
+        # Local TF-IDF results depend on every chunk of the episode, so they are always recomputed
+        save_manifest(self.video_id, 'local', CHAPTERS, self.chunks, self.hashes, ['local'] * 3)
+        manifest = load_manifest(self.video_id, 'local')
+        self.assertEqual(manifest['chunks'], [])
+        self.assertEqual(reusable_insights(manifest, self.hashes), {})
+
+    def test_versions_are_stored_separately(self):
+        save_manifest(self.video_id, GROK_VERSION, CHAPTERS, self.chunks, self.hashes, ['grok'] * 3)
+        self.assertIsNone(load_manifest(self.video_id, 'grok:grok-test:2'))
+        self.assertEqual(reusable_insights(None, self.hashes), {})
+
+
+class ChangedChaptersTest(unittest.TestCase):
+
+    def test_counts_added_removed_retimed_and_renamed(self):
+        self.assertEqual(changed_chapters(CHAPTERS, CHAPTERS), 0)
+        self.assertEqual(changed_chapters(None, CHAPTERS), 3)
+        retimed = [CHAPTERS[0], {'time': 75, 'title': 'Main'}, CHAPTERS[2]]
+        # The old entry is removed and the new one added
+        self.assertEqual(changed_chapters(CHAPTERS, retimed), 2)
+        renamed = [CHAPTERS[0], CHAPTERS[1], {'time': 120, 'title': 'Wrap-up'}]
+        self.assertEqual(changed_chapters(CHAPTERS, renamed), 2)
+        self.assertEqual(changed_chapters(CHAPTERS, CHAPTERS[:2]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
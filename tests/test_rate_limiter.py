@@ -0,0 +1,166 @@
+"""Rate limiter unit tests, plus retries against the local Grok stub (benchmarks/grok_stub.py)."""
+
+import threading
+import time
+import unittest
+from email.utils import formatdate
+from unittest import mock
+
+import grok_analyzer
+from benchmarks.grok_stub import StubConfig, start_stub
+from rate_limiter import AdaptiveConcurrency, RateLimiter, TokenBucket, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('rate_limiter.time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refill(self):
+        bucket = TokenBucket(60)  # one token a second, 60 to start with
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0)
+        # Waiters queue up behind each other
+        self.assertAlmostEqual(bucket.reserve(1), 2.0)
+        self.clock.now += 2.5
+        self.assertEqual(bucket.reserve(0.5), 0.0)
+        self.clock.now += 3600
+        # Refill stops at the capacity
+        self.assertEqual(bucket.reserve(60), 0.0)
+        self.assertGreater(bucket.reserve(1), 0.0)
+
+    def test_disabled(self):
+        bucket = TokenBucket(0)
+        self.assertEqual(bucket.reserve(10 ** 9), 0.0)
+
+    def test_tpm_refund(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        self.assertEqual(limiter.tokens.reserve(6000), 0.0)
+        # The call used 1000 of the 6000 tokens estimated
+        limiter.on_success(estimated_tokens=6000, actual_tokens=1000)
+        self.assertEqual(limiter.tokens.reserve(5000), 0.0)
+        self.assertGreater(limiter.tokens.reserve(100), 0.0)
+
+
+class AdaptiveConcurrencyTest(unittest.TestCase):
+
+    def test_halves_on_throttle_and_grows_on_success(self):
+        concurrency = AdaptiveConcurrency(max_limit=8, min_limit=1)
+        concurrency.on_throttle()
+        self.assertEqual(concurrency.limit, 4)
+        # About one step per window of `limit` successes
+        for _ in range(4):
+            concurrency.on_success()
+        self.assertEqual(int(concurrency.limit), 4)
+        for _ in range(2):
+            concurrency.on_success()
+        self.assertEqual(int(concurrency.limit), 5)
+        for _ in range(200):
+            concurrency.on_success()
+        self.assertEqual(concurrency.limit, 8)
+        for _ in range(10):
+            concurrency.on_throttle()
+        self.assertEqual(concurrency.limit, 1)
+
+    def test_limit_blocks_extra_callers(self):
+        concurrency = AdaptiveConcurrency(max_limit=1)
+        concurrency.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (concurrency.acquire(), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        concurrency.release()
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+class RetryAfterTest(unittest.TestCase):
+
+    def test_formats(self):
+        self.assertEqual(retry_after_seconds({'retry-after': '3'}), 3.0)
+        self.assertEqual(retry_after_seconds({'retry-after': '1.5'}), 1.5)
+        self.assertEqual(retry_after_seconds({'retry-after-ms': '250', 'retry-after': '9'}), 0.25)
+        in_a_minute = retry_after_seconds({'retry-after': formatdate(time.time() + 60, usegmt=True)})
+        self.assertAlmostEqual(in_a_minute, 60, delta=2)
+        self.assertEqual(retry_after_seconds({'retry-after': formatdate(time.time() - 60, usegmt=True)}), 0.0)
+
+    def test_missing_or_unreadable(self):
+        self.assertIsNone(retry_after_seconds(None))
+        self.assertIsNone(retry_after_seconds({}))
+        self.assertIsNone(retry_after_seconds({'retry-after': 'soon'}))
+        self.assertEqual(retry_after_seconds({'retry-after-ms': 'x', 'retry-after': '2'}), 2.0)
+
+
+class SharedPauseTest(unittest.TestCase):
+
+    def test_retry_after_holds_back_every_caller(self):
+        limiter = RateLimiter(max_concurrency=4)
+        limiter.on_rate_limited(0.3)
+        self.assertEqual(int(limiter.concurrency.limit), 2)
+        self.assertAlmostEqual(limiter.paused_for(), 0.3, delta=0.05)
+
+        waited = []
+
+        def call():
+            start = time.monotonic()
+            with limiter.slot():
+                waited.append(time.monotonic() - start)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(waited), 3)
+        self.assertTrue(all(seconds >= 0.25 for seconds in waited), waited)
+        self.assertEqual(limiter.paused_for(), 0.0)
+
+
+class GrokStubTest(unittest.TestCase):
+    """create_chat_completion against the stub, which answers 429 with retry-after-ms."""
+
+    def setUp(self):
+        from openai import OpenAI
+
+        self.config = StubConfig(latency=0.0, jitter=0.0, rate_limit=1.0, retry_after_ms=150)
+        self.server = start_stub(self.config)
+        self.addCleanup(self.server.shutdown)
+        self.client = OpenAI(
+            api_key='stub', base_url=f'http://127.0.0.1:{self.server.server_address[1]}/v1', max_retries=0
+        )
+        self.limiter = RateLimiter(max_concurrency=8)
+        patcher = mock.patch.object(grok_analyzer, 'rate_limiter', self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rate_limited_calls_wait_out_retry_after(self):
+        from openai import RateLimitError
+
+        messages = [{'role': 'user', 'content': 'Analyze: economics inflation housing markets'}]
+        start = time.monotonic()
+        with self.assertRaises(RateLimitError):
+            grok_analyzer.create_chat_completion(messages, client=self.client, max_retries=2)
+        # The second attempt waited out the first 429's pause
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual((self.config.requests, self.config.rate_limited), (2, 2))
+        self.assertEqual(int(self.limiter.concurrency.limit), 2)
+
+        self.config.rate_limit = 0.0
+        response = grok_analyzer.create_chat_completion(messages, client=self.client)
+        self.assertIn('main_points', response.choices[0].message.content)
+        self.assertGreater(self.limiter.concurrency.limit, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
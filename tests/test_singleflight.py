@@ -0,0 +1,145 @@
+"""Single-flight runs shared between threads through one store file, as between app workers."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from singleflight import FlightFailed, SingleFlight, SQLiteFlightStore
+
+EVENTS = [{'type': 'transcript', 'n': 0}, {'type': 'chunk', 'index': 0}, {'type': 'chunk', 'index': 1}]
+
+
+class Producer:
+    """Yields EVENTS, holding after the first one until released; counts its runs."""
+
+    def __init__(self, hold=True):
+        self.runs = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def __call__(self):
+        self.runs += 1
+        for position, event in enumerate(EVENTS):
+            if position == 1:
+                self.started.set()
+                self.release.wait(5)
+            yield event
+
+
+def unexpected():
+    raise AssertionError('a follower ran the producer')
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'singleflight.sqlite3')
+
+    def flight(self, **options):
+        # A store of its own per caller stands in for a separate worker process
+        options.setdefault('poll', 0.01)
+        return SingleFlight(SQLiteFlightStore(self.path), **options)
+
+    def run_in_thread(self, flight, producer, results, name):
+        def target():
+            try:
+                results[name] = list(flight.stream('video', producer))
+            except Exception as e:
+                results[name] = e
+        thread = threading.Thread(target=target)
+        thread.start()
+        return thread
+
+    def test_follower_sees_the_owners_events(self):
+        producer = Producer()
+        results = {}
+        owner = self.run_in_thread(self.flight(), producer, results, 'owner')
+        self.assertTrue(producer.started.wait(5))
+        follower = self.run_in_thread(self.flight(), unexpected, results, 'follower')
+        time.sleep(0.1)
+        producer.release.set()
+        owner.join(5)
+        follower.join(5)
+        self.assertEqual(results['owner'], EVENTS)
+        self.assertEqual(results['follower'], EVENTS)
+        self.assertEqual(producer.runs, 1)
+
+    def test_finished_flight_is_replayed(self):
+        producer = Producer(hold=False)
+        self.assertEqual(list(self.flight().stream('video', producer)), EVENTS)
+        self.assertEqual(list(self.flight().stream('video', unexpected)), EVENTS)
+        self.assertEqual(producer.runs, 1)
+
+    def test_owner_error_is_raised_in_follower(self):
+        def failing():
+            yield EVENTS[0]
+            producer.started.set()
+            producer.release.wait(5)
+            raise ValueError('transcript disabled')
+
+        producer = Producer()
+        results = {}
+        owner = self.run_in_thread(self.flight(), failing, results, 'owner')
+        self.assertTrue(producer.started.wait(5))
+        follower = self.run_in_thread(self.flight(), unexpected, results, 'follower')
+        time.sleep(0.1)
+        producer.release.set()
+        owner.join(5)
+        follower.join(5)
+        self.assertIsInstance(results['owner'], ValueError)
+        self.assertIsInstance(results['follower'], FlightFailed)
+        self.assertEqual(str(results['follower']), 'transcript disabled')
+
+    def test_takeover_after_the_lease_expires(self):
+        # An owner whose worker died: claimed, then never heartbeats or publishes again
+        SQLiteFlightStore(self.path).claim('video', 'dead-owner', lease=0.2, replay=10)
+        producer = Producer(hold=False)
+        started = time.time()
+        self.assertEqual(list(self.flight(lease=0.2).stream('video', producer)), EVENTS)
+        self.assertEqual(producer.runs, 1)
+        self.assertGreaterEqual(time.time() - started, 0.15)
+
+    def test_read_failure_falls_back_to_running_alone(self):
+        producer = Producer()
+        results = {}
+        owner = self.run_in_thread(self.flight(), producer, results, 'owner')
+        self.assertTrue(producer.started.wait(5))
+        follower = self.flight()
+        alone = Producer(hold=False)
+        with mock.patch.object(follower.store, 'read', side_effect=sqlite3.OperationalError('database is locked')):
+            self.assertEqual(list(follower.stream('video', alone)), EVENTS)
+        self.assertEqual(alone.runs, 1)
+        producer.release.set()
+        owner.join(5)
+        self.assertEqual(results['owner'], EVENTS)
+
+    def test_takeover_failure_falls_back_to_running_alone(self):
+        SQLiteFlightStore(self.path).claim('video', 'dead-owner', lease=0.1, replay=10)
+        flight = self.flight(lease=0.1)
+        claim = flight.store.claim
+        calls = []
+
+        def flaky_claim(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                raise sqlite3.OperationalError('disk I/O error')
+            return claim(*args)
+
+        producer = Producer(hold=False)
+        with mock.patch.object(flight.store, 'claim', side_effect=flaky_claim):
+            self.assertEqual(list(flight.stream('video', producer)), EVENTS)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(producer.runs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Topic index: term normalization, re-indexing a video and BM25 ranking."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from topic_index import TopicIndex, terms
+
+
+def chapter(title, topics=(), points=('Discussion',), start=0):
+    return {'chapter': title, 'start': start, 'related_topics': list(topics), 'main_points': list(points)}
+
+
+class TermsTest(unittest.TestCase):
+
+    def test_stems_and_drops_stop_words(self):
+        self.assertEqual(terms('Regulating the AI regulators'), ['regul', 'ai', 'regul'])
+        self.assertEqual(terms('regulation of AI'), ['regul', 'ai'])
+        self.assertEqual(terms('What is it that they were doing?'), ['do'])
+        # Apostrophes are kept inside a word and then removed
+        self.assertEqual(terms("The founder's dilemma"), ['founder', 'dilemma'])
+
+
+class TopicIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.index = TopicIndex(os.path.join(self.directory, 'topics.sqlite3'))
+
+    def test_stemmed_query_matches_other_word_forms(self):
+        self.index.index_episode('video', [chapter('AI regulation', ['Policy'])])
+        results = self.index.search('regulating AI')
+        self.assertEqual([(result['video_id'], result['chapter']) for result in results], [('video', 'AI regulation')])
+        self.assertEqual(results[0]['related_topics'], ['Policy'])
+        self.assertEqual(self.index.search('the and of'), [])
+
+    def test_reindexing_replaces_a_videos_chapters(self):
+        self.index.index_episode('video', [chapter('Rockets', start=0), chapter('Telescopes', start=300)])
+        self.index.index_episode('other', [chapter('Rockets again')])
+        self.index.index_episode('video', [chapter('Satellites', start=60), chapter('No insights', points=())])
+        self.assertEqual(self.index.stats()['chapters'], 2)
+        self.assertEqual([result['video_id'] for result in self.index.search('rockets')], ['other'])
+        self.assertEqual(self.index.search('telescopes'), [])
+        [result] = self.index.search('satellites')
+        self.assertEqual((result['chunk_index'], result['start']), (0, 60))
+
+        self.index.remove_episode('video')
+        self.assertEqual(self.index.stats()['chapters'], 1)
+        self.assertEqual(self.index.search('satellites'), [])
+
+    def test_bm25_ranks_field_weight_term_frequency_and_rarity(self):
+        self.index.index_episode('video', [
+            chapter('Energy markets', ['Inflation']),
+            chapter('Housing', ['Energy'], ['Prices']),
+            chapter('Sleep', ['Health'], ['Energy levels during the day']),
+            chapter('Oceans', ['Shipping'], ['Energy use of container ships', 'Shipping routes and shipping costs']),
+        ])
+        # A title match outweighs a topic match, which outweighs a point match;
+        # of two equal point matches, the one in the shorter chapter ranks first
+        self.assertEqual(
+            [result['chapter'] for result in self.index.search('energy')],
+            ['Energy markets', 'Housing', 'Sleep', 'Oceans']
+        )
+        # The rare term decides: only one chapter mentions shipping, in its topics and twice in its points
+        results = self.index.search('energy shipping')
+        self.assertEqual(results[0]['chapter'], 'Oceans')
+        self.assertEqual([result['score'] for result in results], sorted((r['score'] for r in results), reverse=True))
+        self.assertEqual(len(self.index.search('energy', limit=2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
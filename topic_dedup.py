@@ -0,0 +1,137 @@
+"""
+Cross-chapter deduplication of related topics.
+
+Chapters of one episode often come back with near-identical topics ("AI
+safety", "AI Safety concerns", "safety of AI"). canonical_topics clusters
+the topics of all chunks at once and returns one canonical topic per
+cluster, with the chapters that mention it:
+
+- topics are lowercased, stripped of punctuation, stop words and generic
+  words ("concerns", "discussion"), and compared as word sets, so word
+  order doesn't matter
+- the remaining variants are vectorized together as TF-IDF weighted
+  character n-grams (within words), so plurals and inflections still
+  match, and compared with one sparse matrix product
+- clusters are grown greedily from the topics mentioned by the most
+  chapters, each absorbing every unassigned topic at least
+  TOPIC_SIMILARITY cosine-similar to it, which avoids the chaining of
+  single-link clustering ("AI safety" ~ "AI ethics" ~ "medical ethics")
+
+numpy and scikit-learn are imported on first use, like in local_analyzer.
+"""
+
+import os
+import re
+from typing import Dict, List
+
+TOPIC_SIMILARITY = float(os.getenv('TOPIC_SIMILARITY', '0.6'))
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'as', 'at', 'by', 'for', 'from', 'in', 'into', 'of', 'on',
+    'or', 'the', 'to', 'vs', 'versus', 'with', 'about', 'its', 'their'
+}
+# Words that qualify a topic without changing what it is about
+GENERIC_WORDS = {
+    'concern', 'concerns', 'issue', 'issues', 'discussion', 'discussions',
+    'debate', 'debates', 'overview', 'basics', 'introduction', 'topic', 'topics'
+}
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_topic(topic: str) -> str:
+    """Comparison key of a topic: its significant words, sorted."""
+    words = WORD_RE.findall(topic.lower().replace('&', ' and '))
+    significant = [word for word in words if word not in STOP_WORDS and word not in GENERIC_WORDS]
+    # A topic made only of filler words is kept as it is
+    return ' '.join(sorted(set(significant or words)))
+
+
+def canonical_topics(chunks: List[dict], threshold: float = TOPIC_SIMILARITY) -> Dict[str, list]:
+    """
+    Cluster the related_topics of all chunks of an episode.
+
+    Returns {'topics': [...], 'chapter_topics': [...]}: each topic is a
+    dict with the canonical 'label' (its most used wording), the other
+    wordings merged into it ('aliases') and the indices of the chunks
+    that mention it ('chapters'), most mentioned topics first.
+    chapter_topics lists, per chunk, the indices of its canonical topics
+    in the order the chunk mentions them, without duplicates.
+    """
+    # Exact duplicates after normalization collapse before any vector math
+    keys: List[str] = []
+    key_index: Dict[str, int] = {}
+    wordings: List[Dict[str, int]] = []
+    key_chapters: List[set] = []
+    chunk_keys: List[List[int]] = []
+    for chunk_index, chunk in enumerate(chunks):
+        mentioned = []
+        for topic in chunk.get('related_topics') or []:
+            if not topic.strip():
+                continue
+            key = normalize_topic(topic) or topic.strip().lower()
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+                wordings.append({})
+                key_chapters.append(set())
+            position = key_index[key]
+            # Wordings that only differ in case count as one, keeping the first seen
+            wording = next(
+                (seen for seen in wordings[position] if seen.lower() == topic.strip().lower()),
+                topic.strip()
+            )
+            wordings[position][wording] = wordings[position].get(wording, 0) + 1
+            key_chapters[position].add(chunk_index)
+            mentioned.append(position)
+        chunk_keys.append(mentioned)
+
+    if not keys:
+        return {'topics': [], 'chapter_topics': [[] for _ in chunks]}
+
+    import numpy as np
+
+    # Topics used by more chapters lead their cluster; shorter ones break ties
+    order = sorted(range(len(keys)), key=lambda i: (-len(key_chapters[i]), len(keys[i]), i))
+    cluster_of = np.full(len(keys), -1)
+    if len(keys) == 1:
+        cluster_of[0] = 0
+    else:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        matrix = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 4)).fit_transform(keys)
+        # Rows are L2-normalized, so this is the cosine similarity of every pair
+        similarity = (matrix @ matrix.T).toarray()
+        for leader in order:
+            if cluster_of[leader] >= 0:
+                continue
+            members = (cluster_of < 0) & (similarity[leader] >= threshold)
+            members[leader] = True
+            cluster_of[members] = leader
+
+    topics = []
+    leaders = [index for index in order if cluster_of[index] == index]
+    for leader in leaders:
+        members = np.flatnonzero(cluster_of == leader)
+        counts: Dict[str, int] = {}
+        chapters = set()
+        for member in members:
+            for wording, count in wordings[member].items():
+                counts[wording] = counts.get(wording, 0) + count
+            chapters |= key_chapters[member]
+        # Most used wording wins, then the shortest; dicts keep first-seen order
+        label = min(counts, key=lambda wording: (-counts[wording], len(wording)))
+        topics.append({
+            'label': label,
+            'aliases': [wording for wording in counts if wording != label],
+            'chapters': sorted(chapters)
+        })
+
+    # Topics shared by the most chapters first
+    ranking = sorted(range(len(topics)), key=lambda position: -len(topics[position]['chapters']))
+    topics = [topics[position] for position in ranking]
+    topic_of_leader = {leaders[position]: rank for rank, position in enumerate(ranking)}
+    chapter_topics = []
+    for mentioned in chunk_keys:
+        canonical = [topic_of_leader[int(cluster_of[position])] for position in mentioned]
+        chapter_topics.append(list(dict.fromkeys(canonical)))
+    return {'topics': topics, 'chapter_topics': chapter_topics}
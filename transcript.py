@@ -0,0 +1,65 @@
+"""
+Compact structured transcript representation.
+
+Segments are stored as parallel arrays (start, duration, text) instead of
+a list of dicts or a formatted string, so the pipeline can chunk by time
+without re-parsing and keeps sub-second precision. The "MM:SS - text"
+display string is only produced for the response.
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as MM:SS, or H:MM:SS from one hour on."""
+    total = int(seconds)
+    hours, remainder = divmod(total, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class Transcript:
+    """Transcript segments held in parallel arrays."""
+
+    __slots__ = ('starts', 'durations', 'texts')
+
+    def __init__(self, starts: array, durations: array, texts: List[str]):
+        self.starts = starts
+        self.durations = durations
+        self.texts = texts
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]]) -> 'Transcript':
+        """Build from youtube_transcript_api segments ({'start', 'duration', 'text'})."""
+        starts = array('d')
+        durations = array('d')
+        texts = []
+        for segment in segments:
+            starts.append(segment['start'])
+            durations.append(segment.get('duration', 0.0))
+            texts.append(segment['text'])
+        return cls(starts, durations, texts)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def end(self) -> float:
+        """Time at which the last segment ends."""
+        if not self.texts:
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def text_between(self, start_index: int, end_index: int) -> str:
+        """Plain text of segments start_index..end_index (inclusive), one per line."""
+        return '\n'.join(self.texts[start_index:end_index + 1])
+
+    def to_text(self) -> str:
+        """Display form: one "MM:SS - text" line per segment."""
+        return ''.join(
+            f"{format_timestamp(start)} - {text}\n"
+            for start, text in zip(self.starts, self.texts)
+        )
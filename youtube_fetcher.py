@@ -0,0 +1,196 @@
+"""
+Cached access to YouTube transcripts and video descriptions.
+
+Transcripts and descriptions are cached per video_id with separate TTLs.
+Videos without a transcript are negatively cached for a short while so
+repeat submissions don't hit YouTube again. Stale descriptions are
+refreshed conditionally with the ETag from the last response, which
+costs no quota when the video hasn't changed.
+
+googleapiclient and youtube_transcript_api are imported on first use to
+keep worker startup fast.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+import metrics
+from cache import LRUCache, SQLiteCache, TieredCache, MISSING
+
+load_dotenv()
+
+YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+if not YOUTUBE_API_KEY:
+    print("Warning: YOUTUBE_API_KEY not found in environment variables")
+
+FETCH_CACHE_PATH = os.getenv('FETCH_CACHE_PATH', '.cache/youtube.sqlite3')
+TRANSCRIPT_CACHE_TTL = float(os.getenv('TRANSCRIPT_CACHE_TTL', str(7 * 24 * 3600)))  # seconds
+NO_TRANSCRIPT_CACHE_TTL = float(os.getenv('NO_TRANSCRIPT_CACHE_TTL', '3600'))  # seconds
+DESCRIPTION_CACHE_TTL = float(os.getenv('DESCRIPTION_CACHE_TTL', '900'))  # seconds
+# How long a stale description (and its ETag) is kept for conditional refresh
+DESCRIPTION_RETAIN_TTL = float(os.getenv('DESCRIPTION_RETAIN_TTL', str(30 * 24 * 3600)))
+FETCH_MAX_WORKERS = int(os.getenv('FETCH_MAX_WORKERS', '8'))
+
+
+class TranscriptUnavailable(Exception):
+    """Raised when a video has no transcript (possibly from the negative cache)."""
+
+
+def _make_cache(table: str, ttl: float) -> TieredCache:
+    return TieredCache(
+        LRUCache(max_entries=256, ttl=ttl),
+        SQLiteCache(FETCH_CACHE_PATH, table=table, ttl=ttl) if FETCH_CACHE_PATH else None
+    )
+
+transcript_cache = _make_cache('transcripts', TRANSCRIPT_CACHE_TTL)
+description_cache = _make_cache('descriptions', DESCRIPTION_RETAIN_TTL)
+metrics.register_cache('transcripts', transcript_cache)
+metrics.register_cache('descriptions', description_cache)
+
+# Shared pool used to fetch a video's transcript and description side by side
+fetch_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix='youtube-fetch')
+
+# googleapiclient's httplib2 transport is not thread-safe, so each thread
+# gets its own client
+_local = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _discovery_document() -> Dict[str, Any]:
+    """YouTube Data API discovery document bundled with googleapiclient, parsed once."""
+    from googleapiclient.discovery_cache import get_static_doc
+    return json.loads(get_static_doc('youtube', 'v3'))
+
+
+def get_youtube_client():
+    """Return this thread's YouTube Data API client, or None without an API key."""
+    if not YOUTUBE_API_KEY:
+        return None
+    client = getattr(_local, 'youtube', None)
+    if client is None:
+        from googleapiclient.discovery import build_from_document
+        # Built from the bundled document: no discovery request, no re-parse per thread
+        client = build_from_document(_discovery_document(), developerKey=YOUTUBE_API_KEY)
+        _local.youtube = client
+    return client
+
+
+def _no_transcript_errors() -> tuple:
+    """Errors that mean the video simply has no usable transcript (safe to cache)."""
+    from youtube_transcript_api import (
+        TranscriptsDisabled,
+        NoTranscriptFound,
+        NoTranscriptAvailable,
+        VideoUnavailable
+    )
+    return (TranscriptsDisabled, NoTranscriptFound, NoTranscriptAvailable, VideoUnavailable)
+
+
+def fetch_transcript(video_id: str, refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Return the transcript segments for a video, using the cache when possible.
+
+    Raises TranscriptUnavailable if the video has no transcript. Other errors
+    (network problems, throttling) propagate and are not cached.
+    """
+    if not refresh:
+        cached = transcript_cache.get(video_id)
+        if cached is not MISSING:
+            if 'error' in cached:
+                raise TranscriptUnavailable(cached['error'])
+            return cached['segments']
+
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    try:
+        segments = YouTubeTranscriptApi.get_transcript(video_id)
+    except _no_transcript_errors() as e:
+        transcript_cache.set(video_id, {'error': str(e)}, ttl=NO_TRANSCRIPT_CACHE_TTL)
+        raise TranscriptUnavailable(str(e)) from e
+
+    transcript_cache.set(video_id, {'segments': segments})
+    return segments
+
+
+def fetch_description(video_id: str, refresh: bool = False) -> Optional[str]:
+    """
+    Return the video description, or None if it can't be fetched.
+
+    Fresh entries are served from the cache. Stale entries are revalidated
+    with If-None-Match, so an unchanged video only costs a 304.
+    """
+    cached = description_cache.get(video_id)
+    if (not refresh and cached is not MISSING
+            and time.time() - cached['fetched_at'] < DESCRIPTION_CACHE_TTL):
+        return cached['description']
+
+    youtube = get_youtube_client()
+    if not youtube:
+        return None
+    from googleapiclient.errors import HttpError
+
+    try:
+        list_request = youtube.videos().list(part='snippet', id=video_id)
+        if cached is not MISSING and cached.get('etag'):
+            list_request.headers['If-None-Match'] = cached['etag']
+        video_response = list_request.execute()
+    except HttpError as e:
+        if e.resp.status == 304 and cached is not MISSING:
+            cached['fetched_at'] = time.time()
+            description_cache.set(video_id, cached)
+            return cached['description']
+        print(f"Error fetching video details: {str(e)}")
+        return cached['description'] if cached is not MISSING else None
+    except Exception as e:
+        print(f"Error fetching video details: {str(e)}")
+        return cached['description'] if cached is not MISSING else None
+
+    if not video_response.get('items'):
+        description = None
+    else:
+        description = video_response['items'][0]['snippet']['description']
+
+    description_cache.set(video_id, {
+        'description': description,
+        'etag': video_response.get('etag'),
+        'fetched_at': time.time()
+    })
+    return description
+
+
+def list_playlist_videos(playlist_id: str) -> List[str]:
+    """Video IDs of a playlist, in playlist order (one API call per 50 videos)."""
+    youtube = get_youtube_client()
+    if not youtube:
+        raise RuntimeError("YOUTUBE_API_KEY is required to list playlists")
+    video_ids = []
+    page_token = None
+    while True:
+        response = youtube.playlistItems().list(
+            part='contentDetails',
+            playlistId=playlist_id,
+            maxResults=50,
+            pageToken=page_token
+        ).execute()
+        video_ids.extend(item['contentDetails']['videoId'] for item in response.get('items', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return video_ids
+
+
+def channel_uploads_playlist(channel_id: str) -> Optional[str]:
+    """ID of the playlist holding every upload of a channel, or None if there is no such channel."""
+    youtube = get_youtube_client()
+    if not youtube:
+        raise RuntimeError("YOUTUBE_API_KEY is required to list channels")
+    response = youtube.channels().list(part='contentDetails', id=channel_id).execute()
+    if not response.get('items'):
+        return None
+    return response['items'][0]['contentDetails']['relatedPlaylists']['uploads']